@@ -0,0 +1,7 @@
+"""
+Helpers shared by the Siemens_ECAT_HR++_*.py simulation scripts for configuring a simulation, compiling
+its macros, splitting an acquisition into time chunks, running the chunks through a pool of GATE
+processes and collecting the output.
+
+Required Packages: None (standard library)
+"""
@@ -0,0 +1,255 @@
+"""
+Content-addressed cache of chunk outputs.  Every chunk gets an explicit seed derived from the run seed
+and its time window, so a chunk is reproducible and the same window of the same configuration always
+gives the same output.  A finished chunk's ROOT file is stored in the cache under the hash of its rendered
+macros (the chunk macro and the setup and window macros it executes, which hold the time window and the
+seed, without the paths that change from run to run) and of the content of the data files they read,
+e.g. the placements slices.
+
+Before a run the cache index of the configuration (every control except the start and end time) lists
+the windows that were simulated before.  The run reuses the ones that lie inside its acquisition and only
+plans chunks for the gaps, so extending a 1 s run to 2 s only simulates the second second.  Chunks whose
+key is in the cache are linked into ROOT_FOLDER and marked done instead of being simulated.
+
+The cache is never cleaned automatically, remove CHUNK_CACHE (or part of it) to free the space.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+
+from GateOrchestrator import manifest
+
+#######################
+###### CONSTANTS ######
+#######################
+
+MAX_SEED = 2**31 - 1 # Seeds are passed to /gate/random/setEngineSeed as a long
+PER_RUN_LINES = re.compile(r"^\s*(#|/control/echo|/gate/output/\S*setFileName|/gate/actor/\S+/save|/gate/application/setTimeStop|/run/particle/)") # Comments, paths, markers, the run end (the window is cut at the chunk end) and the physics table cache that don't change the output
+SIGNATURE_IGNORE = manifest.HASH_IGNORE | {"startTime", "endTime"}
+
+storeLock = threading.Lock()
+fileHashes = {} # (path, size, mtime): digest, so large data files are hashed once per run
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def chunkSeed(runSeed: int, start: float, stop: float) -> int:
+    """
+    Function that derives the seed of a chunk from the run seed and its time window.
+
+    Input:
+        runSeed: The seed of the run
+        start, stop: The chunk window in s
+
+    Output:
+        seed: A seed in [1, MAX_SEED)
+    """
+
+    digest = hashlib.sha256("{} {!r} {!r}".format(runSeed, float(start), float(stop)).encode()).hexdigest()
+    return 1 + int(digest, 16) % (MAX_SEED - 1)
+
+def cacheSignature(controls: dict) -> str:
+    """
+    Function that hashes every control that changes the output, except the acquisition start and end
+    time.  Runs with the same signature can share chunks.
+
+    Input:
+        controls: The simulation controls, SimulationConfig.controls()
+
+    Output:
+        signature: A short hex digest
+    """
+
+    relevant = {key: value for key, value in controls.items()
+                if not key.startswith("_") and key not in SIGNATURE_IGNORE and isinstance(value, (str, int, float, bool))}
+    return hashlib.sha1(json.dumps(relevant, sort_keys = True).encode()).hexdigest()[:16]
+
+def fileHash(path: str) -> str:
+    """
+    Function that hashes the content of a file, remembered as long as the file doesn't change.
+    """
+
+    status = os.stat(path)
+    key = (os.path.abspath(path), status.st_size, status.st_mtime)
+    if key not in fileHashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        fileHashes[key] = digest.hexdigest()
+    return fileHashes[key]
+
+def chunkKey(chunk: dict) -> str:
+    """
+    Function that computes the cache key of a chunk from its rendered macros.
+
+    Input:
+        chunk: The chunk description with the "macro" file
+
+    Output:
+        key: Hex digest of the macro lines that change the output and of the data files they name
+    """
+
+    digest = hashlib.sha256()
+    hashMacro(chunk["macro"], digest)
+    return digest.hexdigest()
+
+def hashMacro(path: str, digest) -> None:
+    """
+    Function that adds the lines of a macro that change the output to a hash, the macros it executes are
+    followed in place (the shared setup and the window of the chunk).
+
+    Input:
+        path: The macro file
+        digest: The hashlib object to update
+    """
+
+    with open(path) as f:
+        for line in f:
+            command = line.split("#")[0].split()
+            if command[:1] == ["/control/execute"]:
+                hashMacro(command[1], digest)
+                continue
+            if PER_RUN_LINES.match(line) or not command:
+                continue
+            command = [fileHash(token) if os.path.isfile(token) else token for token in command] # Data files by content, e.g. the placements slices in MACRO_FOLDER
+            digest.update(" ".join(command).encode() + b"\n")
+
+def cachedFile(cacheFolder: str, key: str) -> str:
+    return os.path.join(cacheFolder, key[:2], key + ".root")
+
+def cachedWindows(cacheFolder: str, signature: str, startTime: float, endTime: float) -> list:
+    """
+    Function that lists the cached windows of a configuration that lie inside the acquisition.
+
+    Input:
+        cacheFolder: The cache folder
+        signature: The cache signature of the configuration
+        startTime, endTime: The acquisition start and end time in s
+
+    Output:
+        windows: Sorted, non-overlapping (start, stop) tuples in s whose output is in the cache
+    """
+
+    path = os.path.join(cacheFolder, signature + ".jsonl")
+    if not os.path.exists(path):
+        return []
+    windows = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError: # A run that died mid-write leaves a broken last line
+                continue
+            if startTime <= record["start"] and record["stop"] <= endTime and os.path.exists(cachedFile(cacheFolder, record["key"])):
+                windows.add((record["start"], record["stop"]))
+
+    chosen = []
+    for window in sorted(windows):
+        if not chosen or window[0] >= chosen[-1][1]:
+            chosen.append(window)
+    return chosen
+
+def planAroundCache(startTime: float, endTime: float, nChunks: int, windows: list, planner, cost) -> list:
+    """
+    Function that keeps the cached windows and plans chunks for the time they don't cover.
+
+    Input:
+        startTime, endTime: The acquisition start and end time in s
+        nChunks: The number of chunks to plan for the uncovered time
+        windows: The cached windows from cachedWindows
+        planner: Function (start, stop, n) returning n chunks of [start, stop], e.g. costModel.planTimeChunks
+        cost: Function (start, stop) returning the estimated cost of an interval, shares out the chunks
+
+    Output:
+        chunks: Sorted (chunkStart, chunkEnd) tuples covering [startTime, endTime]
+    """
+
+    gaps = []
+    edge = startTime
+    for windowStart, windowStop in windows:
+        if windowStart > edge:
+            gaps.append((edge, windowStart))
+        edge = windowStop
+    if endTime > edge:
+        gaps.append((edge, endTime))
+
+    chunks = list(windows)
+    gapCosts = [max(cost(a, b), 0.0) for a, b in gaps]
+    totalCost = sum(gapCosts)
+    for (a, b), gapCost in zip(gaps, gapCosts):
+        share = gapCost/totalCost if totalCost > 0 else (b - a)/sum(stop - start for start, stop in gaps)
+        chunks.extend(planner(a, b, max(1, round(nChunks*share))))
+    return sorted(chunks)
+
+def restoreChunks(cacheFolder: str, manifestPath: str, runManifest: dict, chunks: list) -> list:
+    """
+    Function that links the cached outputs of chunks into place and marks them done in the manifest.
+
+    Input:
+        cacheFolder: The cache folder
+        manifestPath: The manifest file
+        runManifest: The manifest dictionary
+        chunks: The chunks that are about to run, their "cacheKey" is set
+
+    Output:
+        chunks: The chunks that still have to be simulated
+    """
+
+    remaining = []
+    for chunk in chunks:
+        chunk["cacheKey"] = chunkKey(chunk)
+        source = cachedFile(cacheFolder, chunk["cacheKey"])
+        if not os.path.exists(source):
+            remaining.append(chunk)
+            continue
+        if os.path.exists(chunk["rootFile"]):
+            os.remove(chunk["rootFile"])
+        linkOrCopy(source, chunk["rootFile"])
+        manifest.recordResult(manifestPath, runManifest, dict(chunk, returnCode = 0, wallTime = 0.0))
+        if runManifest["chunks"][chunk["index"]]["status"] != "done": # A broken cache entry, simulate it again
+            os.remove(chunk["rootFile"])
+            remaining.append(chunk)
+    print("{} of {} chunks taken from the chunk cache".format(len(chunks) - len(remaining), len(chunks)))
+    return remaining
+
+def storeChunk(cacheFolder: str, signature: str, chunk: dict) -> None:
+    """
+    Function that adds the output of a finished chunk to the cache.
+
+    Input:
+        cacheFolder: The cache folder
+        signature: The cache signature of the configuration
+        chunk: The chunk, needs "cacheKey", "rootFile", "start", "stop" and "seed"
+    """
+
+    target = cachedFile(cacheFolder, chunk["cacheKey"])
+    with storeLock:
+        if not os.path.exists(target):
+            if not os.path.exists(os.path.dirname(target)):
+                os.makedirs(os.path.dirname(target))
+            linkOrCopy(chunk["rootFile"], target + ".tmp")
+            os.replace(target + ".tmp", target)
+        with open(os.path.join(cacheFolder, signature + ".jsonl"), "a") as f:
+            f.write(json.dumps({"start": chunk["start"], "stop": chunk["stop"], "seed": chunk["seed"], "key": chunk["cacheKey"]}) + "\n")
+
+def linkOrCopy(source: str, target: str) -> None:
+    """
+    Function that hard links a file, or copies it if the two paths are on different file systems.
+    """
+
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
@@ -0,0 +1,248 @@
+"""
+Compact listmode files.  The listmode NPY files keep every column of a coincidence as float64, 64 bytes per
+LOR, and the 1 ms times as np.floor(t/0.001)*0.001 floats.  A compact file keeps the same coincidences in
+
+    positions   xA yA zA xB yB zB as float32 mm, the precision GATE computes them in (the listmode positions
+                are float32 arithmetic on the float32 leaves), so nothing is lost
+    times       tA tB as integer ticks of timeTick s: the time quantum of the product, so a 1 ms tick is
+                the floored time itself, or RAW_TICK for the raw times.  GATE writes the raw times as
+                double seconds, so they are rounded to the nearest RAW_TICK (at most half a ps off): a raw
+                compact file is not lossless, keep the NPY or ROOT file if the full doubles matter.  Ticks
+                of at least UINT32_TICK are uint32 (49 days of 1 ms ticks), finer ticks int64
+
+one column after the other behind a HEADER_BYTES JSON header with the number of rows, the layout and units
+of every column, the time tick and quantum, the face offset and the name, size and sha256 of the ROOT (or
+NPY) file it was made from.  That is 32 bytes per LOR for quantised times, half the NPY file, 40 for raw
+times.  The columns are read on demand (memory mapped), CompactListmode expands any range of rows to the
+listmode array, for quantised times the same float64 values the NPY file has, for raw times the values
+rounded to RAW_TICK:
+
+    lors = CompactListmode("NPYOutput/1ms/NAME.lmc")
+    t = lors.ticks("tA")                # uint32 ms, mapped not read
+    rows = lors.listmode(0, 1000000)    # (1000000, 8) float64, as np.load of the NPY file
+    rows = loadListmode(path)           # the whole array, from a compact or an NPY file
+
+The files are written by CompactWriter, which has the interface of listmode.ListmodeWriter, so the
+listmode conversion writes them straight from the ROOT file (see listmode.py, --compact).
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import json
+import os
+
+import numpy as np
+
+from GateOrchestrator import chunkCache
+
+#######################
+###### CONSTANTS ######
+#######################
+
+MAGIC = b"GATE_HR LMC\n" # First bytes of a compact listmode file
+VERSION = 1
+HEADER_BYTES = 4096 # The JSON header is padded to this, so the columns are aligned and the source can be filled in later
+EXTENSION = ".lmc"
+NAMES = ("xA", "yA", "zA", "xB", "yB", "zB", "tA", "tB") # The columns, in the order of the listmode array
+POSITIONS = 6 # The first POSITIONS columns are positions in mm, the rest times
+POSITION_TYPE = "<f4"
+RAW_TICK = 1e-12 # s, raw times (double s in the ROOT file) are rounded to these ticks, at most 0.5 ps off
+UINT32_TICK = 1e-3 # s, ticks at least this long are stored as uint32, 2**32 of them cover 49 days
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def timeTick(timeQuantum: float) -> float:
+    return RAW_TICK if timeQuantum is None else timeQuantum
+
+def tickType(tick: float) -> str:
+    return "<u4" if tick >= UINT32_TICK else "<i8"
+
+def rowBytes(timeQuantum: float) -> int:
+    return POSITIONS*np.dtype(POSITION_TYPE).itemsize + (len(NAMES) - POSITIONS)*np.dtype(tickType(timeTick(timeQuantum))).itemsize
+
+def newHeader(rows: int, timeQuantum: float, faceOffset: float, source: dict = None) -> dict:
+    """
+    Function that lays out a compact listmode file.
+
+    Input:
+        rows: The number of coincidences
+        timeQuantum: s the times were floored to, None for the raw times
+        faceOffset: mm the positions were moved radially
+        source: The file the rows were made from, see sourceInfo
+
+    Output:
+        header: Dictionary with the "rows", the "columns" ("name", "dtype", "unit" and byte "offset" of
+                each), the "timeTick", "timeQuantum", "faceOffset" and "source"
+    """
+
+    tick = timeTick(timeQuantum)
+    columns = []
+    offset = HEADER_BYTES
+    for i, name in enumerate(NAMES):
+        dtype = POSITION_TYPE if i < POSITIONS else tickType(tick)
+        columns.append({"name": name, "dtype": dtype, "unit": "mm" if i < POSITIONS else "tick", "offset": offset})
+        offset += int(rows)*np.dtype(dtype).itemsize
+    return {"version": VERSION, "rows": int(rows), "columns": columns, "timeTick": tick, "timeUnit": "s", "timeQuantum": timeQuantum, "faceOffset": faceOffset, "source": source}
+
+def writeHeader(f, header: dict) -> None:
+    text = json.dumps(header).encode()
+    if len(MAGIC) + len(text) + 1 > HEADER_BYTES:
+        raise ValueError("The compact listmode header is longer than {} bytes".format(HEADER_BYTES))
+    f.seek(0)
+    f.write(MAGIC + text + b"\n" + b" "*(HEADER_BYTES - len(MAGIC) - len(text) - 1))
+
+def readHeader(path: str) -> dict:
+    """
+    Function that reads the header of a compact listmode file, None if it isn't one.
+    """
+
+    with open(path, "rb") as f:
+        start = f.read(HEADER_BYTES)
+    if not start.startswith(MAGIC):
+        return None
+    header = json.loads(start[len(MAGIC):].decode())
+    if header.get("version") != VERSION:
+        raise ValueError("{} is a compact listmode file of version {}, this reads version {}".format(path, header.get("version"), VERSION))
+    return header
+
+def isCompact(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def sourceInfo(path: str) -> dict:
+    return {"file": os.path.basename(path), "bytes": os.path.getsize(path), "sha256": chunkCache.fileHash(path)}
+
+def setSource(path: str, source: dict) -> None:
+    """
+    Function that records the source of a compact listmode file written before its hash was known.
+    """
+
+    header = readHeader(path)
+    header["source"] = source
+    with open(path, "r+b") as f:
+        writeHeader(f, header)
+
+def loadListmode(path: str) -> np.ndarray:
+    """
+    Function that loads the (coincidences, 8) float64 listmode array of a compact or an NPY listmode file.
+    """
+
+    return CompactListmode(path).listmode() if isCompact(path) else np.load(path)
+
+#####################
+###### CLASSES ######
+#####################
+
+class CompactWriter:
+    """
+    Preallocated compact listmode file that is written a block of rows at a time, as ListmodeWriter.
+
+        with CompactWriter(path, rows, timeQuantum, faceOffset, source) as writer:
+            writer.write(firstRow, block)
+
+    Input:
+        path: The file
+        rows: The number of rows, the file is created (overwritten).  None opens a file created before,
+              e.g. to write another range of its rows
+        timeQuantum, faceOffset, source: As in newHeader, only used to create the file
+    """
+
+    def __init__(self, path: str, rows: int = None, timeQuantum: float = 0.001, faceOffset: float = -5.0, source: dict = None):
+        if rows is None:
+            self.header = readHeader(path)
+            self.file = open(path, "r+b")
+        else:
+            self.header = newHeader(rows, timeQuantum, faceOffset, source)
+            self.file = open(path, "w+b")
+            writeHeader(self.file, self.header)
+            last = self.header["columns"][-1]
+            self.file.truncate(last["offset"] + self.header["rows"]*np.dtype(last["dtype"]).itemsize)
+        self.path = path
+        self.tick = self.header["timeTick"]
+
+    def write(self, start: int, block: np.ndarray) -> None:
+        """
+        Writes the (n, 8) float64 listmode rows of block as rows start to start + n, the times as ticks.
+        """
+
+        for i, column in enumerate(self.header["columns"]):
+            dtype = np.dtype(column["dtype"])
+            if i < POSITIONS:
+                values = block[:, i].astype(dtype)
+            else:
+                ticks = np.rint(block[:, i]/self.tick)                                                              # Quantised times are whole ticks already
+                if len(ticks) and (ticks.min() < np.iinfo(dtype).min or ticks.max() > np.iinfo(dtype).max):
+                    raise ValueError("The times of {} don't fit {} ticks of {} s".format(self.path, dtype, self.tick))
+                values = ticks.astype(dtype)
+            self.file.seek(column["offset"] + start*dtype.itemsize)
+            self.file.write(values.tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+class CompactListmode:
+    """
+    Compact listmode file, its columns are memory mapped and only read when used.
+
+    Input:
+        path: The file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = readHeader(path)
+        if self.header is None:
+            raise ValueError("{} is not a compact listmode file".format(path))
+        self.rows = self.header["rows"]
+        self.tick = self.header["timeTick"]
+        self.columns = {column["name"]: column for column in self.header["columns"]}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns a column as stored (positions float32 mm, times integer ticks), memory mapped.
+        """
+
+        column = self.columns[name]
+        if self.rows == 0:
+            return np.zeros(0, dtype = column["dtype"])
+        return np.memmap(self.path, dtype = column["dtype"], mode = "r", offset = column["offset"], shape = (self.rows,))
+
+    def ticks(self, name: str = "tA") -> np.ndarray:
+        return self.column(name)
+
+    def times(self, name: str = "tA", start: int = 0, stop: int = None) -> np.ndarray:
+        return self.column(name)[start:stop].astype(np.float64)*self.tick # For quantised times the floats of np.floor(t/quantum)*quantum
+
+    def listmode(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        Expands rows start to stop into the (rows, 8) float64 listmode array of the NPY files.
+        """
+
+        stop = self.rows if stop is None else min(stop, self.rows)
+        rows = np.empty((max(0, stop - start), len(NAMES)), dtype = np.float64)
+        for i, name in enumerate(NAMES):
+            rows[:, i] = self.column(name)[start:stop] if i < POSITIONS else self.times(name, start, stop)
+        return rows
+
+    def blocks(self, blockRows: int = 1 << 20):
+        """
+        Yields (first row, (rows, 8) float64 array) of every blockRows rows, as listmode.readBlocks.
+        """
+
+        for start in range(0, self.rows, blockRows):
+            yield start, self.listmode(start, start + blockRows)
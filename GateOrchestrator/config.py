@@ -0,0 +1,552 @@
+"""
+Typed configuration of the HR++ simulation.  Every control of the Siemens_ECAT_HR++_*.py scripts is a field
+of SimulationConfig, with the validated values as defaults, so a script only sets the controls that differ
+(folders, tracer, activity, times and motion).  A config file of control: value pairs (YAML, TOML or JSON)
+can be laid over the script's settings,
+
+    python3 Siemens_ECAT_HR++_GeneralMotion.py --config tracer200.yaml
+
+    tracerSize: 200
+    sourceActivity1: "16483500 Bq"
+    endTime: 0.5
+
+Every value is checked against the type of its control, so a misspelt control or a number where GATE
+expects a quantity string ("150 um") fails before any macro is written.  Controls derived from others,
+the radii of the layered tracer from tracerSize and the files kept in ROOT_FOLDER, are properties and
+follow the control they are derived from.  A config is frozen, use replace to change controls.
+
+Required Packages: None (standard library)
+Optional Packages: PyYAML (YAML files), tomllib (TOML files, Python 3.11+)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import dataclasses
+import json
+import os
+import typing
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+PHYSICS_PRESETS = { # The physics list, the cuts in the crystals and the cuts and step limit of phantom 2, "controls" takes them from the controls, None leaves them to GATE (1 mm cuts, no step limit)
+    "validated": {"physicsList": "emstandard_opt4", "crystalCuts": None, "phantomCut": "controls", "phantomMaxStepSize": "controls"},
+    "balanced": {"physicsList": "emstandard_opt4", "crystalCuts": "controls", "phantomCut": "controls", "phantomMaxStepSize": "0.05 mm"},
+    "throughput": {"physicsList": "emstandard", "crystalCuts": "controls", "phantomCut": "1.0 mm", "phantomMaxStepSize": None},
+}
+CHOICES = {"geometryTier": ("full", "fast"), "physicsPreset": tuple(PHYSICS_PRESETS), "sourceMode": ("positron", "backtoback")} # Controls that only take some values
+
+#####################
+###### CLASSES ######
+#####################
+
+@dataclasses.dataclass(frozen = True)
+class SimulationConfig:
+    """
+    The controls of one simulation.  Optional controls may also be set to None.
+    """
+
+    # FILE CONTROLS
+    NAME: str = "GATE_Multiprocess" # Doesn't do anything anymore 
+    DIR: str = "/home/rayhaan/REPO_HR++/GATE_HR/" # Doesn't do anything anymore
+    MACRO_FOLDER: str = "/home/rayhaan/REPO_HR++/GATE_HR/MacroDir/" # The folder where to store the macro files for multiprocessing, temporary, will be removed afterwards
+    ROOT_FOLDER: str = "/home/rayhaan/REPO_HR++/GATE_HR/processOut/" # The folder to store the output root files from multiprocessing, temporary, will be removed afterwards
+    SCRATCH: typing.Optional[str] = "$TMPDIR:/dev/shm:/tmp" # Node local folders (":" separated) MACRO_FOLDER and ROOT_FOLDER are moved to for the run, the first with room for the planned output.  None to keep them where they are
+    OUTPUT_ROOT: str = "/home/rayhaan/REPO_HR++/GATE_HR/Output/" # Folder to write final output root file
+    COST_HISTORY: str = "/home/rayhaan/REPO_HR++/GATE_HR/chunkHistory.jsonl" # Chunk wall times of earlier runs, used to plan the chunk sizes.  Keep it between runs
+    CHUNK_CACHE: typing.Optional[str] = "/home/rayhaan/REPO_HR++/GATE_HR/chunkCache/" # Outputs of finished chunks, reused by later runs of the same configuration.  None to switch the cache off
+    PHYSICS_TABLES: typing.Optional[str] = "/home/rayhaan/REPO_HR++/GATE_HR/physicsTables/" # Geant4 physics tables of earlier runs, one folder per physics and material set, read by every GATE process.  None to switch the cache off
+    GOVERNOR_CONFIG: str = "/home/rayhaan/REPO_HR++/GATE_HR/governor.cfg" # Per-user process cap and load limits of the server, see GateOrchestrator/governor.py.  Defaults are used if it doesn't exist
+    OUTPUT_ROOT_FILE_NAME: str = "testStationary_XYZ_20_20_20_mm_1mCi_1s_NRW-100_68Ga.root" # The output root file name 
+    OUTPUT_NPY: typing.Optional[str] = None # Folder to write the listmode *.npy of the run to (named like the output root file), converted from every chunk as it finishes, see GateOrchestrator/listmode.py.  None to only write the root file
+
+    # CORE CONTROLS
+    cores: typing.Optional[int] = None # Upper limit on the GATE processes that run at the same time, None lets the governor decide from the CPUs, load, free memory and GOVERNOR_CONFIG
+    chunksPerCore: int = 4 # How many time chunks per core the acquisition is cut into.  More chunks balance out slow chunks better but every chunk pays the GATE start up time
+    persistentWorkers: bool = True # Each GATE process initialises once and simulates the time windows of several chunks, so only the first chunk of a process pays the start up time
+
+    # LISTMODE CONTROLS
+    mergeRoot: bool = True # Merge the chunks into the output root file.  False only writes the listmode file of OUTPUT_NPY
+    listmodeTimeQuantum: typing.Optional[float] = 0.001 # s the listmode times are floored to, as listmode_ROOT2NPY_1ms.py.  None keeps the raw times, as listmode_ROOT2NPY_raw.py
+    listmodeFaceOffset: float = -5.0 # mm the listmode positions are moved radially, -5.0 moves them to the face of the crystals
+    listmodeCompact: bool = False # Write OUTPUT_NPY/<name>.lmc, float32 positions and integer time ticks (half the size), instead of the float64 npy, see GateOrchestrator/compactListmode.py
+
+    # MACRO CONTROLS
+    # TRACER SIZE
+    tracerSize: int = 150 # Tracer Radius 
+
+    #   GEOMETRY TIER
+    geometryTier: str = "full" # "full" is the validated HR++ model, "fast" keeps the crystals and replaces the PMTs of every block by one glass back layer, for quick scans
+
+    #   WORLD
+    worldXLength: str = "1.1 m" 
+    worldYLength: str = "1.1 m"
+    worldZLength: str = "30. cm"
+    worldMaterial: str = "Air"
+
+    #   PEPT GEOMETRY
+    # CPET
+    CPETcylinderMaterial: str = "Air"
+    CPETcylinderMaxRadius: str = "500.0 mm"
+    CPETcylinderMinRadius: str = "420.0 mm"
+    CPETclyinderHeight: str = "23.4 cm"
+
+    # Sector
+    sectorMaterial: str = "Air"
+    sectorTranslation: str = "0.0 0.0 0.0 mm"
+    sectorMaxRadius: str = "500.0 mm"
+    sectorMinRadius: str = "420.0 mm"
+    sectorHeight: str = "23.4 cm"
+    sectorPhiStart: str = "-5.0 deg"
+    sectorDeltaPhi: str = "5 deg"
+
+    # Sector Repeater
+    sectorRepeatType: str = "ring"
+    sectorRepeatNo: str = "72"
+    # sectorRepeatExclude1 = "7"   # To model the missing buckets in the validation data.  Leave in for general use.  
+    # sectorRepeatExclude2 = "11"  #
+
+    # Casette
+    cassetteMaterial: str = "Air"
+    cassetteTranslation: str = "0.0 0.0 0.0 mm"
+    cassetteMaxRadius: str = "500.0 mm"
+    cassetteMinRadius: str = "420.0 mm"
+    cassetteHeight: str = "23.4 cm"
+    cassettePhiStart: str = "-5.0 deg"
+    cassetteDeltaPhi: str = "5 deg"
+
+    # block 
+    blockMaterial: str = "Air"
+    blockTranslation: str = "459.5621819276546 -20.06491818805456 0.0 mm"
+    blockRotationAxis: str = "0 0 1"
+    blockRotationAngle: str = "-2.5 deg"
+    blockXLength: str = "80.0 mm"
+    blockYLength: str = "35.62 mm"
+    blockZLength: str = "38.34 mm"
+
+    # block repeat
+    blockRepeatType: str = "linear"
+    blockRepeatNo: str = "6"
+    blockRepeatVector: str = "0.0 0.0 39.132 mm"
+
+    # crystal 
+    crystalMaterial: str = "BGO"
+    crystalXLength: str = "30.0 mm"
+    crystalYLength: str = "4.05 mm"
+    crystalZLength: str = "4.39 mm"
+    crystalTranslation: str = "-25.0 0.0 0.0 mm"
+
+    # crystal repeat
+    crystalRepeatType: str = "cubicArray"
+    crystalRepeatX: str = "1"
+    crystalRepeatY: str = "8"
+    crystalRepeatVector: str = "0. 4.61 4.85 mm"
+
+    # PMT outer layer
+    pmtOuterMaterial: str = "Borosilicate-Glass"
+    pmtOuterTranslation: str = "15.0 0.0 0.0 mm"
+    pmtOuterRadiusMax: str = "8.79 mm"
+    pmtOuterRadiusMin: str = "7.79 mm"
+    pmtOuterHeight: str = "50.0 mm"
+
+    # PMT outer layer repeater
+    pmtOuterRepeaterType: str = "cubicArray"
+    pmtOuterRepeaterX: str = "1"
+    pmtOuterRepeaterY: str = "2"
+    pmtOuterRepeaterZ: str = "2"
+    pmtOuterRepeaterVector: str = "0.0 18.04 18.94 mm"
+
+    # PMT inner layer
+    pmtInnerMaterial: str = "Vacuum"
+    pmtInnterTranslation: str = "0.0 0.0 0.0 mm"
+    pmtInnerRadiusMax: str = "7.79 mm"
+    pmtInnerRadiusMin: str = "0.00 mm"
+    pmtInnerHeight: str = "48.0 mm"
+
+    # PMT top cap
+    pmtCapMaterial: str = "Borosilicate-Glass"
+    pmtTCTranslation: str = "0.0 0.0 24.5 mm"
+    pmtBCTranslation: str = "0.0 0.0 -24.5 mm"
+    pmtCapRadiusMax: str = "7.79 mm"
+    pmtCapRadiusMin: str = "0.00 mm"
+    pmtCapHeight: str = "1.0 mm"
+
+    # Phantom name
+    phantomName1: str = "phantom1"
+    activatePhantom2: bool = False
+    phantomName2: str = "phantom2"
+
+    # cylinder phantom 1
+    cylinderPhantom1: bool = False
+    cylinderPhantomRadiusMin1: str = "0.0 cm"
+    cylinderPhantomRadiusMax1: str = "5.0 mm"
+    cylinderPhantomHeight1: str = "11.5 mm"
+    cylinderPhantomMaterial1: str = "PMMA"
+    cylinderPhantomTranslation1: str = "-45.83 55.10 -4.15 mm" # 4.75
+
+    # NRW-100 phantom 1 
+    nrwPhantom1: bool = False
+    nrwPhantomRadiusMin1: str = "0.0 um"
+    nrwPhantomMaterial1: str = "Nrw-mat"
+    nrwPhantomTranslation1: str = "-400.0 -400.0 -85.0 mm"
+
+    # More complex NRW-100 tracer/phantom
+    nrwPhantomShell1: bool = True
+    nrwPhantomShell1FullRmin: str = "0.0 um"
+    nrwPhantomShell1Material: str = "CyanoAcrylate"
+    nrwPhantomShell1Translation: str = "20.0 20.0 20.0 mm" # Tracer location.  NB VERY IMPORTANT !!!.  This doesn't matter when you input a placements file
+    # Don't touch below, the radii of the layers follow tracerSize (see the properties below)
+    #With Above
+    nrwPhantomSilicaMaterial: str = "Quartz"
+    # With Above
+    nrwPhantomTracerRmin: str = " 0.0 um"
+    nrwPhantomTracerMaterial: str = "Nrw-mat"
+    #With Above
+    nrwPhantomTracerForbidRmin: str = "0.0 um"
+    nrwPhantomTracerForbidMaterial: str = "Nrw-mat"
+
+    # cylinder phantom 2
+    cylinderPhantom2: bool = False
+    cylinderPhantomRadiusMin2: str = "0.0 cm"
+    cylinderPhantomRadiusMax2: str = "5.0 mm"
+    cylinderPhantomHeight2: str = "11.5 mm"
+    cylinderPhantomMaterial2: str = "PMMA"
+    cylinderPhantomTranslation2: str = "0.00 70.00 0.00 mm"
+
+    # NRW-100 phantom 2
+    nrwPhantom2: bool = False
+    nrwPhantomRadiusMax2: str = "50.0 um"
+    nrwPhantomRadiusMin2: str = "0.0 um"
+    nrwPhantomMaterial2: str = "Nrw-mat"
+    nrwPhantomTranslation2: str = "100.00 100.00 40.00 mm"
+
+    # STL phantom
+    stlPhantom: bool = False
+    stlPhantomTranslation: str = "0.00 0.00 0.00 mm"
+    stlPhantomPath: str = "./data/smallTubeCone.stl"
+    stlPhantomMaterial: str = "PMMA"
+    stlPhantomColour: str = "red"
+
+    # Voxel phantom
+    voxelPhantom: bool = False
+    voxelPhantomType: str = "ImageNestedParametrisedVolume"
+    voxelPhantomImageLocation: str = "data/bubbleTest.hdr"
+    voxelPhantomMaterial: str = "data/AttenuationRange.dat"
+    voxelPhantomTranslation: str = "0.0 0.0 0.0 mm"
+    voxelPhantomRotationAxis: str = "1 0 0"
+    voxelPhantomRotationAngle: str = "0 deg"
+
+    # cylinderMaterial = "{}".format(Media[iv])
+    # cylinderRadMax = "300.0 mm"
+    # cylinderRadMin = "0.0 mm"
+    # CylinderHeight = "230.0 mm"
+
+    # Moving Phantom Controls
+    movePhantom1: bool = False
+    movePhantom2: bool = False
+
+    #   MOTION 1
+    # Generic Motion
+    genericMotion1: bool = False
+    genericMotionFileName1: str = "SomeFileInData.placements"
+    # linear Motion
+    linearMotion1: bool = False
+    linearMotionSpeed1: str = "400.0 400.0 85.0 mm/s"
+
+    # orbiting motion
+    orbitingMotion1: bool = False
+    orbitingMotionSpeed1: str = "382.278222 deg/s"
+    orbitingMotionSetPoint11: str = "-1.30 -0.54 -1.0 mm"
+    orbitingMotionSetPoint21: str = "-1.30 -0.54 1.0 mm"
+
+    # oscilating motion
+    oscilatingMotion1: bool = False
+    oscilatingMotionAmplitude1: str = "0.0 0.0 0.54 mm"
+    oscilatingMotionFrequency1: str = "1.06 Hz"
+    oscilatingMotionSetPhase1: str = "-1.28 rad" # 2.18
+
+    #   MOTION 2
+    # Generic Motion
+    genericMotion2: bool = False
+    genericMotionFileName2: str = "PresentationTurbulentPath.placements"
+
+    # linear Motion
+    linearMotion2: bool = False
+    linearMotionSpeed2: str = "-400.0 -400.0 -85.0 mm/s"
+
+    # orbiting motion
+    orbitingMotion2: bool = False
+    orbitingMotionSpeed2: str = "1800.0  deg/s"
+    orbitingMotionSetPoint12: str = "0.0 0.0 -1.0 mm"
+    orbitingMotionSetPoint22: str = "0.0 0.0 1.0 mm"
+
+    # oscilating motion
+    oscilatingMotion2: bool = False
+    oscilatingMotionAmplitude2: str = "0.0 0.44211748 0.0 mm"
+    oscilatingMotionFrequency2: str = "0.42317 Hz"
+    oscilatingMotionSetPhase2: str = "3.14159265359 rad"
+
+    #   PHYSICS AND PRODUCTION CUTS
+    physicsPreset: str = "validated" # "validated" is the physics of the validated model, "balanced" adds the crystal cuts and a 0.05 mm step limit in phantom 2, "throughput" uses emstandard (opt0) physics without phantom step limits, see PHYSICS_PRESETS
+
+    # crystal cuts
+    crystalGammaCut: str = "crystal 1.0 cm"
+    crystalElectronCut: str = "crystal 1.0 cm"
+    crystalPositronCut: str = "crystal 1.0 cm"
+
+    #   PHANTOM CUTS
+    # phantom cuts 1
+    phantomGammaCut1: str = "phantom1 0.1 mm"
+    phantomElectronCut1: str = "phantom1 0.1 mm"
+    phantomPositronCut1: str = "phantom1 0.1 mm"
+    phantomMaxStepSize1: str = "phantom1 0.01 mm"
+
+    phantomGammaCut2: str = "phantom2 0.1 mm"
+    phantomElectronCut2: str = "phantom2 0.1 mm"
+    phantomPositronCut2: str = "phantom2 0.1 mm"
+    phantomMaxStepSize2: str = "phantom2 0.01 mm"
+
+    #   DIGITISER
+    # readout
+    readoutDepth: str = "1"
+    readoutPolicy: str = "TakeEnergyCentroid"
+
+    # energy blurring
+    energyBlurringMinRes: str = "0.20"
+    energyBlurringMaxRes: str = "0.30"
+    energyBlurringQE: str = "0.88"
+    energyBlurringReferenceEnergy: str = "511.0 keV"
+
+    # energy cuts
+    energyCutThreshold: str = "350.0 keV"
+    energyCutUphold: str = "650.0 keV"
+
+    # timing resolution
+    timingResolution: str = "2.0 ns"
+
+    # noise
+    NOISE: bool = False
+    NoiseEnergyMean: str = "511 keV"
+    NoiseEnergySigma: str = "0.35 keV"
+    NoiseLambda: str = "1.85 us" # 0.85
+
+    # deadtime
+    deadtimeValue: str = "700.0 ns"
+    deadtimeMode: str = "paralysable"
+    deadtimeVolume: str = "block"
+
+    # coincidence sorter
+    coincidenceWindow: str = "12. ns"
+    coincidenceWindowOffset: str = "0.0 ns"
+    coincidenceWindowMineSectorDifference: str = "19"
+    coincidenceWindowPolicy: str = "keepIfAnyIsGood"
+
+    # delayed coincidence sorter
+    delayedWindow: str = "64000.0 ns"
+    delayedWindowOffset: str = "12.0 ns"
+
+    #   SOURCES
+    sourceMode: str = "positron" # "positron" tracks the positrons of the isotope spectra, "backtoback" emits the 511 keV pairs directly, far faster, for tracking algorithm development (see positronRange.py)
+    positronRangeKernel: bool = False # With sourceMode = "backtoback", start the pairs where the positrons of the isotope would annihilate instead of where they are emitted
+    positronRangeDensity: float = 1.0 # Density in g/cm3 of the medium the positrons slow down in, for the kernel
+
+    # Source 1
+    ga68source1: bool = False
+    ga68sourceSphere1: bool = True # For the complex NRW-100 tracer
+    na22source1: bool = False
+    f18source1: bool = False
+    sourceActivity1: str = "32967000 Bq" # Activity of tracer.  Correct for electron capture!!!  
+    sourceAttach1: str = "nrw100Tracer"
+    sourceForbid1: str = "nrw100TracerForbid"
+
+    # Source 2
+    ga68source2: bool = False
+    na22source2: bool = False
+    f18source2: bool = False
+    sourceActivity2: str = "16483500 Bq"
+    sourceAttach2: str = "phantom2"
+
+    # Voxel Source, don't bother with this if you can help it.  A bit complex to use.  
+    voxelSource: bool = False
+    voxelSourcePixel2Activity: str = "data/ActivityRange.dat"
+    voxelSourceImage: str = "data/bubbleTest.hdr"
+    voxelSourcePosition: str = "-128.0 -128.0 -100.0 mm"
+    voxelSourceType: str = "backtoback"
+    voxelSourceParticle: str = "gamma"
+    voxelSourceParticleEnergyType: str = "Mono"
+    voxelSourceParticleEnergy: str = "511.0 keV"
+    voxelSourceAngularDist: str = "iso"
+
+    #   TIMING CONTROLS
+    startTime: float = 0.0 # Simulation start time in s
+    endTime: float = 1.0 # Sim end time in s
+    timeStep: str = "auto" # "auto" chooses the time slice from the motion (see timeSlicing.py), or a fixed slice e.g. "0.000001 s"
+    motionTolerance: str = "0.01 mm" # With timeStep = "auto", how far a moving phantom may get from its path within one time slice
+    runSeed: int = 1 # Every chunk gets its own seed derived from this and its time window, change it for an independent repeat of the run
+
+
+    def __post_init__(self):
+        for field in dataclasses.fields(self):
+            object.__setattr__(self, field.name, checkValue(field.name, getattr(self, field.name), field.type))
+        for name, choices in CHOICES.items():
+            if getattr(self, name) not in choices:
+                raise TypeError("The control {} has to be one of {}, got {!r}".format(name, ", ".join(choices), getattr(self, name)))
+        if not self.mergeRoot and not self.OUTPUT_NPY:
+            raise TypeError("The control mergeRoot can only be False with OUTPUT_NPY set, the run would write no output")
+
+    # Derived controls, don't touch
+    @property
+    def RUN_MANIFEST(self) -> str:
+        return self.ROOT_FOLDER + "manifest.json" # Records the state of every chunk so a failed run can be resumed, removed with ROOT_FOLDER once merged
+
+    @property
+    def RUNNING_MERGE(self) -> str:
+        return self.ROOT_FOLDER + "merged.root" # Finished chunks are merged into this file while the run goes on, moved to OUTPUT_ROOT at the end
+
+    @property
+    def LOG_FOLDER(self) -> str:
+        return self.ROOT_FOLDER + "logs/" # The GATE output of every chunk and progress.txt with the run progress, removed with ROOT_FOLDER once merged
+
+    @property
+    def crystalRepeatZ(self) -> str:
+        return self.crystalRepeatY
+
+    @property
+    def nrwPhantomRadiusMax1(self) -> str:
+        return "{} um".format(self.tracerSize)
+
+    @property
+    def nrwPhantomShell1FullRmax(self) -> str:
+        return "{} um".format(self.tracerSize + 85)
+
+    @property
+    def nrwPhantomSilicaRmin(self) -> str:
+        return "{} um".format(self.tracerSize)
+
+    @property
+    def nrwPhantomSilicaRmax(self) -> str:
+        return "{} um".format(self.tracerSize + 25)
+
+    @property
+    def nrwPhantomTracerRmax(self) -> str:
+        return "{} um".format(self.tracerSize)
+
+    @property
+    def nrwPhantomTracerForbidRmax(self) -> str:
+        return "{} um".format(self.tracerSize - 10)
+
+    @property
+    def sourceActivity1Radius(self) -> str:
+        return "{} um".format(self.tracerSize)
+
+    def replace(self, **changes) -> "SimulationConfig":
+        """
+        Returns a copy of the config with some controls changed.
+
+        Input:
+            changes: Control name: new value
+
+        Output:
+            config: The new config, the values are type checked
+        """
+
+        unknown = sorted(set(changes) - set(controlNames()))
+        if unknown:
+            raise KeyError("Unknown controls {}".format(", ".join(unknown)))
+        return dataclasses.replace(self, **changes)
+
+    def controls(self) -> dict:
+        """
+        Returns the controls as a dictionary, used for the configuration hashes.
+        """
+
+        return {field.name: getattr(self, field.name) for field in dataclasses.fields(self)}
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def controlNames() -> list:
+    return [field.name for field in dataclasses.fields(SimulationConfig)]
+
+def checkValue(name: str, value, fieldType):
+    """
+    Function that checks the value of a control against its type.
+
+    Input:
+        name: The control name
+        value: The value
+        fieldType: The type of the control, str, int, float or bool, typing.Optional of one allows None
+
+    Output:
+        value: The value, ints are converted to float for float controls
+    """
+
+    if typing.get_origin(fieldType) is typing.Union:
+        if value is None:
+            return value
+        fieldType = [option for option in typing.get_args(fieldType) if option is not type(None)][0]
+    if fieldType is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, fieldType) or (fieldType is int and isinstance(value, bool)):
+        raise TypeError("The control {} has to be of type {}, got {!r}".format(name, fieldType.__name__, value))
+    return value
+
+def loadSettings(path: str) -> dict:
+    """
+    Function that reads a YAML, TOML or JSON settings file.
+
+    Input:
+        path: The file, *.yaml, *.yml, *.toml or *.json
+
+    Output:
+        settings: The dictionary in the file
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".yaml", ".yml"):
+        if yaml is None:
+            raise RuntimeError("Reading {} needs PyYAML, pip3 install pyyaml".format(path))
+        with open(path) as f:
+            settings = yaml.safe_load(f)
+    elif extension == ".toml":
+        if tomllib is None:
+            raise RuntimeError("Reading {} needs Python 3.11 or newer (tomllib)".format(path))
+        with open(path, "rb") as f:
+            settings = tomllib.load(f)
+    elif extension == ".json":
+        with open(path) as f:
+            settings = json.load(f)
+    else:
+        raise ValueError("Unknown settings file type '{}', use .yaml, .toml or .json".format(extension))
+    return settings or {}
+
+def loadConfig(path: str, base: SimulationConfig = None) -> SimulationConfig:
+    """
+    Function that lays a config file over a config.
+
+    Input:
+        path: The config file of control: value pairs
+        base: The config to start from, None for the defaults
+
+    Output:
+        config: The config with the controls of the file set
+    """
+
+    try:
+        return (base or SimulationConfig()).replace(**loadSettings(path))
+    except (KeyError, TypeError) as error:
+        raise ValueError("{}: {}".format(path, error.args[0]))
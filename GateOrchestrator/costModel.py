@@ -0,0 +1,311 @@
+"""
+Cost model used to plan the time chunks of a run before any macros are written.  The simulation cost of
+a time interval is modelled as
+
+    wall time = overhead*firstWindow + perDecay*decays + perKeyframe*keyframes + perSlice*slices
+
+where firstWindow is 1 for a chunk that started its GATE process (and paid the initialisation) and 0 for a
+window a persistent worker simulated after an earlier one, decays is the expected number of decays of the
+active sources in the interval (activity and forced half-life), keyframes is the number of placements
+keyframes that fall in the interval and slices is the number of GATE time slices (geometry updates).  The chunk edges are placed so that every chunk has about
+the same cost.  The coefficients start from rough priors and are refit from the per-chunk wall times of
+earlier runs with the same configuration signature, so repeated sweeps get better plans over time.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import hashlib
+import json
+import os
+import numpy as np
+
+#######################
+###### CONSTANTS ######
+#######################
+
+HALF_LIVES = {"ga68": 4062.6, "f18": 6586.26, "na22": 8.199e+7} # Forced half lives (s) used in the source macros
+
+UNITS = {
+    "s": 1.0, "ms": 1e-3, "us": 1e-6, "ns": 1e-9,
+    "Bq": 1.0, "kBq": 1e3, "MBq": 1e6, "GBq": 1e9,
+    "Ci": 3.7e10, "mCi": 3.7e7, "uCi": 3.7e4,
+    "mm": 1.0, "um": 1e-3, "cm": 10.0, "m": 1e3,
+}
+
+PRIOR_COEFFICIENTS = {"overhead": 30.0, "perDecay": 1e-4, "perKeyframe": 1e-3, "perSlice": 2e-5} # Rough guesses (s), replaced by fits to the history
+FEATURES = {"decays": "perDecay", "keyframes": "perKeyframe", "slices": "perSlice"} # Feature name: coefficient name
+MIN_RECORDS = 8 # Fewer matching history records than this and the priors are used
+OUTPUT_COUNTS = ("fileSize", "entries", "delays") # Output of a chunk kept in the history, see manifest.checkChunk
+STATISTICS = ("primaries", "tracks", "cpuTime") # GATE counts and CPU time of a chunk kept in the history, see runReport.py
+MAX_RECORDS = 5000 # Only the most recent records are used in the fit
+RIDGE = 1.0 # How strongly the fit is pulled towards the priors when the features are nearly collinear
+
+# Controls that don't change the cost per decay, keyframe or slice, they are left out of the signature
+SIGNATURE_IGNORE = {
+    "NAME", "DIR", "MACRO_FOLDER", "ROOT_FOLDER", "SCRATCH", "OUTPUT_ROOT", "OUTPUT_ROOT_FILE_NAME", "OUTPUT_NPY", "COST_HISTORY", "CHUNK_CACHE", "PHYSICS_TABLES", "GOVERNOR_CONFIG", "RUN_MANIFEST", "RUNNING_MERGE", "LOG_FOLDER",
+    "cores", "chunksPerCore", "mergeRoot", "listmodeTimeQuantum", "listmodeFaceOffset", "listmodeCompact", "startTime", "endTime", "runSeed", "sourceActivity1", "sourceActivity2",
+    "genericMotionFileName1", "genericMotionFileName2",
+}
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def parseQuantity(text: str) -> float:
+    """
+    Function that converts a GATE style quantity, e.g. "32967000 Bq" or "0.000001 s", to a float in
+    base units (Bq, s, mm).
+
+    Input:
+        text: The value and unit separated by white space
+
+    Output:
+        value: The value in base units
+    """
+
+    parts = text.split()
+    if len(parts) == 1:
+        return float(parts[0])
+    if parts[-1] not in UNITS:
+        raise ValueError("Unknown unit in '{}'".format(text))
+    return float(parts[0])*UNITS[parts[-1]]
+
+def activeSources(controls: dict) -> list:
+    """
+    Function that lists the active radioactive sources of a simulation.
+
+    Input:
+        controls: The simulation controls, SimulationConfig.controls()
+
+    Output:
+        sources: List of (activity at t = 0 in Bq, half life in s) tuples
+    """
+
+    sources = []
+    activity1 = parseQuantity(controls["sourceActivity1"])
+    if controls["ga68source1"] or controls["ga68sourceSphere1"]:
+        sources.append((activity1, HALF_LIVES["ga68"]))
+    if controls["f18source1"]:
+        sources.append((activity1, HALF_LIVES["f18"]))
+    if controls["na22source1"]:
+        sources.append((activity1, HALF_LIVES["na22"]))
+
+    if controls["activatePhantom2"]:
+        activity2 = parseQuantity(controls["sourceActivity2"])
+        for isotope in HALF_LIVES:
+            if controls["{}source2".format(isotope)]:
+                sources.append((activity2, HALF_LIVES[isotope]))
+    return sources
+
+def readKeyframeTimes(path: str) -> np.ndarray:
+    """
+    Function that reads the keyframe times of a GATE *.placements file.
+
+    Input:
+        path: Path to the placements file
+
+    Output:
+        times: The keyframe times in s
+    """
+
+    with open(path) as f:
+        timeUnit = f.readline().split()[-1]
+    times = np.loadtxt(path, skiprows = 3, usecols = 0, ndmin = 1)
+    return times*UNITS[timeUnit]
+
+def activeKeyframeTimes(controls: dict, dataFolder: str = "data/") -> np.ndarray:
+    """
+    Function that collects the keyframe times of every placements file used by a simulation.
+
+    Input:
+        controls: The simulation controls, SimulationConfig.controls()
+        dataFolder: The folder the placements files are in
+
+    Output:
+        times: Sorted keyframe times in s, empty if no generic motion is used
+    """
+
+    times = [np.zeros(0)]
+    if controls["movePhantom1"] and controls["genericMotion1"]:
+        times.append(readKeyframeTimes(dataFolder + controls["genericMotionFileName1"]))
+    if controls["movePhantom2"] and controls["genericMotion2"]:
+        times.append(readKeyframeTimes(dataFolder + controls["genericMotionFileName2"]))
+    return np.sort(np.concatenate(times))
+
+def expectedDecays(start, stop, sources: list):
+    """
+    Function that integrates the decay rate of the sources over [start, stop].
+
+    Input:
+        start, stop: Interval edges in s, floats or arrays
+        sources: List of (activity in Bq, half life in s) tuples
+
+    Output:
+        decays: The expected number of decays in the interval
+    """
+
+    decays = 0.0
+    for activity, halfLife in sources:
+        decayConstant = np.log(2)/halfLife
+        decays = decays + activity/decayConstant*(np.exp(-decayConstant*start) - np.exp(-decayConstant*stop))
+    return decays
+
+def intervalFeatures(start: float, stop: float, sources: list, keyframeTimes: np.ndarray, timeSlice: float) -> dict:
+    """
+    Function that computes the cost features of one time interval.
+
+    Input:
+        start, stop: Interval edges in s
+        sources: List of (activity in Bq, half life in s) tuples
+        keyframeTimes: Sorted placements keyframe times in s
+        timeSlice: The GATE time slice in s
+
+    Output:
+        features: Dictionary with the "decays", "keyframes" and "slices" in the interval
+    """
+
+    keyframes = int(np.searchsorted(keyframeTimes, stop) - np.searchsorted(keyframeTimes, start))
+    return {"decays": float(expectedDecays(start, stop, sources)), "keyframes": keyframes, "slices": (stop - start)/timeSlice}
+
+def estimateChunkTime(features: dict, coefficients: dict) -> float:
+    """
+    Function that estimates the wall time of a chunk from its features.
+
+    Input:
+        features: Dictionary from intervalFeatures
+        coefficients: The cost model coefficients
+
+    Output:
+        wallTime: The estimated wall time in s
+    """
+
+    return coefficients["overhead"] + sum(coefficients[coefficient]*features[name] for name, coefficient in FEATURES.items())
+
+def planTimeChunks(startTime: float, endTime: float, nChunks: int, sources: list, keyframeTimes: np.ndarray, timeSlice: float, coefficients: dict) -> list:
+    """
+    Function that cuts [startTime, endTime] into chunks of about equal estimated cost.
+
+    Input:
+        startTime, endTime: The acquisition start and end time in s
+        nChunks: The number of chunks to create
+        sources: List of (activity in Bq, half life in s) tuples
+        keyframeTimes: Sorted placements keyframe times in s
+        timeSlice: The GATE time slice in s
+        coefficients: The cost model coefficients
+
+    Output:
+        chunks: List of (chunkStart, chunkEnd) tuples in s.  The last chunk ends exactly at endTime.
+    """
+
+    if nChunks < 1:
+        raise ValueError("nChunks must be at least 1, got {}".format(nChunks))
+    if endTime <= startTime:
+        raise ValueError("endTime ({}) must be after startTime ({})".format(endTime, startTime))
+
+    # Cumulative cost on a fine grid, the keyframes are added on top of the smooth decay and slice terms
+    grid = np.linspace(startTime, endTime, max(10000, 200*nChunks) + 1)
+    cost = coefficients["perDecay"]*expectedDecays(startTime, grid, sources) + coefficients["perSlice"]*(grid - startTime)/timeSlice
+    cost = cost + coefficients["perKeyframe"]*(np.searchsorted(keyframeTimes, grid) - np.searchsorted(keyframeTimes, startTime))
+    cost = np.maximum.accumulate(cost + 1e-12*(grid - startTime)) # Strictly increasing so it can be inverted
+
+    edges = np.interp(np.linspace(0.0, cost[-1], nChunks + 1), cost, grid)
+    edges[0], edges[-1] = startTime, endTime
+    return [(float(edges[i]), float(edges[i+1])) for i in range(nChunks)]
+
+def configSignature(controls: dict) -> str:
+    """
+    Function that hashes the controls that change the cost per decay, keyframe or slice.  Runs with the
+    same signature share their history.
+
+    Input:
+        controls: The simulation controls, SimulationConfig.controls()
+
+    Output:
+        signature: A short hex digest
+    """
+
+    relevant = {key: value for key, value in controls.items()
+                if not key.startswith("_") and key not in SIGNATURE_IGNORE and isinstance(value, (str, int, float, bool))}
+    return hashlib.sha1(json.dumps(relevant, sort_keys = True).encode()).hexdigest()[:16]
+
+def loadHistory(path: str, signature: str) -> list:
+    """
+    Function that reads the history records of earlier chunks with the same signature.
+
+    Input:
+        path: The history file (JSON lines)
+        signature: The configuration signature
+
+    Output:
+        records: The most recent MAX_RECORDS matching records
+    """
+
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError: # A run that died mid-write leaves a broken last line
+                continue
+            if record.get("signature") == signature:
+                records.append(record)
+    return records[-MAX_RECORDS:]
+
+def fitCostModel(records: list) -> dict:
+    """
+    Function that fits the cost model coefficients to history records.  The fit is a least squares fit
+    pulled towards the priors (ridge), since chunks of one run have nearly collinear features.
+
+    Input:
+        records: History records with the features, "firstWindow" (records written before it was kept
+                 count as first windows) and the measured "wallTime"
+
+    Output:
+        coefficients: The fitted coefficients, the priors if there are fewer than MIN_RECORDS records
+    """
+
+    if len(records) < MIN_RECORDS:
+        return dict(PRIOR_COEFFICIENTS)
+
+    names = ["overhead"] + list(FEATURES.values())
+    X = np.array([[float(record.get("firstWindow", True))] + [record[name] for name in FEATURES] for record in records]) # Only the first window of a process pays the overhead
+    y = np.array([record["wallTime"] for record in records])
+    prior = np.array([PRIOR_COEFFICIENTS[name] for name in names])
+
+    scale = np.abs(X).mean(axis = 0)
+    scale[scale == 0] = 1.0
+    Xs = np.vstack([X/scale, np.sqrt(RIDGE)*np.eye(len(names))])
+    ys = np.concatenate([y, np.sqrt(RIDGE)*prior*scale])
+    weights = np.linalg.lstsq(Xs, ys, rcond = None)[0]/scale
+
+    return {name: float(max(weight, 0.0)) for name, weight in zip(names, weights)}
+
+def recordHistory(path: str, signature: str, results: list) -> None:
+    """
+    Function that appends the measured wall time and features of every successful chunk to the history.
+
+    Input:
+        path: The history file (JSON lines)
+        signature: The configuration signature
+        results: The result dictionaries returned by scheduler.runChunks, with the manifest's output
+                 counts ("fileSize", "entries", "delays") if known, the dry run estimates the output from them,
+                 and the STATISTICS of runReport if known, the run report checks the throughput against them
+    """
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(path, "a") as f:
+        for result in results:
+            if result["returnCode"] != 0:
+                continue
+            record = {"signature": signature, "wallTime": result["wallTime"], "duration": result["stop"] - result["start"], "firstWindow": bool(result.get("firstWindow", True))}
+            record.update({name: result[name] for name in FEATURES})
+            record.update({name: result[name] for name in OUTPUT_COUNTS + STATISTICS if result.get(name) is not None})
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,379 @@
+"""
+Dry run of a simulation: what a run will produce and cost, worked out before any macro is written or any
+GATE process is started.  From the config (activity, acquisition times, tracer position, scanner geometry,
+digitiser windows and dead time) and the chunk plan it estimates
+
+    decays                  integrated over the acquisition from the activity and half life of every source
+    coincidences            decays times the chance both photons are detected (ring acceptance seen from the
+                            tracer, photon detection efficiency, dead time)
+    delayed coincidences    windows opened by the singles times the chance another single falls in the
+                            delayed window, so they grow with the activity squared until the window saturates
+    ROOT output             bytes per stored coincidence (Coincidences and delay trees) plus a fixed size
+                            per file, for every chunk and for the merged file
+    listmode output         8 float64 columns per coincidence with OUTPUT_NPY for the shards, the same or the
+                            compact row (listmodeCompact) for the file
+    scratch peak            the chunk files, the running merge and the listmode shards in ROOT_FOLDER at the
+                            same time
+    wall time               the chunks of the plan handed to the workers in order, timed with the cost model
+
+The model of the counts and sizes is calibrated, best first, by a pilot run (a short acquisition simulated
+with the real macros, --pilot SECONDS), by the chunks of earlier runs with the same signature in
+COST_HISTORY, or left at its priors, which are only good to a factor of a few.  A pilot is also added to
+the history, so it improves the chunk plan of the real run too.
+
+    python3 scriptName.py --plan [--pilot 0.01]
+
+Required Packages: numpy
+Optional Packages: uproot (counts the output of the pilot run)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import heapq
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from GateOrchestrator import scheduler, costModel, manifest, macroCompiler, simulationRun, runReport, listmode
+
+#######################
+###### CONSTANTS ######
+#######################
+
+PHOTON_EFFICIENCY = 0.4 # Chance a 511 keV photon that reaches the ring is detected inside the energy window (30 mm BGO, crystal packing)
+BYTES_PER_ENTRY = 100.0 # Compressed size of one Coincidences or delay entry in bytes
+FILE_OVERHEAD = 30e3 # Size of a chunk ROOT file without any entries in bytes
+DISK_MARGIN = 0.9 # A plan that needs more than this fraction of the free space is flagged
+LONG_RUN = 24*3600.0 # A plan that takes longer than this (s) is flagged
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def parseVector(text: str) -> np.ndarray:
+    """
+    Function that converts a GATE style vector, e.g. "20.0 20.0 20.0 mm", to a numpy array in mm.
+    """
+
+    parts = text.split()
+    return np.array([float(part) for part in parts[:-1]])*costModel.UNITS[parts[-1]]
+
+def tracerAxialPositions(config, dataFolder: str = "data/") -> np.ndarray:
+    """
+    Function that finds the axial (z) positions of tracer 1, the keyframes of its placements file if it
+    moves along one, otherwise the translation of the active phantom.
+
+    Input:
+        config: The SimulationConfig
+        dataFolder: The folder the placements files are in
+
+    Output:
+        z: The axial positions in mm
+    """
+
+    if config.movePhantom1 and config.genericMotion1:
+        path = dataFolder + config.genericMotionFileName1
+        with open(path) as f:
+            lengthUnit = f.readlines()[2].split()[-1]
+        return np.loadtxt(path, skiprows = 3, usecols = 7, ndmin = 1)*costModel.UNITS[lengthUnit]
+    if config.nrwPhantomShell1:
+        return parseVector(config.nrwPhantomShell1Translation)[2:]
+    if config.nrwPhantom1:
+        return parseVector(config.nrwPhantomTranslation1)[2:]
+    if config.cylinderPhantom1:
+        return parseVector(config.cylinderPhantomTranslation1)[2:]
+    return np.zeros(1)
+
+def ringAcceptance(config, z: np.ndarray) -> tuple:
+    """
+    Function that computes the fraction of isotropic photons that reach the detector ring from axial
+    positions z.  The transverse offset of the tracer is ignored, it is small next to the ring radius.
+
+    Input:
+        config: The SimulationConfig
+        z: The axial positions in mm
+
+    Output:
+        singles: The fraction of single photons that reach the ring, averaged over z
+        pairs: The fraction of back to back pairs with both photons on the ring, averaged over z
+    """
+
+    radius = costModel.parseQuantity(config.sectorMinRadius)
+    halfHeight = int(config.blockRepeatNo)*parseVector(config.blockRepeatVector)[2]/2
+    up = np.clip(halfHeight - z, 0.0, None)
+    down = np.clip(halfHeight + z, 0.0, None)
+    cosUp = up/np.sqrt(radius**2 + up**2) # A photon reaches the ring if |cos theta| is below this
+    cosDown = down/np.sqrt(radius**2 + down**2)
+    return float(np.mean((cosUp + cosDown)/2)), float(np.mean(np.minimum(cosUp, cosDown)))
+
+def modelCounts(config, decays: float, duration: float, acceptance: tuple) -> dict:
+    """
+    Function that models the coincidences and delayed coincidences of an acquisition.
+
+    Input:
+        config: The SimulationConfig
+        decays: The number of decays in the acquisition
+        duration: The acquisition time in s
+        acceptance: (singles, pairs) from ringAcceptance
+
+    Output:
+        counts: Dictionary with the "singlesRate" (per s), the "liveFraction", the "entries"
+                (coincidences) and the "delays"
+    """
+
+    singlesAcceptance, pairAcceptance = acceptance
+    activity = decays/duration if duration > 0 else 0.0
+    singlesRate = 2*activity*singlesAcceptance*PHOTON_EFFICIENCY
+    blocks = int(config.sectorRepeatNo)*int(config.blockRepeatNo)
+    blockLoad = singlesRate/blocks*costModel.parseQuantity(config.deadtimeValue)
+    liveFraction = np.exp(-blockLoad) if config.deadtimeMode == "paralysable" else 1.0/(1.0 + blockLoad)
+    singlesRate = singlesRate*liveFraction
+
+    # A single opens a delayed window unless one is open already, it gives a delay if another single falls in it
+    window = costModel.parseQuantity(config.delayedWindow)
+    delaysRate = singlesRate/(1.0 + singlesRate*window)*(1.0 - np.exp(-singlesRate*window))
+    return {"singlesRate": float(singlesRate), "liveFraction": float(liveFraction),
+            "entries": float(decays*pairAcceptance*(PHOTON_EFFICIENCY*liveFraction)**2), "delays": float(delaysRate*duration)}
+
+def calibrate(config, records: list, acceptance: tuple) -> dict:
+    """
+    Function that scales the count model and the bytes per entry to measured chunks.
+
+    Input:
+        config: The SimulationConfig
+        records: History or pilot records with "decays", "duration" and the output counts
+        acceptance: (singles, pairs) from ringAcceptance
+
+    Output:
+        calibration: Dictionary with the "entriesScale", "delaysScale" and "bytesPerEntry", each the prior
+                     if the records don't measure it
+    """
+
+    calibration = {"entriesScale": 1.0, "delaysScale": 1.0, "bytesPerEntry": BYTES_PER_ENTRY}
+    measured = [record for record in records if record.get("entries") is not None and record["decays"] > 0]
+    if measured:
+        models = [modelCounts(config, record["decays"], record["duration"], acceptance) for record in measured]
+        modelled = sum(model["entries"] for model in models)
+        calibration["entriesScale"] = sum(record["entries"] for record in measured)/modelled if modelled > 0 else 1.0
+        withDelays = [(record, model) for record, model in zip(measured, models) if record.get("delays") is not None]
+        modelled = sum(model["delays"] for record, model in withDelays)
+        if withDelays and modelled > 0:
+            calibration["delaysScale"] = sum(record["delays"] for record, model in withDelays)/modelled
+
+    sized = [record for record in measured if record.get("fileSize") is not None]
+    stored = sum(record["entries"] + (record.get("delays") or 0) for record in sized)
+    if stored > 0:
+        calibration["bytesPerEntry"] = max(1.0, sum(record["fileSize"] - FILE_OVERHEAD for record in sized)/stored)
+    return calibration
+
+def runPilot(config, seconds: float, inputs: dict, keepOutput: str = None) -> dict:
+    """
+    Function that simulates the first seconds of the acquisition with the real macros in a temporary folder.
+
+    Input:
+        config: The SimulationConfig
+        seconds: The simulated time of the pilot in s
+        inputs: Dictionary from simulationRun.costInputs
+        keepOutput: Optional file the ROOT output of the pilot is moved to, it is removed otherwise
+
+    Output:
+        record: The history record of the pilot ("wallTime", "startupTime", the features and output counts)
+    """
+
+    parent = os.path.dirname(os.path.normpath(config.ROOT_FOLDER))
+    folder = tempfile.mkdtemp(prefix = "pilot_", dir = parent if os.path.isdir(parent) else None) + "/"
+    try:
+        pilot = config.replace(MACRO_FOLDER = folder, ROOT_FOLDER = folder, endTime = config.startTime + seconds, CHUNK_CACHE = None)
+        os.makedirs(pilot.LOG_FOLDER) # GATE writes the statistics and summary of the chunk there
+        macro, window, motion = macroCompiler.compileMacros(pilot, [(pilot.startTime, pilot.endTime)], inputs["timeSliceSeconds"])[0]
+        chunk = {"index": 0, "start": pilot.startTime, "stop": pilot.endTime, "macro": macro, "window": window, "motion": motion,
+                 "rootFile": folder + "mp_0.root", "log": folder + "pilot.log", "stat": runReport.statFile(pilot, 0), "summary": runReport.summaryFile(pilot, 0)}
+        chunk.update(costModel.intervalFeatures(pilot.startTime, pilot.endTime, inputs["sources"], inputs["keyframeTimes"], inputs["timeSliceSeconds"]))
+        print("Pilot run: simulating {} - {} s, the GATE output goes to {}".format(pilot.startTime, pilot.endTime, chunk["log"]), flush = True)
+        result = scheduler.runGateMacro(chunk)
+        entry = {"returnCode": result["returnCode"], "rootFile": chunk["rootFile"], "fileSize": None, "entries": None, "delays": None}
+        if not manifest.checkChunk(entry):
+            raise RuntimeError("The pilot run failed (exit code {}), see {}".format(result["returnCode"], chunk["log"]))
+        result.update({key: entry[key] for key in manifest.OUTPUT_COUNTS})
+        result.update({key: value for key, value in runReport.chunkStatistics([result])[0].items() if key in costModel.STATISTICS})
+        costModel.recordHistory(config.COST_HISTORY, inputs["signature"], [result]) # The pilot is a chunk like any other
+        if keepOutput is not None:
+            shutil.move(chunk["rootFile"], keepOutput)
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+    result["duration"] = result["stop"] - result["start"]
+    return result
+
+def pilotCoefficients(coefficients: dict, pilot: dict) -> dict:
+    """
+    Function that fits the cost model to a pilot run: the start up time is the overhead and the per decay,
+    keyframe and slice costs are scaled so the model gives the measured simulation time.
+    """
+
+    startup = pilot["startupTime"] if pilot["startupTime"] is not None else coefficients["overhead"]
+    variable = costModel.estimateChunkTime(pilot, coefficients) - coefficients["overhead"]
+    scale = max(pilot["wallTime"] - startup, 0.0)/variable if variable > 0 else 1.0
+    fitted = {name: value*scale for name, value in coefficients.items()}
+    fitted["overhead"] = startup
+    return fitted
+
+def scheduleWallTime(chunkTimes: list, workers: int, overhead: float, persistent: bool) -> float:
+    """
+    Function that hands the chunks in order to the first free worker, like the scheduler does.
+
+    Input:
+        chunkTimes: The estimated wall time of every chunk in s, start up included
+        workers: The number of workers
+        overhead: The start up time in s, a persistent worker only pays it for its first chunk
+        persistent: True if the workers are persistent
+
+    Output:
+        wallTime: The time in s until the last chunk finishes
+    """
+
+    free = [(0.0, worker, False) for worker in range(workers)] # (free at, worker, started)
+    heapq.heapify(free)
+    for chunkTime in chunkTimes:
+        at, worker, started = heapq.heappop(free)
+        heapq.heappush(free, (at + (chunkTime - overhead if persistent and started else chunkTime), worker, True))
+    return max(at for at, worker, started in free)
+
+def diskSpace(path: str) -> tuple:
+    """
+    Function that finds the disk a path is (or will be) on.
+
+    Output:
+        free: The free space in bytes
+        device: The device id, equal ids are the same file system
+    """
+
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free, os.stat(path).st_dev
+
+def formatBytes(size: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if abs(size) < 1000:
+            return "{:.1f} {}".format(size, unit)
+        size = size/1000
+    return "{:.1f} TB".format(size)
+
+def formatDuration(seconds: float) -> str:
+    if seconds < 120:
+        return "{:.0f} s".format(seconds)
+    if seconds < 7200:
+        return "{:.0f} min".format(seconds/60)
+    return "{:.0f} h {:.0f} min".format(seconds//3600, seconds%3600/60)
+
+def planEstimates(config, sweepJobs: int = 1, pilotTime: float = None) -> dict:
+    """
+    Function that estimates the output and cost of a run without running it.
+
+    Input:
+        config: The SimulationConfig of the run
+        sweepJobs: Number of runs sharing the worker pool, as in simulationRun.planRun
+        pilotTime: Simulated time in s of a pilot run to calibrate with, None to use the history
+
+    Output:
+        plan: Dictionary with the estimates ("decays", "entries", "delays", "chunkBytes", "mergedBytes",
+              "listmodeBytes", "scratchBytes" (simulated chunks, merged file and listmode shards),
+              "cachedBytes", "scratchPeak", "wallTime", "workerTime") and the "problems" found
+    """
+
+    inputs = simulationRun.costInputs(config, sweepJobs)
+    timeChunks = simulationRun.planTimeWindows(config, inputs)
+    cached = set(inputs["cachedWindows"])
+    acceptance = ringAcceptance(config, tracerAxialPositions(config))
+    coefficients = inputs["costCoefficients"]
+    records = [record for record in inputs["history"] if "entries" in record]
+    source = "{} chunks of earlier runs".format(len(records)) if records else "priors, no measured chunks with this signature"
+    if pilotTime:
+        pilot = runPilot(config, pilotTime, inputs)
+        coefficients = pilotCoefficients(coefficients, pilot)
+        records = [pilot]
+        source = "a {} s pilot run ({:.1f} s wall time, {:.1f} s start up)".format(pilotTime, pilot["wallTime"], pilot["startupTime"] or 0.0)
+    elif len(inputs["history"]) < costModel.MIN_RECORDS:
+        source += ", cost model priors"
+    calibration = calibrate(config, records, acceptance)
+
+    plan = {"chunks": len(timeChunks), "cachedChunks": len(cached), "workers": inputs["workers"], "source": source, "problems": []}
+    chunkBytes = []
+    chunkTimes = []
+    for chunkStart, chunkEnd in timeChunks:
+        features = costModel.intervalFeatures(chunkStart, chunkEnd, inputs["sources"], inputs["keyframeTimes"], inputs["timeSliceSeconds"])
+        counts = modelCounts(config, features["decays"], chunkEnd - chunkStart, acceptance)
+        stored = counts["entries"]*calibration["entriesScale"] + counts["delays"]*calibration["delaysScale"]
+        chunkBytes.append(FILE_OVERHEAD + stored*calibration["bytesPerEntry"])
+        if (chunkStart, chunkEnd) not in cached:
+            chunkTimes.append(costModel.estimateChunkTime(features, coefficients))
+
+    duration = config.endTime - config.startTime
+    plan["decays"] = float(costModel.expectedDecays(config.startTime, config.endTime, inputs["sources"]))
+    counts = modelCounts(config, plan["decays"], duration, acceptance)
+    plan["entries"] = counts["entries"]*calibration["entriesScale"]
+    plan["delays"] = counts["delays"]*calibration["delaysScale"]
+    plan["singlesRate"] = counts["singlesRate"]
+    plan["chunkBytes"] = chunkBytes
+    plan["mergedBytes"] = FILE_OVERHEAD + (plan["entries"] + plan["delays"])*calibration["bytesPerEntry"]
+    plan["listmodeBytes"] = plan["entries"]*listmode.rowBytes(listmode.listmodeProduct(config)) if config.OUTPUT_NPY else 0.0
+    shardBytes = plan["entries"]*listmode.COLUMNS*8 if config.OUTPUT_NPY else 0.0
+    plan["workerTime"] = sum(chunkTimes)
+    plan["wallTime"] = scheduleWallTime(chunkTimes, inputs["workers"], coefficients["overhead"], config.persistentWorkers) if chunkTimes else 0.0
+
+    # Every chunk file stays in ROOT_FOLDER until the end and the running merge and the listmode shards grow next to
+    # them.  Cached chunks are hard links, they only take space if the cache is on another disk and they had to be copied.
+    scratchFree, scratchDevice = diskSpace(config.ROOT_FOLDER)
+    simulated = sum(size for size, window in zip(chunkBytes, timeChunks) if window not in cached)
+    plan["scratchBytes"] = simulated + (plan["mergedBytes"] if config.mergeRoot else 0.0) + shardBytes
+    plan["cachedBytes"] = sum(chunkBytes) - simulated
+    plan["scratchPeak"] = plan["scratchBytes"]
+    if config.CHUNK_CACHE and diskSpace(config.CHUNK_CACHE)[1] != scratchDevice:
+        plan["scratchPeak"] += plan["cachedBytes"]
+    plan["scratchFree"] = scratchFree
+    plan["liveFraction"] = counts["liveFraction"]
+    if plan["scratchPeak"] > DISK_MARGIN*scratchFree:
+        plan["problems"].append("ROOT_FOLDER needs {} at its peak but its disk only has {} free".format(formatBytes(plan["scratchPeak"]), formatBytes(scratchFree)))
+    outputFree, outputDevice = diskSpace(config.OUTPUT_ROOT)
+    if config.mergeRoot and outputDevice != scratchDevice and plan["mergedBytes"] > DISK_MARGIN*outputFree:
+        plan["problems"].append("The output file needs {} but the disk of OUTPUT_ROOT only has {} free".format(formatBytes(plan["mergedBytes"]), formatBytes(outputFree)))
+    if config.OUTPUT_NPY:
+        listmodeFree = diskSpace(config.OUTPUT_NPY)[0]
+        if plan["listmodeBytes"] > DISK_MARGIN*listmodeFree:
+            plan["problems"].append("The listmode file needs {} but the disk of OUTPUT_NPY only has {} free".format(formatBytes(plan["listmodeBytes"]), formatBytes(listmodeFree)))
+    if plan["wallTime"] > LONG_RUN:
+        plan["problems"].append("The run takes about {}, more than {}".format(formatDuration(plan["wallTime"]), formatDuration(LONG_RUN)))
+    return plan
+
+def planReport(config, sweepJobs: int = 1, pilotTime: float = None) -> dict:
+    """
+    Function that estimates the output and cost of a run without running it, and prints the estimates.
+
+    Input:
+        config: The SimulationConfig of the run
+        sweepJobs: Number of runs sharing the worker pool, as in simulationRun.planRun
+        pilotTime: Simulated time in s of a pilot run to calibrate with, None to use the history
+
+    Output:
+        plan: Dictionary from planEstimates
+    """
+
+    plan = planEstimates(config, sweepJobs, pilotTime)
+    chunkBytes = plan["chunkBytes"]
+    print("\n###### RUN PLAN ######")
+    print("Acquisition {} - {} s in {} chunks ({} cached) on up to {} workers".format(config.startTime, config.endTime, plan["chunks"], plan["cachedChunks"], plan["workers"]))
+    print("Calibrated from {}".format(plan["source"]))
+    print("Expected decays: {:.4g}".format(plan["decays"]))
+    print("Expected coincidences: {:.4g} ({:.3g} per decay)".format(plan["entries"], plan["entries"]/plan["decays"] if plan["decays"] > 0 else 0.0))
+    print("Expected delayed coincidences: {:.4g} (singles rate {:.3g} /s, dead time live fraction {:.3f})".format(plan["delays"], plan["singlesRate"], plan["liveFraction"]))
+    print("ROOT output: {} per chunk (largest {}), {} merged{}".format(formatBytes(np.mean(chunkBytes)), formatBytes(max(chunkBytes)), formatBytes(plan["mergedBytes"]), "" if config.mergeRoot else " (not written)"))
+    if config.OUTPUT_NPY:
+        print("Listmode output: {}".format(formatBytes(plan["listmodeBytes"])))
+    print("Scratch peak in ROOT_FOLDER: {} ({} free)".format(formatBytes(plan["scratchPeak"]), formatBytes(plan["scratchFree"])))
+    print("Estimated wall time: {} ({} of worker time)".format(formatDuration(plan["wallTime"]), formatDuration(plan["workerTime"])))
+    for problem in plan["problems"]:
+        print("WARNING: " + problem)
+    return plan
@@ -0,0 +1,212 @@
+"""
+Benchmark that compares the values of one control, e.g. the geometry tiers or the physics presets, on a
+short acquisition.  The first seconds of the run are simulated once per value, like a dry run pilot, and
+every value is compared with the first (the reference):
+
+    speed           GATE wall and CPU time, coincidences per CPU second, the speed up over the reference
+    rate            coincidences per simulated second, the difference to the reference in %
+    distributions   the axial and transaxial positions of the hits, the radial offset of the LORs from the
+                    scanner axis, the axial centre of the LORs and the distance of the LOR from the decay
+                    point (positron range, non collinearity and detector blurring together): mean, standard
+                    deviation and the two sample Kolmogorov-Smirnov distance D to the reference
+
+A value is good enough if its rate is within --rate-tolerance of the reference and no distribution differs
+by more than --ks-tolerance, or by more than the statistical noise (the 5 % critical D of the two samples).
+
+    python3 -m GateOrchestrator.fidelityBenchmark [--config FILE] [--seconds 0.01] [--control geometryTier] [--values full fast] [--stationary] [--keep FOLDER]
+
+A control with a fixed set of values (config.CHOICES) compares all of them by default.  --stationary
+switches the motion of the phantoms off, so the distributions only show the effect of the control.
+
+Run it from the repository folder, the macros read their data files from data/.
+
+Required Packages: numpy, uproot, resource (Unix)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import numpy as np
+
+from GateOrchestrator import dryRun, simulationRun, manifest
+from GateOrchestrator.config import SimulationConfig, loadConfig, CHOICES
+
+try:
+    import uproot
+except ImportError:
+    uproot = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+BRANCHES = ["globalPosX1", "globalPosY1", "globalPosZ1", "globalPosX2", "globalPosY2", "globalPosZ2"]
+SOURCE_BRANCHES = ["sourcePosX1", "sourcePosY1", "sourcePosZ1"] # The decay point, only compared if GATE wrote it
+KS_CRITICAL = 1.36 # Two sample Kolmogorov-Smirnov critical value factor at the 5 % level
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def readCoincidences(path: str) -> dict:
+    """
+    Function that reads the hit positions and decay points of the coincidences of a ROOT file.
+
+    Input:
+        path: The ROOT file
+
+    Output:
+        coincidences: Dictionary of branch name: numpy array
+    """
+
+    if uproot is None:
+        raise RuntimeError("The benchmark needs uproot to read the coincidences, pip3 install uproot")
+    with uproot.open(path) as rootFile:
+        tree = rootFile[manifest.COINCIDENCES_TREE]
+        return tree.arrays([branch for branch in BRANCHES + SOURCE_BRANCHES if branch in tree], library = "np")
+
+def lorFeatures(coincidences: dict) -> dict:
+    """
+    Function that computes the distributions the benchmark compares.
+
+    Input:
+        coincidences: Dictionary from readCoincidences
+
+    Output:
+        features: Dictionary of name: numpy array
+    """
+
+    x1, y1, z1 = coincidences["globalPosX1"], coincidences["globalPosY1"], coincidences["globalPosZ1"]
+    x2, y2, z2 = coincidences["globalPosX2"], coincidences["globalPosY2"], coincidences["globalPosZ2"]
+    length = np.hypot(x2 - x1, y2 - y1)
+    features = {
+        "hit axial position (mm)": np.concatenate([z1, z2]),
+        "hit transaxial angle (deg)": np.degrees(np.arctan2(np.concatenate([y1, y2]), np.concatenate([x1, x2]))),
+        "LOR radial offset (mm)": np.abs(x1*y2 - x2*y1)/np.where(length > 0, length, np.inf),
+        "LOR axial centre (mm)": (z1 + z2)/2,
+    }
+    if all(branch in coincidences for branch in SOURCE_BRANCHES):
+        hit1 = np.stack([x1, y1, z1], axis = 1).astype(np.float64)
+        lor = np.stack([x2, y2, z2], axis = 1) - hit1
+        decay = np.stack([coincidences[branch] for branch in SOURCE_BRANCHES], axis = 1) - hit1
+        lorLength = np.linalg.norm(lor, axis = 1)
+        features["decay point to LOR (mm)"] = np.linalg.norm(np.cross(decay, lor), axis = 1)/np.where(lorLength > 0, lorLength, np.inf)
+    return features
+
+def ksDistance(a: np.ndarray, b: np.ndarray) -> tuple:
+    """
+    Function that computes the two sample Kolmogorov-Smirnov distance of two samples.
+
+    Input:
+        a, b: The samples
+
+    Output:
+        distance: The largest difference of the two empirical distribution functions
+        critical: The distance expected from noise alone at the 5 % level
+    """
+
+    if len(a) == 0 or len(b) == 0:
+        return float("nan"), float("nan")
+    a, b = np.sort(a), np.sort(b)
+    points = np.concatenate([a, b])
+    distance = np.max(np.abs(np.searchsorted(a, points, side = "right")/len(a) - np.searchsorted(b, points, side = "right")/len(b)))
+    return float(distance), KS_CRITICAL*np.sqrt((len(a) + len(b))/(len(a)*len(b)))
+
+def runVariants(config, control: str, values: list, seconds: float, folder: str) -> list:
+    """
+    Function that simulates the first seconds of a run once per value of a control.
+
+    Input:
+        config: The SimulationConfig
+        control: The control to vary
+        values: Its values, the first is the reference
+        seconds: The simulated time of every run in s
+        folder: The folder the ROOT outputs are kept in
+
+    Output:
+        results: One dictionary per value with the "value", "wallTime", "cpuTime" (user and system time
+                 of GATE), "entries", "rate" and the distributions ("features")
+    """
+
+    results = []
+    for value in values:
+        variant = config.replace(**{control: value})
+        outputFile = os.path.join(folder, "{}_{}.root".format(control, value))
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        pilot = dryRun.runPilot(variant, seconds, simulationRun.costInputs(variant), keepOutput = outputFile)
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        entries = pilot["entries"] if pilot["entries"] is not None else 0
+        results.append({"value": value, "wallTime": pilot["wallTime"], "cpuTime": after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime,
+                        "entries": entries, "rate": entries/seconds, "features": lorFeatures(readCoincidences(outputFile))})
+    return results
+
+def compareVariants(results: list, rateTolerance: float, ksTolerance: float) -> list:
+    """
+    Function that prints how every value compares with the reference.
+
+    Input:
+        results: The list from runVariants
+        rateTolerance: The largest relative rate difference that is good enough
+        ksTolerance: The largest Kolmogorov-Smirnov distance that is good enough
+
+    Output:
+        goodEnough: The values that are good enough (the reference always is)
+    """
+
+    reference = results[0]
+    goodEnough = [reference["value"]]
+    for result in results:
+        print("\n###### {} ######".format(result["value"]))
+        cpuTime = max(result["cpuTime"], 1e-3)
+        print("GATE wall time {:.1f} s, CPU time {:.1f} s, {:.0f} coincidences per CPU second, speed up {:.2f}x".format(
+              result["wallTime"], result["cpuTime"], result["entries"]/cpuTime, max(reference["cpuTime"], 1e-3)/cpuTime))
+        rateChange = result["rate"]/reference["rate"] - 1 if reference["rate"] > 0 else float("nan")
+        print("Coincidence rate {:.4g} /s ({:+.2f} % of the reference)".format(result["rate"], 100*rateChange))
+        good = abs(rateChange) <= rateTolerance
+        for name, sample in result["features"].items():
+            distance, critical = ksDistance(sample, reference["features"][name])
+            flag = distance > max(ksTolerance, critical)
+            good = good and not flag
+            print("  {:28s} mean {:9.3f}  std {:9.3f}  KS D {:.4f} (noise {:.4f}){}".format(
+                  name, np.mean(sample) if len(sample) else float("nan"), np.std(sample) if len(sample) else float("nan"), distance, critical, "  <- differs" if flag else ""))
+        if good and result is not reference:
+            goodEnough.append(result["value"])
+    print("\nGood enough compared with {}: {}".format(reference["value"], ", ".join(str(value) for value in goodEnough)))
+    return goodEnough
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the speed, coincidence rate and LOR distributions of the values of one control")
+    parser.add_argument("--config", metavar = "FILE", default = None, help = "The config file of the run, the defaults of GateOrchestrator/config.py otherwise")
+    parser.add_argument("--seconds", type = float, default = 0.01, help = "Simulated time of every run in s")
+    parser.add_argument("--control", default = "geometryTier", help = "The control to vary, e.g. geometryTier or physicsPreset")
+    parser.add_argument("--values", nargs = "+", default = None, help = "The values to compare, the first is the reference, all the choices of the control by default")
+    parser.add_argument("--rate-tolerance", type = float, default = 0.02, help = "The largest relative coincidence rate difference that is good enough")
+    parser.add_argument("--ks-tolerance", type = float, default = 0.02, help = "The largest Kolmogorov-Smirnov distance of a distribution that is good enough")
+    parser.add_argument("--stationary", action = "store_true", help = "Switch the motion of the phantoms off")
+    parser.add_argument("--keep", metavar = "FOLDER", default = None, help = "Keep the ROOT output of every run in this folder")
+    args = parser.parse_args()
+
+    config = loadConfig(args.config) if args.config else SimulationConfig()
+    if args.stationary:
+        config = config.replace(movePhantom1 = False, movePhantom2 = False)
+    values = args.values or CHOICES.get(args.control)
+    if not values:
+        parser.error("--values is needed for {}".format(args.control))
+    folder = args.keep or tempfile.mkdtemp(prefix = "benchmark_", dir = os.path.dirname(os.path.normpath(config.ROOT_FOLDER)))
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    try:
+        results = runVariants(config, args.control, values, args.seconds, folder)
+        compareVariants(results, args.rate_tolerance, args.ks_tolerance)
+    finally:
+        if args.keep is None:
+            shutil.rmtree(folder, ignore_errors = True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Load-aware admission control for the GATE workers on a shared server.  Before a worker launches its next
+chunk it asks the Governor for a slot.  The Governor allows at most
+
+    min(cores, CPUs, per-user cap - user's other GATE processes, CPU headroom, memory headroom)
+
+workers at a time, where the CPU headroom is what is left of maxLoad*CPUs after the load of everyone else
+(the 1 minute load average minus the same 1 minute average of our own running workers, so workers that
+have just finished aren't mistaken for somebody else's load) and the memory headroom is the available memory minus
+reserveMemory divided by the peak RSS of a GATE worker (measured from the running workers, workerMemory
+until the first one has been measured).  Running workers are never killed, when the server gets busy new
+launches are paused until the load drops again.  A persistent worker asks again before every further time
+window (keep) and, while more workers run than are allowed, ends its GATE process after the window it is on
+instead of taking the next one.
+
+The settings are read from an INI file with a [DEFAULT] section and optional per-user sections, e.g.
+
+    [DEFAULT]
+    maxProcesses = 64
+    maxLoad = 0.9
+    reserveMemory = 8
+    workerMemory = 1
+    checkInterval = 10
+
+    [rayhaan]
+    maxProcesses = 100
+
+Memory values are in GB, checkInterval in s.  Memory and process counts are read from /proc, on systems
+without it only the load average and the caps are used.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import configparser
+import getpass
+import math
+import os
+import threading
+import time
+
+#######################
+###### CONSTANTS ######
+#######################
+
+DEFAULT_SETTINGS = {"maxProcesses": 0, "maxLoad": 1.0, "reserveMemory": 4.0, "workerMemory": 1.0, "checkInterval": 10.0} # maxProcesses = 0 is no cap
+GATE_COMMAND = "Gate"
+LOAD_PERIOD = 60.0 # The load average period in s, our own load is averaged the same way
+GB = 1024**3
+
+#####################
+###### CLASSES ######
+#####################
+
+class Governor:
+    """
+    Decides how many GATE workers may run at the same time and blocks workers until they may launch.
+
+    Input:
+        configFile: The INI settings file, None or a missing file uses DEFAULT_SETTINGS
+        cores: Upper limit on the number of workers, None to only use the machine and the settings
+    """
+
+    def __init__(self, configFile: str = None, cores: int = None):
+        self.settings = readSettings(configFile)
+        self.cpuCount = os.cpu_count() or 1
+        self.maxWorkers = min(limit for limit in (cores, self.settings["maxProcesses"], self.cpuCount) if limit)
+        self.workerRss = self.settings["workerMemory"]*GB
+        self.condition = threading.Condition()
+        self.running = 0
+        self.ownLoad = 0.0 # Our running workers averaged like the 1 minute load average
+        self.loadUpdated = time.time()
+        self.pids = set()
+        self.allowed = self.maxWorkers
+        self.measured = False # True once the peak RSS of a worker has been measured
+        self.paused = False
+        self.checked = 0.0
+
+    def updateOwnLoad(self) -> None:
+        """
+        Decays our own load average towards the current number of running workers, call with the
+        condition held before running changes.
+        """
+
+        now = time.time()
+        decay = math.exp(-(now - self.loadUpdated)/LOAD_PERIOD)
+        self.ownLoad = self.ownLoad*decay + self.running*(1.0 - decay)
+        self.loadUpdated = now
+
+    def refresh(self) -> None:
+        """
+        Recomputes the number of allowed workers, call with the condition held.
+        """
+
+        now = time.time()
+        if now - self.checked < self.settings["checkInterval"]:
+            return
+        self.checked = now
+
+        peaks = [rss for rss in (processPeakRss(pid) for pid in self.pids) if rss is not None]
+        if peaks:
+            self.workerRss = max(self.workerRss if self.measured else 0, max(peaks))
+            self.measured = True
+
+        limits = {"cap": self.maxWorkers}
+        if self.settings["maxProcesses"]:
+            limits["user cap"] = self.settings["maxProcesses"] - max(0, countUserProcesses(GATE_COMMAND) - len(self.pids))
+        self.updateOwnLoad()
+        otherLoad = max(0.0, os.getloadavg()[0] - self.ownLoad)
+        limits["load"] = round(self.settings["maxLoad"]*self.cpuCount - otherLoad)
+        available = availableMemory()
+        if available is not None:
+            limits["memory"] = self.running + int((available - self.settings["reserveMemory"]*GB)//self.workerRss)
+
+        reason = min(limits, key = limits.get)
+        self.allowed = max(0, limits[reason])
+        paused = self.allowed <= self.running and self.allowed < self.maxWorkers
+        if paused and not self.paused:
+            print("Governor: pausing launches, {} workers running and {} allowed ({} limit)".format(self.running, self.allowed, reason), flush = True)
+        elif self.paused and not paused:
+            print("Governor: resuming launches, {} workers allowed ({} limit)".format(self.allowed, reason), flush = True)
+        self.paused = paused
+
+    def acquire(self) -> None:
+        """
+        Blocks until one more worker may launch and counts it as running.
+        """
+
+        with self.condition:
+            self.refresh()
+            while self.running >= self.allowed:
+                self.condition.wait(self.settings["checkInterval"])
+                self.refresh()
+            self.updateOwnLoad()
+            self.running += 1
+
+    def keep(self) -> bool:
+        """
+        Tells a running worker whether it may go on with more work, e.g. a persistent GATE process with its
+        next time window.  If more workers run than are allowed the worker gives up its slot: False is
+        returned and the worker ends without calling release.
+        """
+
+        with self.condition:
+            self.refresh()
+            if self.running <= self.allowed:
+                return True
+            self.updateOwnLoad()
+            self.running -= 1
+            self.condition.notify()
+            return False
+
+    def release(self) -> None:
+        with self.condition:
+            self.updateOwnLoad()
+            self.running -= 1
+            self.condition.notify()
+
+    def register(self, pid: int) -> None:
+        with self.condition:
+            self.pids.add(pid)
+
+    def unregister(self, pid: int) -> None:
+        with self.condition:
+            self.pids.discard(pid)
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def readSettings(configFile: str = None) -> dict:
+    """
+    Function that reads the governor settings of the current user.
+
+    Input:
+        configFile: The INI settings file, None or a missing file uses DEFAULT_SETTINGS
+
+    Output:
+        settings: Dictionary with every key of DEFAULT_SETTINGS
+    """
+
+    settings = dict(DEFAULT_SETTINGS)
+    if configFile is None or not os.path.exists(configFile):
+        return settings
+
+    parser = configparser.ConfigParser()
+    parser.optionxform = str # Keep the camelCase keys
+    parser.read(configFile)
+    user = getpass.getuser()
+    section = parser[user] if parser.has_section(user) else parser.defaults()
+    for key, default in DEFAULT_SETTINGS.items():
+        if key in section:
+            settings[key] = type(default)(section[key])
+    return settings
+
+def availableMemory():
+    """
+    Function that reads the available memory from /proc/meminfo.
+
+    Output:
+        available: Available memory in bytes, None if it can't be read
+    """
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return None
+
+def processPeakRss(pid: int):
+    """
+    Function that reads the peak resident memory of a process from /proc.
+
+    Input:
+        pid: The process id
+
+    Output:
+        peak: The peak RSS in bytes, None if it can't be read (e.g. the process has exited)
+    """
+
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return None
+
+def countUserProcesses(command: str) -> int:
+    """
+    Function that counts the running processes of the current user with the given command name.
+
+    Input:
+        command: The process name, e.g. "Gate"
+
+    Output:
+        count: The number of processes, 0 if /proc can't be read
+    """
+
+    count = 0
+    uid = os.getuid()
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            if os.stat("/proc/" + pid).st_uid != uid:
+                continue
+            with open("/proc/{}/comm".format(pid)) as f:
+                if f.read().strip() == command:
+                    count += 1
+        except OSError: # The process exited while we were looking
+            continue
+    return count
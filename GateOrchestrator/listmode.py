@@ -0,0 +1,701 @@
+"""
+Listmode NPY output of a run.  GeneralScripts/listmode_ROOT2NPY_1ms.py (and _raw.py) convert a merged ROOT
+file to the array the analysis reads, one float64 row per coincidence:
+
+    xA yA zA xB yB zB tA tB
+
+with both positions moved listmodeFaceOffset radially (to the face of the crystals, -5 mm) and the times
+floored to listmodeTimeQuantum (1 ms, None keeps the raw times).  convertFile reads the Coincidences tree
+STEP_SIZE at a time and writes the rows of every step into their place in a preallocated NPY file
+(ListmodeWriter), so the memory it needs is the same for a file of a second or of an hour.  convertFiles
+converts many files on a pool of processes and cuts big files into entry ranges that are converted at the
+same time, each straight into its own rows of the output.  A conversion can make several products at once,
+raw times, times floored to any quantum and other face offsets (parseProduct: "raw", "1ms", "250us",
+"1ms@-7.5"), every branch is read once for all of them.  Products can be written as compact listmode files
+(compactListmode.py, half the size) instead of NPY files and repackFile rewrites existing files either way.
+convertInputs (and GeneralScripts/listmode_ROOT2NPY.py) converts files and folders into a folder per
+product, also from the command line, see GateOrchestrator/listmodeBenchmark.py for its speed, memory and
+scaling:
+
+    python3 -m GateOrchestrator.listmode Output/NAME.root -o NPYOutput/ [--products 1ms raw] [--step-size "30 MB"]
+    python3 -m GateOrchestrator.listmode sweepOutput/ -o NPYOutput/ --products 1ms 0.1ms 1ms@-7.5 [--workers 100] [--compact]
+    python3 -m GateOrchestrator.listmode --repack NPYOutput/1ms/ -o CompactOutput/1ms/ --products 1ms
+
+With OUTPUT_NPY set the run writes the same array itself, without reading the merged file back:
+
+    shards      ListmodeShards converts the output of every chunk that passed the manifest check to
+                ROOT_FOLDER/mp_i.npy in the background, while the other chunks are still simulating.  Chunks
+                restored from the chunk cache or finished before a resume are converted when it starts
+    output      once the run is done the shards are copied one after the other (chunk, so time, order)
+                into OUTPUT_NPY/<output name>.npy, the same bytes as converting the merged file (or into
+                OUTPUT_NPY/<output name>.lmc with listmodeCompact)
+
+Every row only depends on its own coincidence, so the shards of the chunks in time order hold the rows of
+the merged file in the same order.  The merged ROOT file is still written unless mergeRoot is False.
+
+Required Packages: numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import contextlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from GateOrchestrator import manifest, compactListmode
+
+try:
+    import uproot
+except ImportError:
+    uproot = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+LEAVES = ("globalPosX1", "globalPosY1", "globalPosZ1", "globalPosX2", "globalPosY2", "globalPosZ2", "time1", "time2") # Coincidences leaves of the xA yA zA xB yB zB tA tB columns
+COLUMNS = len(LEAVES)
+STEP_SIZE = "30 MB" # Coincidences read per step of convertFile, the memory it needs is a few times this (see listmodeBenchmark.py)
+FACE_OFFSET = -5.0 # mm, the listmode positions are moved from the interaction to the face of the crystals
+TIME_EXPONENTS = {"s": 0, "ms": -3, "us": -6, "ns": -9} # Units of the time quantum of a product name
+COPY_ROWS = 1 << 20 # Rows copied at a time from a shard into the listmode file (64 MB)
+MIN_PART_ENTRIES = 2000000 # convertFiles only cuts files into entry ranges of at least this many coincidences (about a second of work)
+PARTS_PER_WORKER = 4 # Entry ranges per worker convertFiles aims for when it cuts big files
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def moveToFace(x, y, distance):
+    x = x + distance*np.cos(np.arctan2(y, x))
+    y = y + distance*np.sin(np.arctan2(y, x)) # Uses the moved x, as the listmode_ROOT2NPY scripts do
+    return x, y
+
+def product(timeQuantum: float = 0.001, faceOffset: float = FACE_OFFSET, name: str = None, compact: bool = False) -> dict:
+    """
+    Function that describes a listmode product, how the rows of a coincidence are formed and stored.
+
+    Input:
+        timeQuantum: s the times are floored to, None keeps the raw times
+        faceOffset: mm the positions are moved radially
+        name: The name of the product, the folder its files go into
+        compact: Write compact listmode files (float32 positions, integer time ticks, see
+                 compactListmode.py) instead of NPY files
+
+    Output:
+        product: Dictionary with the "name", "timeQuantum", "faceOffset" and "compact"
+    """
+
+    return {"name": name or ("raw" if timeQuantum is None else "{:g}s".format(timeQuantum)), "timeQuantum": timeQuantum, "faceOffset": faceOffset, "compact": compact}
+
+def productFile(folder: str, each: dict, name: str) -> str:
+    return os.path.join(folder, os.path.splitext(name)[0] + (compactListmode.EXTENSION if each.get("compact") else ".npy"))
+
+def rowBytes(each: dict) -> int:
+    return compactListmode.rowBytes(each["timeQuantum"]) if each.get("compact") else COLUMNS*8
+
+def createWriter(path: str, rows: int, each: dict = None, source: dict = None):
+    """
+    Function that creates the preallocated file of a product, a compactListmode.CompactWriter for a compact
+    product (with the source in its header), a ListmodeWriter otherwise.
+    """
+
+    if each is not None and each.get("compact"):
+        return compactListmode.CompactWriter(path, rows, each["timeQuantum"], each["faceOffset"], source)
+    return ListmodeWriter(path, rows)
+
+def openWriter(path: str):
+    return compactListmode.CompactWriter(path) if compactListmode.isCompact(path) else ListmodeWriter(path)
+
+def parseProduct(text: str) -> dict:
+    """
+    Function that reads a product from its name: "raw" or a time quantum such as "1ms", "0.5ms", "250us"
+    or "1s", optionally followed by @ and the face offset in mm, e.g. "1ms@-7.5" (FACE_OFFSET otherwise).
+    """
+
+    timeText, at, offsetText = text.strip().partition("@")
+    faceOffset = float(offsetText) if at else FACE_OFFSET
+    name = timeText + ("_face{}mm".format(offsetText) if at else "")
+    if timeText == "raw":
+        return product(None, faceOffset, name)
+    match = re.fullmatch(r"(\d+(?:\.\d*)?)\s*(s|ms|us|ns)", timeText)
+    if match is None or float(match.group(1)) <= 0:
+        raise ValueError("Unknown listmode product '{}', use raw or a time quantum such as 1ms, 0.5ms or 250us, optionally with @faceOffset in mm".format(text))
+    return product(float("{}e{}".format(match.group(1), TIME_EXPONENTS[match.group(2)])), faceOffset, name) # "1ms" is exactly 0.001
+
+def listmodeArrays(branches: dict, products: list) -> list:
+    """
+    Function that forms the listmode rows of a set of coincidences for every product, exactly as
+    listmode_ROOT2NPY_1ms.py formed them.  Products with the same face offset or time quantum share the
+    moved positions or the floored times.
+
+    Input:
+        branches: Dictionary of the LEAVES arrays
+        products: The products, see product
+
+    Output:
+        rows: One (coincidences, 8) float64 array per product
+    """
+
+    faces = {}
+    times = {}
+    arrays = []
+    for each in products:
+        faceOffset, timeQuantum = each["faceOffset"], each["timeQuantum"]
+        if faceOffset not in faces:
+            faces[faceOffset] = moveToFace(branches["globalPosX1"], branches["globalPosY1"], faceOffset) + moveToFace(branches["globalPosX2"], branches["globalPosY2"], faceOffset)
+        if timeQuantum not in times:
+            t1, t2 = branches["time1"], branches["time2"]
+            if timeQuantum is not None:
+                t2 = np.floor(t2/timeQuantum)*timeQuantum
+                t1 = np.floor(t1/timeQuantum)*timeQuantum
+            times[timeQuantum] = (t1, t2)
+        x1, y1, x2, y2 = faces[faceOffset]
+        t1, t2 = times[timeQuantum]
+        arrays.append(np.array([x1, y1, branches["globalPosZ1"], x2, y2, branches["globalPosZ2"], t1, t2], dtype = np.float64).T)
+    return arrays
+
+def listmodeArray(branches: dict, timeQuantum: float = 0.001, faceOffset: float = FACE_OFFSET) -> np.ndarray:
+    return listmodeArrays(branches, [product(timeQuantum, faceOffset)])[0]
+
+def readListmode(rootFile: str, timeQuantum: float = 0.001, faceOffset: float = FACE_OFFSET) -> np.ndarray:
+    """
+    Function that reads every coincidence of a ROOT file at once and forms their listmode rows, as the
+    listmode_ROOT2NPY scripts used to.  Needs several times the size of the output in memory, use
+    convertFile for anything big.
+
+    Input:
+        rootFile: The GATE ROOT file
+        timeQuantum, faceOffset: As in product
+
+    Output:
+        rows: The (coincidences, 8) float64 array
+    """
+
+    if uproot is None:
+        raise RuntimeError("Converting {} needs uproot, pip3 install uproot".format(rootFile))
+    with uproot.open(rootFile) as f:
+        branches = f[manifest.COINCIDENCES_TREE].arrays(list(LEAVES), library = "np")
+    return listmodeArray(branches, timeQuantum, faceOffset)
+
+def countEntries(rootFile: str) -> int:
+    if uproot is None:
+        raise RuntimeError("Converting {} needs uproot, pip3 install uproot".format(rootFile))
+    with uproot.open(rootFile) as f:
+        return int(f[manifest.COINCIDENCES_TREE].num_entries)
+
+def convertRange(rootFile: str, outputFiles: list, entryStart: int, entryStop: int, products: list, stepSize = STEP_SIZE, decompressionThreads: int = 1) -> int:
+    """
+    Function that converts a range of the coincidences of a ROOT file into their rows of the listmode
+    files of every product, preallocated by createWriter, step by step.  Every branch is read once per
+    step for all the products.  Ranges of the same file can be converted by different processes at the
+    same time, each only writes its own rows.
+
+    Input:
+        rootFile: The GATE ROOT file
+        outputFiles: The preallocated listmode file of every product
+        entryStart, entryStop: The coincidences to convert, also the rows they are written to
+        products: The products, see product
+        stepSize: Entries read per step, a number of entries or a size like "30 MB"
+        decompressionThreads: Threads that decompress the baskets (uproot's decompression_executor)
+
+    Output:
+        rows: The number of rows written into each file
+    """
+
+    if uproot is None:
+        raise RuntimeError("Converting {} needs uproot, pip3 install uproot".format(rootFile))
+    executor = ThreadPoolExecutor(max_workers = decompressionThreads) if decompressionThreads > 1 else None
+    start = entryStart
+    try:
+        with contextlib.ExitStack() as stack:
+            f = stack.enter_context(uproot.open(rootFile, array_cache = None, decompression_executor = executor))   # Nothing kept between the steps
+            writers = [stack.enter_context(openWriter(outputFile)) for outputFile in outputFiles]
+            for branches in f[manifest.COINCIDENCES_TREE].iterate(list(LEAVES), entry_start = entryStart, entry_stop = entryStop, step_size = stepSize, library = "np"):
+                for writer, rows in zip(writers, listmodeArrays(branches, products)):
+                    writer.write(start, rows)
+                start += len(branches[LEAVES[0]])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return start - entryStart
+
+def convertFile(rootFile: str, outputFile: str, timeQuantum: float = 0.001, faceOffset: float = FACE_OFFSET, stepSize = STEP_SIZE, decompressionThreads: int = 1, compact: bool = False) -> int:
+    """
+    Function that converts the coincidences of a ROOT file to a listmode NPY file, step by step.  The
+    Coincidences tree is read stepSize at a time and the rows of every step are written into their place
+    in the preallocated output, so the memory needed doesn't grow with the file.  The output is the same
+    file as np.save of readListmode, written as a partial file that is renamed once complete.
+
+    Input:
+        rootFile: The GATE ROOT file
+        outputFile: The listmode NPY file
+        timeQuantum, faceOffset, compact: As in product
+        stepSize, decompressionThreads: As in convertRange
+
+    Output:
+        rows: The number of rows written
+    """
+
+    entries = countEntries(rootFile)
+    each = product(timeQuantum, faceOffset, compact = compact)
+    partial = outputFile + ".partial"
+    try:
+        createWriter(partial, entries, each, compactListmode.sourceInfo(rootFile) if compact else None).close()
+        rows = convertRange(rootFile, [partial], 0, entries, [each], stepSize, decompressionThreads)
+        os.replace(partial, outputFile)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return rows
+
+def convertFiles(conversions: list, products: list, stepSize = STEP_SIZE, workers: int = None) -> dict:
+    """
+    Function that converts many ROOT files into every product on a pool of processes.  Every output is
+    preallocated, files with more than MIN_PART_ENTRIES coincidences are cut into entry ranges so a few
+    big files still keep every worker busy, and every range is converted by convertRange straight into its
+    rows of the outputs, reading the file once for all the products.  With fewer ranges than workers the
+    spare cores decompress (decompressionThreads).  The ROOT files of compact products are hashed on the
+    pool too, for the source in their header.  The outputs are renamed from their partial files once every
+    range is done.
+
+    Input:
+        conversions: (ROOT file, [listmode file of every product]) pairs
+        products: The products, see product
+        stepSize: As in convertRange
+        workers: The number of processes, all the CPUs by default
+
+    Output:
+        rows: Dictionary of ROOT file: number of rows of each of its outputs
+    """
+
+    workers = workers or os.cpu_count() or 1
+    entries = [countEntries(rootFile) for rootFile, outputFiles in conversions]
+    partEntries = max(MIN_PART_ENTRIES, -(-sum(entries)//(PARTS_PER_WORKER*workers)))                             # Every worker gets a few ranges, so they finish together
+    parts = []
+    partials = []
+    for (rootFile, outputFiles), count in zip(conversions, entries):
+        for outputFile, each in zip(outputFiles, products):
+            createWriter(outputFile + ".partial", count, each).close()
+            partials.append(outputFile + ".partial")
+        for entryStart in range(0, count, partEntries):
+            parts.append((rootFile, entryStart, min(count, entryStart + partEntries)))
+    threads = max(1, workers//max(1, len(parts)))
+
+    convertStart = time.time()
+    outputs = dict(conversions)
+    remaining = {rootFile: sum(1 for part in parts if part[0] == rootFile) for rootFile, outputFiles in conversions}
+    rows = {rootFile: 0 for rootFile, outputFiles in conversions}
+    sources = {}
+    finished = 0
+    try:
+        with ProcessPoolExecutor(max_workers = min(workers, max(1, len(parts)))) as pool:
+            futures = {pool.submit(convertRange, rootFile, [outputFile + ".partial" for outputFile in outputs[rootFile]], entryStart, entryStop, products, stepSize, threads): rootFile
+                       for rootFile, entryStart, entryStop in parts}
+            hashes = {pool.submit(compactListmode.sourceInfo, rootFile): rootFile for rootFile, outputFiles in conversions} if any(each.get("compact") for each in products) else {}
+            futures.update(hashes)
+            for future in as_completed(futures):
+                rootFile = futures[future]
+                if future in hashes:
+                    sources[rootFile] = future.result()
+                    continue
+                rows[rootFile] += future.result()
+                remaining[rootFile] -= 1
+                if remaining[rootFile] == 0:
+                    finished += 1
+                    print("Converted {} ({} of {} files, {:.1f} s)".format(rootFile, finished, len(conversions), time.time() - convertStart), flush = True)
+        for rootFile, outputFiles in conversions:                                                                   # Files without coincidences have no ranges
+            for outputFile, each in zip(outputFiles, products):
+                if each.get("compact"):
+                    compactListmode.setSource(outputFile + ".partial", sources[rootFile])
+                os.replace(outputFile + ".partial", outputFile)
+    finally:
+        for partial in partials:
+            if os.path.exists(partial):
+                os.remove(partial)
+    return rows
+
+def convertInputs(inputs: list, products: list, outputFolder: str, stepSize = STEP_SIZE, workers: int = None) -> dict:
+    """
+    Function that converts ROOT files and folders of ROOT files into every product, each product into its
+    own folder: outputFolder/<product name>/<ROOT file name>.npy (.lmc for a compact product).
+
+    Input:
+        inputs: ROOT files and folders, the ROOT files of a folder are converted
+        products: The products, see product and parseProduct
+        outputFolder: The folder of the product folders
+        stepSize, workers: As in convertFiles
+
+    Output:
+        rows: Dictionary of ROOT file: number of rows of each of its outputs
+    """
+
+    names = [each["name"] for each in products]
+    if len(set(names)) != len(names):
+        raise ValueError("Two listmode products have the same name: {}".format(names))
+    for name in names:
+        if not os.path.exists(os.path.join(outputFolder, name)):
+            os.makedirs(os.path.join(outputFolder, name))
+    conversions = [(rootFile, [productFile(os.path.join(outputFolder, each["name"]), each, os.path.basename(rootFile)) for each in products]) for rootFile in rootFiles(inputs)]
+    return convertFiles(conversions, products, stepSize, workers)
+
+def rootFiles(inputs: list, extensions: tuple = (".root",)) -> list:
+    """
+    Function that lists the ROOT files (or the files with other extensions) of files and folders, the files
+    of a folder in natural order (mp_2 before mp_10).
+    """
+
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            names = sorted((name for name in os.listdir(path) if name.endswith(extensions)), key = lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)])
+            files.extend(os.path.join(path, name) for name in names)
+        else:
+            files.append(path)
+    return files
+
+def readHeader(path: str) -> tuple:
+    """
+    Function that reads the header of an NPY file.
+
+    Output:
+        shape, fortranOrder, dtype: As in the header
+        offset: Bytes before the data
+    """
+
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        header = np.lib.format.read_array_header_1_0(f) if version == (1, 0) else np.lib.format.read_array_header_2_0(f)
+        return header + (f.tell(),)
+
+def shardRows(path: str):
+    """
+    Function that returns the number of rows of a listmode file, None if it is missing or unreadable.
+    """
+
+    try:
+        shape, fortranOrder, dtype, offset = readHeader(path)
+    except (OSError, ValueError):
+        return None
+    if len(shape) != 2 or shape[1] != COLUMNS or dtype != np.float64 or os.path.getsize(path) != offset + shape[0]*COLUMNS*8:
+        return None
+    return int(shape[0])
+
+def readBlocks(path: str, blockRows: int = COPY_ROWS):
+    """
+    Function that reads a listmode file blockRows rows at a time, without mapping the whole file.
+
+    Output:
+        Yields (first row, (rows, 8) float64 array) of every block
+    """
+
+    (rows, columns), fortranOrder, dtype, offset = readHeader(path)
+    with open(path, "rb") as f:
+        for start in range(0, rows, blockRows):
+            count = min(blockRows, rows - start)
+            block = np.empty((count, columns), dtype = np.float64)
+            if fortranOrder:
+                for column in range(columns):
+                    f.seek(offset + (column*rows + start)*8)
+                    block[:, column] = np.fromfile(f, dtype = np.float64, count = count)
+            else:
+                f.seek(offset + start*columns*8)
+                block[:] = np.fromfile(f, dtype = np.float64, count = count*columns).reshape(count, columns)
+            yield start, block
+
+def concatenateShards(shards: list, outputFile: str, each: dict = None, source: dict = None) -> int:
+    """
+    Function that writes the rows of the shards one after the other into one NPY file, the same bytes as
+    np.save of the listmodeArray of all their coincidences (or into a compact listmode file).  The shards
+    are copied COPY_ROWS rows at a time into the preallocated file, which is written as a partial file and
+    renamed once complete.
+
+    Input:
+        shards: The shard files, in order
+        outputFile: The listmode file
+        each, source: The product and the source of the output, as in createWriter
+
+    Output:
+        rows: The number of rows written
+    """
+
+    rows = [shardRows(path) for path in shards]
+    if None in rows:
+        raise ValueError("{} is not a listmode file".format(shards[rows.index(None)]))
+    partial = outputFile + ".partial"
+    try:
+        with createWriter(partial, sum(rows), each, source) as writer:
+            start = 0
+            for path, count in zip(shards, rows):
+                for first, block in readBlocks(path):
+                    writer.write(start + first, block)
+                start += count
+        os.replace(partial, outputFile)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return sum(rows)
+
+def listmodeBlocks(path: str, blockRows: int = COPY_ROWS):
+    return compactListmode.CompactListmode(path).blocks(blockRows) if compactListmode.isCompact(path) else readBlocks(path, blockRows)
+
+def repackFile(inputFile: str, outputFile: str, timeQuantum: float = 0.001, faceOffset: float = FACE_OFFSET) -> int:
+    """
+    Function that rewrites a listmode NPY file as a compact listmode file, or a compact file as an NPY file,
+    COPY_ROWS rows at a time.  The times of an NPY file have to be whole multiples of timeQuantum (the
+    product the file was made as), so an NPY file of quantised times repacks and expands to the same bytes.
+
+    Input:
+        inputFile: The listmode NPY or compact file
+        outputFile: The file in the other format, written as a partial file and renamed once complete
+        timeQuantum, faceOffset: The product of an NPY input, a compact file has them in its header
+
+    Output:
+        rows: The number of rows written
+    """
+
+    compact = compactListmode.isCompact(inputFile)
+    if compact:
+        rows = compactListmode.readHeader(inputFile)["rows"]
+    else:
+        rows = shardRows(inputFile)
+        if rows is None:
+            raise ValueError("{} is not a listmode file".format(inputFile))
+    partial = outputFile + ".partial"
+    try:
+        with createWriter(partial, rows, None if compact else product(timeQuantum, faceOffset, compact = True), None if compact else compactListmode.sourceInfo(inputFile)) as writer:
+            for start, block in listmodeBlocks(inputFile):
+                times = block[:, compactListmode.POSITIONS:]
+                if not compact and timeQuantum is not None and not np.array_equal(np.rint(times/timeQuantum)*timeQuantum, times):
+                    raise ValueError("The times of {} are not multiples of {} s, repack it as the product it was made as".format(inputFile, timeQuantum))
+                writer.write(start, block)
+        os.replace(partial, outputFile)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return rows
+
+def listmodeFile(config) -> str:
+    return productFile(config.OUTPUT_NPY, listmodeProduct(config), config.OUTPUT_ROOT_FILE_NAME)
+
+def listmodeProduct(config) -> dict:
+    return product(config.listmodeTimeQuantum, config.listmodeFaceOffset, compact = config.listmodeCompact)
+
+#####################
+###### CLASSES ######
+#####################
+
+class ListmodeWriter:
+    """
+    Preallocated listmode NPY file that is written a block of rows at a time, so the array is never in
+    memory as a whole.  The header and the data are laid out as np.save writes the listmodeArray of all
+    the rows, the transposed (8, rows) array one column after the other (one row is the same either way).
+
+        with ListmodeWriter(path, rows) as writer:
+            writer.write(firstRow, block)
+
+    Input:
+        path: The file
+        rows: The number of rows of the whole array, the file is created (overwritten).  None opens a file
+              created before, e.g. to write another range of its rows
+    """
+
+    def __init__(self, path: str, rows: int = None):
+        if rows is None:
+            (self.rows, columns), fortranOrder, dtype, self.offset = readHeader(path)
+            self.file = open(path, "r+b")
+            return
+        self.rows = int(rows)
+        self.file = open(path, "w+b")
+        np.lib.format.write_array_header_1_0(self.file, {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)), "fortran_order": self.rows > 1, "shape": (self.rows, COLUMNS)})
+        self.offset = self.file.tell()
+        self.file.truncate(self.offset + self.rows*COLUMNS*8)
+
+    def write(self, start: int, block: np.ndarray) -> None:
+        """
+        Writes the (n, 8) rows of block as rows start to start + n.
+        """
+
+        for column in range(COLUMNS):
+            self.file.seek(self.offset + (column*self.rows + start)*8)
+            self.file.write(np.ascontiguousarray(block[:, column], dtype = np.float64).tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+class ListmodeShards:
+    """
+    Background conversion of the finished chunks of a run to listmode shards.
+
+    Input:
+        config: The SimulationConfig of the run, with OUTPUT_NPY set
+        runManifest: The run manifest dictionary, shared with the scheduler callbacks
+    """
+
+    def __init__(self, config, runManifest: dict):
+        self.config = config
+        self.runManifest = runManifest
+        self.condition = threading.Condition()
+        self.finishing = False
+        self.error = None
+        self.convertTime = 0.0
+        self.settings = [config.listmodeTimeQuantum, config.listmodeFaceOffset] # Recorded in the manifest entry of every converted chunk
+        self.converted = set() # Indices of the chunks with a shard of the output they have now
+
+        with manifest.saveLock:
+            entries = list(runManifest["chunks"])
+        for entry in entries:
+            path = self.shardFile(entry["index"])
+            if entry["status"] == "done" and entry.get("listmode") == self.settings and shardRows(path) == entry.get("entries"):
+                self.converted.add(entry["index"])                                                              # Converted with these settings before a resume
+            elif os.path.exists(path):
+                os.remove(path)
+
+        self.thread = threading.Thread(target = self.run, daemon = True)
+
+    def shardFile(self, index: int) -> str:
+        return "{}mp_{}.npy".format(self.config.ROOT_FOLDER, index)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def notify(self) -> None:
+        """
+        Tells the conversion that a chunk finished, use as (part of) the scheduler onResult callback.
+        """
+
+        with self.condition:
+            self.condition.notify()
+
+    def readyChunks(self) -> list:
+        """
+        Returns the manifest entries of the finished chunks without a shard.
+        """
+
+        with manifest.saveLock:
+            return [dict(entry) for entry in self.runManifest["chunks"] if entry["status"] == "done" and entry["index"] not in self.converted]
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                ready = self.readyChunks()
+                while not ready and not self.finishing:
+                    self.condition.wait()
+                    ready = self.readyChunks()
+            if not ready:
+                return
+            for entry in ready:
+                if not self.convert(entry):
+                    return
+
+    def convert(self, entry: dict) -> bool:
+        """
+        Converts the output file of a chunk to its shard.
+        """
+
+        convertStart = time.time()
+        try:
+            convertFile(entry["rootFile"], self.shardFile(entry["index"]), *self.settings)
+        except Exception as error:
+            self.error = "Converting chunk {} to listmode failed: {}".format(entry["index"], error)
+            return False
+        with manifest.saveLock:
+            self.runManifest["chunks"][entry["index"]]["listmode"] = self.settings
+            manifest.saveManifest(self.config.RUN_MANIFEST, self.runManifest)
+        self.convertTime += time.time() - convertStart
+        self.converted.add(entry["index"])
+        return True
+
+    def finish(self, outputFile: str) -> bool:
+        """
+        Converts whatever is left, stops the background conversion and writes the shards into the listmode
+        file.  Only call it once every chunk has passed manifest.verifyForMerge.
+
+        Input:
+            outputFile: The listmode file, see listmodeFile
+
+        Output:
+            done: True if the listmode file was written with the coincidences of every chunk
+        """
+
+        finishStart = time.time()
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+        self.thread.join()
+        if self.error is not None:
+            print(self.error)
+            return False
+
+        entries = self.runManifest["chunks"]
+        if len(self.converted) != len(entries):
+            print("NOT writing the listmode file, chunks {} have no shard".format(sorted(set(entry["index"] for entry in entries) - self.converted)))
+            return False
+        folder = os.path.dirname(outputFile)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        rows = concatenateShards([self.shardFile(entry["index"]) for entry in entries], outputFile, listmodeProduct(self.config),
+                                 {"file": self.config.OUTPUT_ROOT_FILE_NAME, "configHash": self.runManifest["configHash"]})
+        expected = [entry.get("entries") for entry in entries]
+        if None not in expected and rows != sum(expected):
+            print("The listmode file has {} rows but the chunks have {} coincidences".format(rows, sum(expected)))
+            os.remove(outputFile)
+            return False
+        print("Listmode written in {:.1f} s ({:.1f} s of converting in total, the rest overlapped the simulation)".format(time.time() - finishStart, self.convertTime), flush = True)
+        return True
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def parseStepSize(stepSize: str):
+    return int(stepSize) if stepSize.isdigit() else stepSize # A number of entries or a size like "100 MB"
+
+def main():
+    parser = argparse.ArgumentParser(description = "Convert the coincidences of GATE ROOT files to listmode NPY files, every product from one read, on a pool of processes")
+    parser.add_argument("inputs", nargs = "+", help = "The ROOT files, or folders of ROOT files")
+    parser.add_argument("-o", "--output", required = True, help = "The folder the product folders are written to, OUTPUT/<product>/NAME.npy")
+    parser.add_argument("--products", nargs = "+", default = ["1ms"], help = "raw or time quanta such as 1ms, 0.5ms or 250us, each optionally with @faceOffset in mm (default {:g}), e.g. 1ms raw 1ms@-7.5".format(FACE_OFFSET))
+    parser.add_argument("--step-size", default = STEP_SIZE, help = "Entries read per step, a number or a size like \"30 MB\"")
+    parser.add_argument("--workers", type = int, default = None, help = "Processes converting at the same time, all the CPUs by default")
+    parser.add_argument("--compact", action = "store_true", help = "Write compact listmode files (NAME{}, float32 positions and integer time ticks), see compactListmode.py".format(compactListmode.EXTENSION))
+    parser.add_argument("--repack", action = "store_true", help = "The inputs are listmode files, NPY files are rewritten as compact files of the (first) product and compact files as NPY files, into OUTPUT")
+    args = parser.parse_args()
+    products = [parseProduct(text) for text in args.products]
+    for each in products:
+        each["compact"] = args.compact
+
+    convertStart = time.time()
+    if args.repack:
+        if not os.path.exists(args.output):
+            os.makedirs(args.output)
+        rows = {}
+        for inputFile in rootFiles(args.inputs, (".npy", compactListmode.EXTENSION)):
+            outputFile = productFile(args.output, dict(products[0], compact = not compactListmode.isCompact(inputFile)), os.path.basename(inputFile))
+            rows[inputFile] = repackFile(inputFile, outputFile, products[0]["timeQuantum"], products[0]["faceOffset"])
+            print("Repacked {} into {} ({:.1f} MB to {:.1f} MB)".format(inputFile, outputFile, os.path.getsize(inputFile)/1e6, os.path.getsize(outputFile)/1e6), flush = True)
+        print("Repacked {} coincidences of {} files in {:.1f} s".format(sum(rows.values()), len(rows), time.time() - convertStart))
+        return
+    rows = convertInputs(args.inputs, products, args.output, parseStepSize(args.step_size), args.workers)
+    seconds = time.time() - convertStart
+    print("Converted {} coincidences of {} files into {} products in {:.1f} s, {:.4g} coincidences/s".format(sum(rows.values()), len(rows), len(args.products), seconds, sum(rows.values())/max(seconds, 1e-9)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark of the listmode conversion (see listmode.py).  Every ROOT file is converted the way the
+listmode_ROOT2NPY scripts used to, every branch read whole and the array saved at once (readListmode), and
+by convertFile at every step size, each in a fresh process so the peak memory (ru_maxrss) is its own.  The
+entries per second and the peak resident memory of every conversion are printed and the outputs are
+checked to be the same file.  With --workers the files are also converted together by convertFiles on
+pools of that many processes and the coincidences per second and the speed up over one process are printed,
+to see how the batch conversion scales with the cores.
+
+    python3 -m GateOrchestrator.listmodeBenchmark Output/NAME.root [--step-size "10 MB" "100 MB"]
+    python3 -m GateOrchestrator.listmodeBenchmark --synthetic 1000000 10000000 --folder /tmp/listmode/
+    python3 -m GateOrchestrator.listmodeBenchmark sweepOutput/*.root --workers 1 8 32 100 --no-memory
+
+With --synthetic, ROOT files with that many random coincidences are written into --folder first and
+converted instead, so the peak memory can be compared over file sizes.
+
+Required Packages: numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import contextlib
+import filecmp
+import io
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from GateOrchestrator import listmode, manifest, dryRun
+
+try:
+    import uproot
+except ImportError:
+    uproot = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+SYNTHETIC_STEP = 1000000 # Coincidences written at a time into a synthetic file
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def writeSynthetic(path: str, entries: int) -> None:
+    """
+    Function that writes a ROOT file with random coincidences in the ring (the listmode leaves only).
+
+    Input:
+        path: The ROOT file
+        entries: The number of coincidences
+    """
+
+    rng = np.random.default_rng(entries)
+    with uproot.recreate(path) as f:
+        tree = f.mktree(manifest.COINCIDENCES_TREE, {leaf: np.float64 if leaf.startswith("time") else np.float32 for leaf in listmode.LEAVES})
+        for start in range(0, entries, SYNTHETIC_STEP):
+            count = min(SYNTHETIC_STEP, entries - start)
+            branches = {leaf: rng.normal(0.0, 400.0, count).astype(np.float32) for leaf in listmode.LEAVES if not leaf.startswith("time")}
+            branches["time1"] = start*1e-6 + np.sort(rng.uniform(0.0, count*1e-6, count))
+            branches["time2"] = branches["time1"] + rng.uniform(0.0, 4e-9, count)
+            tree.extend(branches)
+
+def measure(rootFile: str, outputFile: str, stepSize) -> dict:
+    """
+    Function that converts a ROOT file and measures it, run in a fresh process.
+
+    Input:
+        rootFile: The ROOT file
+        outputFile: The listmode NPY file
+        stepSize: The step size of convertFile, None to read the branches whole (readListmode)
+
+    Output:
+        measured: Dictionary with the "entries", "seconds", "peakRSS" and the "baseRSS" (bytes) before the
+                  conversion
+    """
+
+    baseRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+    convertStart = time.time()
+    if stepSize is None:
+        rows = listmode.readListmode(rootFile)
+        np.save(outputFile, rows)
+        entries = len(rows)
+        del rows
+    else:
+        entries = listmode.convertFile(rootFile, outputFile, stepSize = stepSize)
+    return {"entries": entries, "seconds": time.time() - convertStart, "peakRSS": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024, "baseRSS": baseRSS}
+
+def benchmark(rootFile: str, stepSizes: list, folder: str) -> list:
+    """
+    Function that converts a ROOT file with every branch read whole and step by step at every step size
+    and prints the entries per second and peak memory.
+
+    Input:
+        rootFile: The ROOT file
+        stepSizes: The step sizes of convertFile to compare
+        folder: Where the outputs are written, they are removed afterwards
+
+    Output:
+        results: One dictionary from measure per conversion, with its "method"
+    """
+
+    results = []
+    outputs = []
+    print("\n{} ({})".format(rootFile, dryRun.formatBytes(os.path.getsize(rootFile))))
+    for stepSize in [None] + list(stepSizes):
+        outputFile = os.path.join(folder, "listmodeBenchmark_{}.npy".format(len(outputs)))
+        with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context("spawn")) as pool:       # A fresh process, so the peak memory is only this conversion's
+            result = pool.submit(measure, rootFile, outputFile, stepSize).result()
+        result["method"] = "whole file" if stepSize is None else "steps of {}".format(stepSize)
+        results.append(result)
+        outputs.append(outputFile)
+        print("{:>18s}: {:.4g} entries/s ({:.1f} s), peak RSS {} ({} before converting)".format(result["method"], result["entries"]/max(result["seconds"], 1e-9), result["seconds"],
+              dryRun.formatBytes(result["peakRSS"]), dryRun.formatBytes(result["baseRSS"])), flush = True)
+
+    same = all(filecmp.cmp(outputs[0], path, shallow = False) for path in outputs[1:])
+    print("Outputs are {}".format("the same file" if same else "DIFFERENT"))
+    for path in outputs:
+        os.remove(path)
+    return results
+
+def scaling(rootFiles: list, workerCounts: list, folder: str) -> list:
+    """
+    Function that converts a set of ROOT files with convertFiles on pools of different sizes and prints
+    the coincidences per second and the speed up over the smallest pool.
+
+    Input:
+        rootFiles: The ROOT files
+        workerCounts: The pool sizes to compare
+        folder: Where the outputs are written, they are removed afterwards
+
+    Output:
+        results: One dictionary per pool size with the "workers", "entries" and "seconds"
+    """
+
+    results = []
+    print("\nConverting {} files ({}) on pools of {} processes".format(len(rootFiles), dryRun.formatBytes(sum(os.path.getsize(path) for path in rootFiles)), ", ".join(str(workers) for workers in workerCounts)))
+    conversions = [(rootFile, [os.path.join(folder, "listmodeScaling_{}.npy".format(i))]) for i, rootFile in enumerate(rootFiles)]
+    for workers in workerCounts:
+        convertStart = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):                                                                      # Not a line per file
+            rows = listmode.convertFiles(conversions, [listmode.product()], workers = workers)
+        result = {"workers": workers, "entries": sum(rows.values()), "seconds": time.time() - convertStart}
+        results.append(result)
+        speedUp = results[0]["seconds"]/result["seconds"]
+        print("{:5d} workers: {:.4g} coincidences/s ({:.1f} s), {:.2f}x the {} worker pool, {:.0f} % parallel efficiency".format(workers, result["entries"]/result["seconds"], result["seconds"],
+              speedUp, results[0]["workers"], 100*speedUp*results[0]["workers"]/workers), flush = True)
+        for rootFile, outputFiles in conversions:
+            os.remove(outputFiles[0])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the listmode conversion read whole against step by step, entries per second and peak memory")
+    parser.add_argument("inputs", nargs = "*", help = "The ROOT files to convert")
+    parser.add_argument("--step-size", nargs = "+", default = [listmode.STEP_SIZE], help = "Step sizes of the step by step conversion, numbers of entries or sizes like \"100 MB\"")
+    parser.add_argument("--synthetic", type = int, nargs = "+", default = [], metavar = "ENTRIES", help = "Write and convert ROOT files with this many random coincidences")
+    parser.add_argument("--folder", default = ".", help = "Where the synthetic files and the outputs are written")
+    parser.add_argument("--workers", type = int, nargs = "+", default = [], help = "Also convert all the files together on pools of this many processes")
+    parser.add_argument("--no-memory", action = "store_true", help = "Skip the whole file and step by step comparison of every file")
+    args = parser.parse_args()
+
+    inputs = list(args.inputs)
+    for entries in args.synthetic:
+        path = os.path.join(args.folder, "listmodeBenchmark_{}.root".format(entries))
+        if not os.path.exists(path):
+            print("Writing {} random coincidences into {}".format(entries, path), flush = True)
+            writeSynthetic(path, entries)
+        inputs.append(path)
+    if not args.no_memory:
+        for rootFile in inputs:
+            benchmark(rootFile, [listmode.parseStepSize(stepSize) for stepSize in args.step_size], args.folder)
+    if args.workers:
+        scaling(inputs, sorted(args.workers), args.folder)
+
+if __name__ == "__main__":
+    main()
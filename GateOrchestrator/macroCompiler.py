@@ -0,0 +1,1058 @@
+"""
+Macro compiler for the HR++ simulation.  A run used to write the whole macro (geometry, physics, digitiser,
+sources) once per chunk although only the time window and the seed change between chunks.  Now the part
+that is the same for every chunk is rendered once per configuration into a shared setup macro, and every
+chunk only gets two tiny macros:
+
+    MACRO_FOLDER/NAME_setup_<hash>.mac    Everything up to /gate/source/list, shared by all the chunks
+    MACRO_FOLDER/NAME_i.mac               /control/execute of the setup, the time slices of the run and
+                                          /control/execute of the window macro
+    MACRO_FOLDER/NAME_i_window.mac        Output, statistics and summary files and seed of chunk i, then
+                                          startDAQCluster of its window
+    MACRO_FOLDER/NAME_phantomN_i.placements   The part of the trajectory of phantom N chunk i needs, see placements.py
+    MACRO_FOLDER/NAME_i_motion.mac        setPlacementsFilename of the slices of chunk i, executed before its
+                                          window only when a persistent worker chains it after another one
+                                          (the chunk macro has the setup read them through the alias)
+
+Rendered setups are memoised by the hash of the controls they depend on, so the jobs of a sweep that share
+a configuration (e.g. only the acquisition times or seeds differ) render it once.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import hashlib
+import io
+import json
+import math
+import os
+
+from GateOrchestrator import chunkCache, placements, costModel, positronRange, physicsTables, runReport
+from GateOrchestrator.config import PHYSICS_PRESETS
+
+#######################
+###### CONSTANTS ######
+#######################
+
+SETUP_IGNORE = chunkCache.SIGNATURE_IGNORE | {"runSeed", "timeStep", "motionTolerance", "genericMotionFileName1", "genericMotionFileName2"} # Controls that only go into the chunk and window macros
+
+HALF_LIVES = {"ga68": "4062.6 s", "f18": "6586.26 s", "na22": "8.199e+7 s"} # The forced half lives of the positron sources
+renderedSetups = {} # Setup hash: rendered setup macro
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def setupHash(config) -> str:
+    """
+    Function that hashes the controls the setup macro depends on.
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        digest: A short hex digest
+    """
+
+    relevant = {key: value for key, value in config.controls().items()
+                if key not in SETUP_IGNORE and isinstance(value, (str, int, float, bool))}
+    return hashlib.sha1(json.dumps(relevant, sort_keys = True).encode()).hexdigest()[:16]
+
+def renderSetup(config) -> str:
+    """
+    Function that renders the setup macro of a configuration, once per setup hash.
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        macro: The setup macro text
+    """
+
+    key = setupHash(config)
+    if key not in renderedSetups:
+        renderedSetups[key] = composeSetup(config)
+    return renderedSetups[key]
+
+def backLayer(config) -> tuple:
+    """
+    Function that sizes the back layer of the fast geometry tier: a glass slab over the whole block face,
+    directly behind the crystals, with the same glass volume per block face area as the PMT tubes and caps
+    of the full tier, so photons leaving the back of the crystals see about the same attenuation.
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        thickness: The X length of the slab, e.g. "8.74 mm"
+        translation: The placement of the slab in the block
+    """
+
+    quantity = costModel.parseQuantity
+    tube = math.pi*(quantity(config.pmtOuterRadiusMax)**2 - quantity(config.pmtOuterRadiusMin)**2)*quantity(config.pmtOuterHeight)
+    caps = 2*math.pi*(quantity(config.pmtCapRadiusMax)**2 - quantity(config.pmtCapRadiusMin)**2)*quantity(config.pmtCapHeight)
+    pmts = int(config.pmtOuterRepeaterX)*int(config.pmtOuterRepeaterY)*int(config.pmtOuterRepeaterZ)
+    thickness = pmts*(tube + caps)/(quantity(config.blockYLength)*quantity(config.blockZLength))
+
+    crystalX = config.crystalTranslation.split()
+    back = float(crystalX[0])*costModel.UNITS[crystalX[-1]] + quantity(config.crystalXLength)/2                  # The back face of the crystals
+    return "{:.4f} mm".format(thickness), "{:.4f} {} {} mm".format(back + thickness/2, 0.0, 0.0)
+
+def backToBackSources(config) -> str:
+    """
+    Function that writes the phantom sources of sourceMode = "backtoback": 511 keV gamma pairs from where
+    the positrons are emitted, or with positronRangeKernel from where they annihilate (see positronRange.py).
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        macro: The source part of the setup macro
+    """
+
+    quantity = costModel.parseQuantity
+    sources = [] # (name, isotope, activity, attach, emission shell radii in mm, forbidden volume)
+    if config.ga68source1 == True:
+        sources.append(("ga68.1", "ga68", config.sourceActivity1, config.sourceAttach1, (0.0, 0.0), None))
+    if config.ga68sourceSphere1 == True:
+        sources.append(("ga68_1", "ga68", config.sourceActivity1, config.sourceAttach1, (quantity(config.nrwPhantomTracerForbidRmax), quantity(config.sourceActivity1Radius)), config.sourceForbid1))
+    if config.f18source1 == True:
+        sources.append(("f18.1", "f18", config.sourceActivity1, config.sourceAttach1, (0.0, 0.0), None))
+    if config.na22source1 == True:
+        sources.append(("na22.1", "na22", config.sourceActivity1, config.sourceAttach1, (0.0, 0.0), None))
+    if config.activatePhantom2 == True:
+        for isotope in ("ga68", "f18", "na22"):
+            if getattr(config, isotope + "source2") == True:
+                sources.append((isotope + ".2", isotope, config.sourceActivity2, config.sourceAttach2, (0.0, 0.0), None))
+
+    file = io.StringIO()
+    for name, isotope, activity, attach, (radiusMin, radiusMax), forbid in sources:
+        if config.positronRangeKernel:
+            spheres = positronRange.kernelSpheres(positronRange.sampleAnnihilations(isotope, config.positronRangeDensity, radiusMin, radiusMax))
+            parts = [("{}_{}".format(name, k), "{:.6g} Bq".format(quantity(activity)*fraction), "{:.6g} mm".format(radius), None) for k, (radius, fraction) in enumerate(spheres)]
+        else:
+            parts = [(name, activity, "{:.6g} mm".format(radiusMax) if radiusMax > 0 else None, forbid)]
+
+        file.write("#   {} - BACK TO BACK{}\n".format(isotope.upper(), " - POSITRON RANGE KERNEL" if config.positronRangeKernel else ""))
+        for part, partActivity, radius, partForbid in parts:
+            file.write(
+                "/gate/source/addSource                         {} backtoback                   # Two back to back 511 keV gammas per decay, no positron\n"
+                "/gate/source/{}/setActivity                  {}                       # Activity of source\n"
+                "/gate/source/{}/gps/particle                 gamma                            # ++ Same as Above ++\n"
+                "/gate/source/{}/gps/energytype               Mono                             # ++ Same as Above ++\n"
+                "/gate/source/{}/gps/monoenergy               511.0 keV                        # ++ Same as Above ++\n"
+                "/gate/source/{}/setForcedUnstableFlag        true                             # Forcing the source to be unstable and have the ability to decay\n"
+                "/gate/source/{}/setForcedHalfLife            {}                         # The half life of the isotope\n"
+                "/gate/source/{}/gps/centre                   0.0 0.0 0.0 cm                   # Specifying the position of the source\n"
+                "/gate/source/{}/gps/angtype                  iso                              # Specfying the angular distribution of the decay particles\n"
+                "/gate/source/{}/attachTo                     {}                          # Attaching the source to a volume.  This is for motion.\n"
+                .format(part, part, partActivity, part, part, part, part, part, HALF_LIVES[isotope], part, part, part, attach)
+            )
+            if radius is not None:
+                file.write(
+                    "/gate/source/{}/gps/type                     Volume                          # Specifying that the source is a volume\n"
+                    "/gate/source/{}/gps/shape                    Sphere                          # ++ Same as Above ++\n"
+                    "/gate/source/{}/gps/radius                   {}                         # Radius of source\n"
+                    .format(part, part, part, radius)
+                )
+            if partForbid is not None:
+                file.write("/gate/source/{}/gps/Forbid                   {}\n".format(part, partForbid))
+            file.write("\n")
+    return file.getvalue()
+
+def composeSetup(config) -> str:
+    """
+    Function that writes the part of the macro that is the same for every chunk: world, scanner, phantoms,
+    motion, physics, digitiser, outputs and sources.
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        macro: The setup macro text
+    """
+
+    file = io.StringIO()
+
+    file.write(
+        "#  WORLD\n"
+        "/gate/geometry/setMaterialDatabase                      data/GateMaterials.db                # Database of materials that can be used\n"
+        "/gate/world/geometry/setXLength                         {}                                   # The x component of the world\n"
+        "/gate/world/geometry/setYLength                         {}                                   # The y component of the world\n"
+        "/gate/world/geometry/setZLength                         {}                                   # The z component of the world\n"
+        "/gate/world/setMaterial                                 {}                                   # The material the world\n"
+        "\n".format(config.worldXLength, config.worldYLength, config.worldZLength, config.worldMaterial)
+        )
+
+    file.write(
+        "#   CPET\n"
+        "/gate/world/daughters/name                              CPET                                 # The name of the new volume\n" 
+        "/gate/world/daughters/insert                            cylinder                             # Inserting a cylinder into the world volume\n"
+        "/gate/CPET/setMaterial                                  {}                                   # The material the cylinder is made of\n" 
+        "/gate/CPET/geometry/setRmax                             {}                                   # The outer radius of the cylinder\n"
+        "/gate/CPET/geometry/setRmin                             {}                                   # The inner radius of the cylinder\n"
+        "/gate/CPET/geometry/setHeight                           {}                                   # The height/length of the cylinder\n"
+        "/gate/CPET/vis/forceWireframe                                                                # Forces the volume to be a wireframe.  It is transparent\n"
+        "\n".format(config.CPETcylinderMaterial, config.CPETcylinderMaxRadius, config.CPETcylinderMinRadius, config.CPETclyinderHeight)
+    )
+
+    file.write(
+        "#   Sector\n"
+        "/gate/CPET/daughters/name                              sector                                # The name of the new volume\n"
+        "/gate/CPET/daughters/insert                            cylinder                              # Inserting a cylinder into the world volume\n"
+        "/gate/sector/setMaterial                             {}                                    # The material the cylinder is made of\n"
+        "/gate/sector/placement/setTranslation                {}                          # The position of the box\n"
+        "/gate/sector/geometry/setRmax                        {}                                # The outer radius of the cylinder\n" 
+        "/gate/sector/geometry/setRmin                        {}                                # The inner radius of the cylinder\n"
+        "/gate/sector/geometry/setHeight                      {}                                 # The height/length of the cylinder\n"
+        "/gate/sector/geometry/setPhiStart                    {}                                # The start angle of the cylinder\n"
+        "/gate/sector/geometry/setDeltaPhi                    {}                                   # The phi or x-y angle that the cylinder will span starting from phi start and ending at phi star + delta phi\n"
+        "/gate/sector/vis/forceWireframe                                                              # Forces the volume to be a wireframe.  It is transparent\n"
+        "/gate/sector/vis/setVisible                          1                                       # Visibility option\n"
+        "/gate/sector/vis/setColor                            red                                     # Setting the colour of the geometry\n"
+        "\n".format(config.sectorMaterial, config.sectorTranslation, config.sectorMaxRadius, config.sectorMinRadius, config.sectorHeight, config.sectorPhiStart, config.sectorDeltaPhi)
+    )
+
+    # file.write(
+    #     "#  SECTOR REPEAT\n"
+    #     "/gate/sector/repeaters/insert                         {}                                 # Linear repeater.  Repeats geometry in one direction with centre-to-centre spacing\n"
+    #     "/gate/sector/ring/setRepeatNumber                     {}                                    # The number of times the geometry is going to be repeated\n"
+    #     "/gate/sector/ring/excludeBlock1                       {}                                     # The fist blocks segment to be excluded, a max of 4 can be removed\n" 
+    #     "/gate/sector/ring/excludeBlock2                       {}                                    # The second blocks segment to be excluded, a max of 4 can be removed\n"
+    #     "\n".format(sectorRepeatType, sectorRepeatNo, sectorRepeatExclude1, sectorRepeatExclude2)
+    # )
+
+    file.write(
+        "#  SECTOR REPEAT\n"
+        "/gate/sector/repeaters/insert                         {}                                 # Linear repeater.  Repeats geometry in one direction with centre-to-centre spacing\n"
+        "/gate/sector/ring/setRepeatNumber                     {}                                    # The number of times the geometry is going to be repeated\n"
+        # "/gate/sector/ring/excludeBlock1                       {}                                     # The fist blocks segment to be excluded, a max of 4 can be removed\n" 
+        # "/gate/sector/ring/excludeBlock2                       {}                                    # The second blocks segment to be excluded, a max of 4 can be removed\n"
+        "\n".format(config.sectorRepeatType, config.sectorRepeatNo)
+    )
+
+    file.write(
+        "#   CASSETTE\n"
+        "/gate/sector/daughters/name                            cassette                             # The name of the new volume\n"
+        "/gate/sector/daughters/insert                          cylinder                             # Inserting a cylinder into the world volume\n"
+        "/gate/cassette/setMaterial                             {}                                  # The material the cylinder is made of\n"
+        "/gate/cassette/placement/setTranslation                {}                      # The position of the box\n"
+        "/gate/cassette/geometry/setRmax                        {}                             # The outer radius of the cylinder\n"
+        "/gate/cassette/geometry/setRmin                        {}                             # The inner radius of the cylinder\n"
+        "/gate/cassette/geometry/setHeight                      {}                              # The height/length of the cylinder\n"
+        "/gate/cassette/geometry/setPhiStart                    {}                             # ++ Same as Above ++\n"
+        "/gate/cassette/geometry/setDeltaPhi                    {}                                # ++ Same as Above ++\n"
+        "/gate/cassette/vis/forceWireframe                                                           # Forces the volume to be a wireframe.  It is transparent\n"
+        "/gate/cassette/vis/setColor                            cyan                                 # ++ Same as Above ++\n"
+        "/gate/cassette/vis/setVisible                          0                                    # ++ Same as Above ++\n"
+        "\n".format(config.cassetteMaterial, config.cassetteTranslation, config.cassetteMaxRadius, config.cassetteMinRadius, config.cassetteHeight, config.cassettePhiStart, config.cassetteDeltaPhi)
+    )
+
+    file.write(
+        "#   BLOCK\n"
+        "/gate/cassette/daughters/name                           block                               # ++ Same as Above ++\n"
+        "/gate/cassette/daughters/insert                         box                                 # Defining a box that exists within ecat\n"
+        "/gate/block/placement/setTranslation                    {}                                  # The position of the box 449.85 -21.37449981\n"
+        "/gate/block/placement/setRotationAxis                   {}                               # ++ Same as Above ++\n"
+        "/gate/block/placement/setRotationAngle                  {}                            # ++ Same as Above ++\n"
+        "/gate/block/geometry/setXLength                         {}                             # The x component of the box\n"
+        "/gate/block/geometry/setYLength                         {}                            # The y component of the box\n"
+        "/gate/block/geometry/setZLength                         {}                            # The z component of the box\n"
+        "/gate/block/setMaterial                                 {}                                 # The material which the box is made of\n"
+        "/gate/block/vis/forceWireframe                                                              # Forces the volume to be a wireframe.  It is transparent\n"
+        "/gate/block/vis/setVisible                              1\n"
+        "\n".format(config.blockTranslation, config.blockRotationAxis, config.blockRotationAngle, config.blockXLength, config.blockYLength, config.blockZLength, config.blockMaterial)
+    )
+
+    file.write(
+        "#   BLOCK REPEAT\n"
+        "/gate/block/repeaters/insert                            {}                              # Linear repeater.  Repeats geometry in one direction with centre-to-centre spacing\n"
+        "/gate/block/linear/setRepeatNumber                      {}                                  # The number of times the geometry is going to be repeated\n"
+        "/gate/block/linear/setRepeatVector                      {}                     # The repeat vector specifies the vector centre-to-centre spacing of the repeated volumes\n"
+        "\n".format(config.blockRepeatType, config.blockRepeatNo, config.blockRepeatVector)
+    )
+
+    file.write(
+        "#   CRYSTAL\n"
+        "/gate/block/daughters/name                              crystal                             # ++ Same as Above ++\n"
+        "/gate/block/daughters/insert                            box                                 # ++ Same as Above ++\n"
+        "/gate/crystal/geometry/setXLength                       {}                             # ++ Same as Above ++\n"
+        "/gate/crystal/geometry/setYLength                       {}                             # ++ Same as Above ++\n"
+        "/gate/crystal/geometry/setZLength                       {}                             # ++ Same as Above ++\n"
+        "/gate/crystal/placement/setTranslation                  {}                    # ++ Same as Above ++\n"
+        "/gate/crystal/setMaterial                               {}                                 # ++ Same as Above ++\n"
+        "/gate/crystal/vis/setColor                              yellow                              # ++ Same as Above ++\n"
+        "\n".format(config.crystalXLength, config.crystalYLength, config.crystalZLength, config.crystalTranslation, config.crystalMaterial)
+    )
+
+    file.write(
+        "#   REPEAT CRYSTAL\n"
+        "/gate/crystal/repeaters/insert                          {}                          # A cubic array repeater, Repeats volumes in the x,y and z direction\n"              
+        "/gate/crystal/cubicArray/setRepeatNumberX               {}                                   # The number of x repitiions\n" 
+        "/gate/crystal/cubicArray/setRepeatNumberY               {}                                   # The number of y repitiions\n"
+        "/gate/crystal/cubicArray/setRepeatNumberZ               {}                                   # The number of z repitiions\n"
+        "/gate/crystal/cubicArray/setRepeatVector                {}                     # The repeat vector specifies the centre-to-centre spacing of the repeated volumes,  0. 4.51 4.85\n"
+        "\n".format(config.crystalRepeatType, config.crystalRepeatX, config.crystalRepeatY, config.crystalRepeatZ, config.crystalRepeatVector)
+    )
+
+    if config.geometryTier == "full":
+        file.write(
+            "#   PMT OUTER LAYER\n"
+            "/gate/block/daughters/name                             pmt1                                 # ++ Same as Above ++\n" 
+            "/gate/block/daughters/insert                           cylinder                             # ++ Same as Above ++\n"
+            "/gate/pmt1/placement/setTranslation                    {}                      # ++ Same as Above ++\n" 
+            "/gate/pmt1/placement/alignToX                                                               # Aligns the axial component of the cylinder with the x axis\n"
+            "/gate/pmt1/geometry/setRmax                            {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1/geometry/setRmin                            {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1/geometry/setHeight                          {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1/setMaterial                                 {}                   # ++ Same as Above ++\n"
+            "/gate/pmt1/vis/forceSolid                                                                   # Forces the volume to be a solid and not wireframe\n"
+            "/gate/pmt1/vis/setVisible                              1                                    # ++ Same as Above ++\n"
+            "/gate/pmt1/vis/setColor                                red                                  # ++ Same as Above ++\n"
+            "\n".format(config.pmtOuterTranslation, config.pmtOuterRadiusMax, config.pmtOuterRadiusMin, config.pmtOuterHeight, config.pmtOuterMaterial)
+        )
+
+        file.write(
+            "#	PMT OUTER LAYER REPEATER\n"
+            "/gate/pmt1/repeaters/insert                            {}                           # ++ Same as Above ++\n"
+            "/gate/pmt1/cubicArray/setRepeatNumberX                 {}                                    # ++ Same as Above ++\n"
+            "/gate/pmt1/cubicArray/setRepeatNumberY                 {}                                    # ++ Same as Above ++\n"
+            "/gate/pmt1/cubicArray/setRepeatNumberZ                 {}                                    # ++ Same as Above ++\n"  
+            "/gate/pmt1/cubicArray/setRepeatVector                  {}                   # ++ Same as Above ++\n"
+            "\n".format(config.pmtOuterRepeaterType, config.pmtOuterRepeaterX, config.pmtOuterRepeaterY, config.pmtOuterRepeaterZ, config.pmtOuterRepeaterVector)
+        )
+
+        file.write(
+            "#   PMT INNER LAYER\n"
+            "/gate/pmt1/daughters/name                              pmt2                                 # ++ Same as Above ++\n"
+            "/gate/pmt1/daughters/insert                            cylinder                             # ++ Same as Above ++\n"
+            "/gate/pmt2/placement/setTranslation                    {}                       # ++ Same as Above ++\n"
+            "#/gate/pmt2/placement/alignToX                                                              # ++ Same as Above ++\n"
+            "/gate/pmt2/geometry/setRmax                            {}                              # ++ Same as Above ++\n"
+            "/gate/pmt2/geometry/setRmin                            {}                              # ++ Same as Above ++\n"
+            "/gate/pmt2/geometry/setHeight                          {}                              # ++ Same as Above ++\n"
+            "/gate/pmt2/setMaterial                                 {}                               # ++ Same as Above ++\n"
+            "/gate/pmt2/vis/forceSolid                                                                   # ++ Same as Above ++\n"
+            "/gate/pmt2/vis/setVisible                              0                                    # ++ Same as Above ++\n"
+            "/gate/pmt2/vis/setColor                                green                                # ++ Same as Above ++\n"
+            "\n".format(config.pmtInnterTranslation, config.pmtInnerRadiusMax, config.pmtInnerRadiusMin, config.pmtInnerHeight, config.pmtInnerMaterial)
+        )
+
+        file.write(
+            "#   PMT TOP CAP\n"
+            "/gate/pmt1/daughters/name                              pmt1TopCap                           # ++ Same as Above ++\n"
+            "/gate/pmt1/daughters/insert                            cylinder                             # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/placement/setTranslation              {}                      # ++ Same as Above ++\n"
+            "#/gate/pmt2/placement/alignToX                                                              # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/geometry/setRmax                      {}                             # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/geometry/setRmin                      {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/geometry/setHeight                    {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/setMaterial                           {}                    # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/vis/forceSolid                                                             # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/vis/setVisible                        1                                    # ++ Same as Above ++\n"
+            "/gate/pmt1TopCap/vis/setColor                          red                                  # ++ Same as Above ++\n"
+            "\n".format(config.pmtTCTranslation, config.pmtCapRadiusMax, config.pmtCapRadiusMin, config.pmtCapHeight, config.pmtCapMaterial)
+        )
+
+        file.write(
+            "#   PMT BOTTOM CAP\n"
+            "/gate/pmt1/daughters/name                              pmt1BottomCap                        # ++ Same as Above ++\n"
+            "/gate/pmt1/daughters/insert                            cylinder                             # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/placement/setTranslation           {}                     # ++ Same as Above ++\n"
+            "#/gate/pmt2/placement/alignToX                                                              # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/geometry/setRmax                   {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/geometry/setRmin                   {}                              # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/geometry/setHeight                 {}                               # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/setMaterial                        {}                         # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/vis/forceSolid                                                          # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/vis/setVisible                     1                                    # ++ Same as Above ++\n"
+            "/gate/pmt1BottomCap/vis/setColor                       red                                  # ++ Same as Above ++\n"
+            "\n".format(config.pmtBCTranslation, config.pmtCapRadiusMax, config.pmtCapRadiusMin, config.pmtCapHeight, config.pmtCapMaterial)
+        )
+
+    else:
+        thickness, translation = backLayer(config)
+        file.write(
+            "#   BACK LAYER\n"
+            "/gate/block/daughters/name                             backLayer                            # Stands in for the PMTs, the same mass of glass per block face area\n"
+            "/gate/block/daughters/insert                           box                                  # ++ Same as Above ++\n"
+            "/gate/backLayer/geometry/setXLength                    {}                              # ++ Same as Above ++\n"
+            "/gate/backLayer/geometry/setYLength                    {}                             # ++ Same as Above ++\n"
+            "/gate/backLayer/geometry/setZLength                    {}                             # ++ Same as Above ++\n"
+            "/gate/backLayer/placement/setTranslation               {}                  # Directly behind the crystals\n"
+            "/gate/backLayer/setMaterial                            {}                   # ++ Same as Above ++\n"
+            "/gate/backLayer/vis/setColor                           red                                  # ++ Same as Above ++\n"
+            "\n".format(thickness, config.blockYLength, config.blockZLength, translation, config.pmtOuterMaterial)
+        )
+
+    file.write(
+        "#   ATTACH SYSTEM\n"
+        "/gate/systems/CPET/sector/attach                       sector                               # GATE has a template for detector systems.  CPET is one.  The components are ordered in a certain way.  For exmaple crystals and blocks need to be ordered in a certain manner\n"
+        "/gate/systems/CPET/cassette/attach                     cassette                             # Adding the cassette component of the CPET system\n"
+        "/gate/systems/CPET/module/attach                       block                                # Adding the block component of the CPET system\n"
+        "/gate/systems/CPET/crystal/attach                      crystal                              # Adding the crystal component of the CPET system.\n"
+        "\n"
+    )
+
+    file.write(
+        "#   ATTACH CRYSTAL SD\n"
+        "/gate/crystal/attachCrystalSD                                                               # Making the Crystal Sensitive to interactions\n"
+        "\n"
+    )
+
+    if config.cylinderPhantom1 == True:
+        file.write(
+            "#   PHANTOM 1\n"
+            "/gate/world/daughters/name         		               phantom1                              # ++ Same as Above ++\n" 
+            "/gate/world/daughters/insert       		               cylinder                             # ++ Same as Above ++\n" 
+            "/gate/phantom1/geometry/setRmin     		               {}                               # ++ Same as Above ++\n" 
+            "/gate/phantom1/geometry/setRmax     		               {}                               # ++ Same as Above ++\n" 
+            "/gate/phantom1/geometry/setHeight   	                   {}                              # ++ Same as Above ++\n" 
+            "/gate/phantom1/setMaterial          		               {}                                 # ++ Same as Above ++\n" 
+            "/gate/phantom1/vis/setColor         		               red                                  # ++ Same as Above ++\n" 
+            "/gate/phantom1/placement/setTranslation                    {}                   # Specify the placement of the source within the world volume\n"
+            "\n".format(config.cylinderPhantomRadiusMin1, config.cylinderPhantomRadiusMax1, config.cylinderPhantomHeight1, config.cylinderPhantomMaterial1, config.cylinderPhantomTranslation1)
+        )
+
+    if config.nrwPhantom1 == True:
+        file.write(
+            "#   NRW-100 PHANTOM 1\n"
+            "/gate/world/daughters/name                                 phantom1\n"
+            "/gate/world/daughters/insert                               sphere\n"
+            "/gate/phantom1/geometry/setRmin                             {}\n"
+            "/gate/phantom1/geometry/setRmax                             {}\n"
+            "/gate/phantom1/setMaterial                                  {}\n"
+            "/gate/phantom1/vis/setColor                                 red\n"
+            "/gate/phantom1/placement/setTranslation                     {}\n"
+            "\n".format(config.nrwPhantomRadiusMin1, config.nrwPhantomRadiusMax1, config.nrwPhantomMaterial1, config.nrwPhantomTranslation1)   
+        )
+
+    if config.nrwPhantomShell1 == True:
+        file.write(
+            "#  ACRYLATE REGION PHANTOM 1\n"
+            "/gate/world/daughters/name                                 phantom1\n"
+            "/gate/world/daughters/insert                                sphere\n"
+            "/gate/phantom1/geometry/setRmin                             {}\n"
+            "/gate/phantom1/geometry/setRmax                             {}\n"
+            "/gate/phantom1/setMaterial                                  {}\n"
+            "/gate/phantom1/vis/setColor                                 red\n"
+            "/gate/phantom1/placement/setTranslation                     {}\n"
+            "\n".format(config.nrwPhantomShell1FullRmin, config.nrwPhantomShell1FullRmax, config.nrwPhantomShell1Material, config.nrwPhantomShell1Translation)
+        )
+
+        file.write(
+            "#  SILICA PHANTOM 1\n"
+            "/gate/phantom1/daughters/name                            silicaRegion\n"
+            "/gate/phantom1/daughters/insert                                sphere\n"
+            "/gate/silicaRegion/geometry/setRmin                             {}\n"
+            "/gate/silicaRegion/geometry/setRmax                             {}\n"
+            "/gate/silicaRegion/setMaterial                                  {}\n"
+            "/gate/silicaRegion/vis/setColor                                 red\n"
+            "/gate/silicaRegion/placement/setTranslation                     0.0 0.0 0.0 mm\n"
+            "\n".format(config.nrwPhantomSilicaRmin, config.nrwPhantomSilicaRmax, config.nrwPhantomSilicaMaterial)
+        )
+
+        file.write(
+            "#   NRW-100 PHANTOM 1\n"
+            "/gate/phantom1/daughters/name                                 nrw100Tracer\n"
+            "/gate/phantom1/daughters/insert                               sphere\n"
+            "/gate/nrw100Tracer/geometry/setRmin                             {}\n"
+            "/gate/nrw100Tracer/geometry/setRmax                             {}\n"
+            "/gate/nrw100Tracer/setMaterial                                  {}\n"
+            "/gate/nrw100Tracer/vis/setColor                                 red\n"
+            "/gate/nrw100Tracer/placement/setTranslation                     0.0 0.0 0.0 mm\n"
+            "\n".format(config.nrwPhantomTracerRmin, config.nrwPhantomTracerRmax, config.nrwPhantomTracerMaterial)
+        )
+
+        file.write(
+            "#   NRW-100 PHANTOM - FORBID 1\n"
+            "/gate/nrw100Tracer/daughters/name                                 nrw100TracerForbid\n"
+            "/gate/nrw100Tracer/daughters/insert                               sphere\n"
+            "/gate/nrw100TracerForbid/geometry/setRmin                             {}\n"
+            "/gate/nrw100TracerForbid/geometry/setRmax                             {}\n"
+            "/gate/nrw100TracerForbid/setMaterial                                  {}\n"
+            "/gate/nrw100TracerForbid/vis/setColor                                 red\n"
+            "/gate/nrw100TracerForbid/placement/setTranslation                     0.0 0.0 0.0 mm\n"
+            "\n".format(config.nrwPhantomTracerForbidRmin, config.nrwPhantomTracerForbidRmax, config.nrwPhantomTracerForbidMaterial)
+        )
+    
+    if config.stlPhantom == True:
+        file.write(
+            "#   STL - PHANTOM\n"
+            "/gate/world/daughters/name                                  phantom1\n"
+            "/gate/world/daughters/insert                                tessellated\n"
+            "/gate/phantom1/placement/setTranslation                      {}\n"
+            "/gate/phantom1/geometry/setPathToSTLFile                     {}\n"
+            "/gate/phantom1/setMaterial                                   {}\n"
+            "/gate/phantom1/vis/setColor                                  {}\n"
+            "/gate/phantom1/vis/forceWireframe\n"
+            "\n".format(config.stlPhantomTranslation, config.stlPhantomPath, config.stlPhantomMaterial, config.stlPhantomColour)
+        )
+    
+    if config.activatePhantom2 == True:
+        if config.cylinderPhantom2 == True:
+            file.write(
+                "#   PHANTOM 2\n"
+                "/gate/world/daughters/name         		               phantom2                              # ++ Same as Above ++\n" 
+                "/gate/world/daughters/insert       		               cylinder                             # ++ Same as Above ++\n" 
+                "/gate/phantom2/geometry/setRmin     		               {}                               # ++ Same as Above ++\n" 
+                "/gate/phantom2/geometry/setRmax     		               {}                               # ++ Same as Above ++\n" 
+                "/gate/phantom2/geometry/setHeight   	                   {}                              # ++ Same as Above ++\n" 
+                "/gate/phantom2/setMaterial          		               {}                                 # ++ Same as Above ++\n" 
+                "/gate/phantom2/vis/setColor         		               red                                  # ++ Same as Above ++\n" 
+                "/gate/phantom2/placement/setTranslation                    {}                   # Specify the placement of the source within the world volume\n"
+                "\n".format(config.cylinderPhantomRadiusMin2, config.cylinderPhantomRadiusMax2, config.cylinderPhantomHeight2, config.cylinderPhantomMaterial2, config.cylinderPhantomTranslation2)
+            )
+
+        if config.nrwPhantom2 == True:
+            file.write(
+                "#   NRW-100 PHANTOM 2\n"
+                "/gate/world/daughters/name                                 phantom2\n"
+                "/gate/world/daughters/insert                               sphere\n"
+                "/gate/phantom2/geometry/setRmin                             {}\n"
+                "/gate/phantom2/geometry/setRmax                             {}\n"
+                "/gate/phantom2/setMaterial                                  {}\n"
+                "/gate/phantom2/vis/setColor                                 red\n"
+                "/gate/phantom2/placement/setTranslation                     {}\n"
+                "\n".format(config.nrwPhantomRadiusMin2, config.nrwPhantomRadiusMax2, config.nrwPhantomMaterial2, config.nrwPhantomTranslation2)   
+            )
+
+
+
+    
+    if config.voxelPhantom == True:
+        file.write(
+            "/gate/world/daughters/name                                  phantom1\n"
+            "/gate/world/daughters/insert                                {}\n"
+            "/gate/phantom1/geometry/setImage                             {}\n"
+            "/gate/phantom1/geometry/setRangeToMaterialFile               {}\n"
+            "/gate/phantom1/placement/setTranslation                      {}\n"
+            "/gate/phantom1/placement/setRotationAxis                     {}\n"
+            "/gate/phantom1/placement/setRotationAngle                    {}\n"
+            "\n".format(config.voxelPhantomType, config.voxelPhantomImageLocation, config.voxelPhantomMaterial, config.voxelPhantomTranslation, config.voxelPhantomRotationAxis, config.voxelPhantomRotationAngle)
+        )
+    
+    if config.movePhantom1 == True:
+        if config.genericMotion1 == True:
+            file.write(
+                "#   GENERIC MOVE\n"
+                "/gate/phantom1/moves/insert                                 genericMove\n"
+                "/gate/phantom1/genericMove/setPlacementsFilename  {placements1}                  # The slice of the chunk, set by the chunk macro\n"
+                "\n"
+            )
+
+        if config.linearMotion1 == True:
+            file.write(
+                "# LINEAR MOTION\n"
+                "/gate/phantom1/moves/insert translation\n"
+                "/gate/phantom1/translation/setSpeed {}\n"
+                "\n".format(config.linearMotionSpeed1)
+            )
+        if config.orbitingMotion1 == True:
+            file.write(
+                "#   ORBITING PHANTOM\n"
+                "/gate/phantom1/moves/insert                            orbiting                             # Specify the motion to simulate\n"
+                "/gate/phantom1/orbiting/setSpeed                       {}                        # Specify the speed of orbital motion -360 deg/s\n"
+                "/gate/phantom1/orbiting/setPoint1                      {}                    # Anchor point 1 for orbital axis -2.60415503 1.18758883 0.0\n"
+                "/gate/phantom1/orbiting/setPoint2                      {}                     # Anchor point 2 for orbital axis. -2.60415503 1.18758883 1.0\n"
+                "\n".format(config.orbitingMotionSpeed1, config.orbitingMotionSetPoint11, config.orbitingMotionSetPoint21)
+            )
+        
+        if config.oscilatingMotion1 == True:
+            file.write(
+                "#   OSCILATING PHANTOM\n"
+                "/gate/phantom1/moves/insert                            osc-trans                            # +++ Same as Above +++\n"
+                "/gate/phantom1/osc-trans/setAmplitude                  {}                # Set the amplitude of the oscillation\n"
+                "/gate/phantom1/osc-trans/setFrequency                  {}                           # Set the frequency of oscillation\n"
+                "/gate/phantom1/osc-trans/setPhase                      {}                       # Set the phase of the oscillation\n"
+                "/gate/geometry/rebuild\n"
+                "\n".format(config.oscilatingMotionAmplitude1, config.oscilatingMotionFrequency1, config.oscilatingMotionSetPhase1)
+            )
+    
+    if config.movePhantom2 == True:
+        if config.genericMotion2 == True:
+            file.write(
+                "#   GENERIC MOVE\n"
+                "/gate/phantom2/moves/insert                                 genericMove\n"
+                "/gate/phantom2/genericMove/setPlacementsFilename  {placements2}                  # The slice of the chunk, set by the chunk macro\n"
+                "\n"
+            )
+
+        if config.linearMotion2 == True:
+            file.write(
+                "# LINEAR MOTION\n"
+                "/gate/phantom2/moves/insert translation\n"
+                "/gate/phantom2/translation/setSpeed {}\n"
+                "\n".format(config.linearMotionSpeed2)
+            )
+        if config.orbitingMotion2 == True:
+            file.write(
+                "#   ORBITING PHANTOM\n"
+                "/gate/phantom2/moves/insert                            orbiting                             # Specify the motion to simulate\n"
+                "/gate/phantom2/orbiting/setSpeed                       {}                        # Specify the speed of orbital motion -360 deg/s\n"
+                "/gate/phantom2/orbiting/setPoint1                      {}                    # Anchor point 1 for orbital axis -2.60415503 1.18758883 0.0\n"
+                "/gate/phantom2/orbiting/setPoint2                      {}                     # Anchor point 2 for orbital axis. -2.60415503 1.18758883 1.0\n"
+                "\n".format(config.orbitingMotionSpeed2, config.orbitingMotionSetPoint12, config.orbitingMotionSetPoint22)
+            )
+        
+        if config.oscilatingMotion2 == True:
+            file.write(
+                "#   OSCILATING PHANTOM\n"
+                "/gate/phantom2/moves/insert                            osc-trans                            # +++ Same as Above +++\n"
+                "/gate/phantom2/osc-trans/setAmplitude                  {}                # Set the amplitude of the oscillation\n"
+                "/gate/phantom2/osc-trans/setFrequency                  {}                           # Set the frequency of oscillation\n"
+                "/gate/phantom2/osc-trans/setPhase                      {}                       # Set the phase of the oscillation\n"
+                "/gate/geometry/rebuild\n"
+                "\n".format(config.oscilatingMotionAmplitude2, config.oscilatingMotionFrequency2, config.oscilatingMotionSetPhase2)
+            )
+    preset = PHYSICS_PRESETS[config.physicsPreset]
+    file.write(
+        "#  PHYSICS\n"
+        "/gate/physics/addPhysicsList                               {:40}# {}\n"
+        "\n".format(preset["physicsList"], "em standard opt4 selected, best for E range we're intereseted in" if preset["physicsList"] == "emstandard_opt4" else "Faster, less precise electron and positron transport (physicsPreset)")
+    )
+
+    if preset["crystalCuts"] == "controls":
+        file.write(
+            "/gate/physics/Gamma/SetCutInRegion                                      {}                           # Deposit the energy of the secondaries in the crystal they are made in, only the summed energy is read out\n"
+            "/gate/physics/Electron/SetCutInRegion                                   {}                           # ++ Same as Above ++\n"
+            "/gate/physics/Positron/SetCutInRegion                                   {}                           # ++ Same as Above ++\n"
+            "\n".format(config.crystalGammaCut, config.crystalElectronCut, config.crystalPositronCut)
+        )
+
+    if config.activatePhantom2 == True:
+        cuts = [config.phantomGammaCut2, config.phantomElectronCut2, config.phantomPositronCut2]
+        if preset["phantomCut"] != "controls":
+            cuts = ["phantom2 " + preset["phantomCut"]]*3
+        file.write(
+            "/gate/physics/Gamma/SetCutInRegion                                      {}                          # Deposit gamma ray secondaries energy if the secondaries expected range is less than 0.1 mm in the phantom.\n"
+            "/gate/physics/Electron/SetCutInRegion                                   {}                          # Deposit electron secondaries energy if the secondaries expected range is less than 0.1 mm in the phantom.\n"
+            "/gate/physics/Positron/SetCutInRegion                                   {}                          # Deposit positron secondaries energy if the secondaries expected range is less than 0.1 mm in the phantom.\n"
+            "\n".format(*cuts)
+        )
+        if preset["phantomMaxStepSize"] is not None:
+            file.write(
+                "/gate/physics/SetMaxStepSizeInRegion                                    {}                         # The maximum step size a particle can have, in the phantom region.\n"
+                "\n".format(config.phantomMaxStepSize2 if preset["phantomMaxStepSize"] == "controls" else "phantom2 " + preset["phantomMaxStepSize"])
+            )
+
+    file.write(
+        "#   INITIALISE\n"
+        "/gate/run/initialize                                                    # Initialize the simulaion\n"
+        "\n"
+    )
+
+    file.write(
+        "#	ADDER\n"
+        "/gate/digitizer/Singles/insert                                          adder                       # The adder sums all the hits within crystals\n"
+        "\n"
+    )
+
+    file.write(
+        "#   READOUT\n"
+        "/gate/digitizer/Singles/insert                                          readout                     # The readout component of the singles over which geometry to sum the energies of the crystal\n"
+        "/gate/digitizer/Singles/readout/setDepth                                {}                           # The energy of an individual event is the sum of energies in a block.\n"
+        "/gate/digitizer/Singles/readout/setPolicy                               {}          # The readout position is determined by a weighting the indices of each crystal pulse by energy deposited to get the enrgy centroid.  The position is the centre of the crystal whose crystal index was selected.\n"
+        "\n".format(config.readoutDepth, config.readoutPolicy)
+    )
+
+    file.write(
+        "#   ENERGY BLURRING\n"
+        "/gate/digitizer/Singles/insert                                          crystalblurring             # Crystal blurring component.  The energy resolution blurring factor is randomly chosen between the lower and upper threshold for each crystal.\n"
+        "/gate/digitizer/Singles/crystalblurring/setCrystalResolutionMin         {}                        # Lower threshold of blurring of Energy in crystal\n"
+        "/gate/digitizer/Singles/crystalblurring/setCrystalResolutionMax         {}                        # Upper threshold of blurring of Energy in crystal\n"
+        "/gate/digitizer/Singles/crystalblurring/setCrystalQE                    {}                       # Quantum efficiency of crystal, for CP data 0.545\n"
+        "/gate/digitizer/Singles/crystalblurring/setCrystalEnergyOfReference     {}                   # Blurring energy reference\n"
+        "\n".format(config.energyBlurringMinRes, config.energyBlurringMaxRes, config.energyBlurringQE, config.energyBlurringReferenceEnergy)
+    )
+
+    file.write(
+        "#   ENERGY CUTS\n"
+        "/gate/digitizer/Singles/insert                                          thresholder                 # The energy thresholder sets the energy range which the detector will accept singles\n"
+        "/gate/digitizer/Singles/thresholder/setThreshold                        {}                    # The lower limit of the energy range\n"
+        "/gate/digitizer/Singles/insert                                          upholder                    # The upholder allows you to define an upper limit for the energy that will be accepted\n"
+        "/gate/digitizer/Singles/upholder/setUphold                              {}                    # The upper limit of the energy range\n"
+        "\n".format(config.energyCutThreshold, config.energyCutUphold)
+    )
+
+    file.write(
+        "#   TIMING RESOLUTION\n"
+        "/gate/digitizer/Singles/insert                                          timeResolution              # Implementing the timiing resolution of the detector\n"
+        "/gate/digitizer/Singles/timeResolution/setTimeResolution                {}                      # The value of the timing resolution, 2*tau\n"
+        "\n".format(config.timingResolution)
+    )
+    if config.NOISE == True:
+        file.write(
+            "#   NOISE\n"
+            "/gate/distributions/name                                                energy_distrib              # We added a distribution called energy_dist\n"
+            "/gate/distributions/insert                                              Gaussian                    # The shape of the distribution is Gaussian\n"
+            "/gate/distributions/energy_distrib/setMean                              {}                     # The mean energy of the of the Gaussian\n"
+            "/gate/distributions/energy_distrib/setSigma                             {}                    # The standard deviation of the Gaussian\n"
+            "/gate/distributions/name                                                dt_distrib                  # Adding another distribution called dt_distrib\n"
+            "/gate/distributions/insert                                              Exponential                 # The shape of the distribtion is Exponential\n"
+            "/gate/distributions/dt_distrib/setLambda                                {}                      # The lamdda value, A*e^(-lambda*t)\n"
+            "/gate/digitizer/Singles/insert                                          noise                       # Inserting the noise component of the singles\n"
+            "/gate/digitizer/Singles/noise/setDeltaTDistribution                     dt_distrib                  # Inserting the delta t distribution\n"
+            "/gate/digitizer/Singles/noise/setEnergyDistribution                     energy_distrib              # Inserting the energy distribution\n"
+            "\n".format(config.NoiseEnergyMean, config.NoiseEnergySigma, config.NoiseLambda)
+        )
+
+    file.write(
+        "#   DEAD TIME\n"
+        "/gate/digitizer/Singles/insert                                          deadtime                    # The deadtime implementation\n"
+        "/gate/digitizer/Singles/deadtime/setDeadTime                            {}                     # The value of the deadtime\n"
+        "/gate/digitizer/Singles/deadtime/setMode                                {}                 # The type of deadtime selected, there are two types, paralysable and non-paralysable\n" 
+        "/gate/digitizer/Singles/deadtime/chooseDTVolume                         {}                       # The volume over which to apply the deadtime\n"
+        "\n".format(config.deadtimeValue, config.deadtimeMode, config.deadtimeVolume)
+    )
+
+    file.write(
+        "#   COINCIDENCE SORTER\n"
+        "/gate/digitizer/Coincidences/setWindow                                  {}                      # The coincidence window implementation\n"
+        "/gate/digitizer/Coincidences/setOffset                                  {}                       # The offset to the coincidence window\n"
+        "/gate/digitizer/Coincidences/minSectorDifference                        {}                          # The minSectorDifference is similar to the span.  A minSectorDifference of 36, since we have 36 axial block segments, would be a prompt coincidence detector.\n" 
+        "/gate/digitizer/Coincidences/MultiplesPolicy                            {}             # If at least one pair is good, keep the coincidence\n"
+        "/gate/digitizer/Coincidences/describe                                                               # Print out for the coincidences\n"
+        "\n".format(config.coincidenceWindow, config.coincidenceWindowOffset, config.coincidenceWindowMineSectorDifference, config.coincidenceWindowPolicy)
+    )
+
+    file.write(
+        "#   DELAYED COINCIDENCE SORTER - Need the offset to work, choose 12 ns but might be incorrect\n"
+        "/gate/digitizer/name                                                    delay                       # The name of the digitizer module\n"
+        "/gate/digitizer/insert                                                  coincidenceSorter           # What type of module we are selecting\n" 
+        "/gate/digitizer/delay/setWindow                                         {}                   # The value of the delayed coincidence window\n"
+        "/gate/digitizer/delay/setOffset                                         {}                      # The delayed coincidence window offset.\n"  
+        "/gate/digitizer/delay/describe                                                                      # Print out for the delays, should be 0\n"
+        "\n".format(config.delayedWindow, config.delayedWindowOffset)
+    )
+
+    file.write(
+        "#   SEED CONTROLLER\n"
+        "/gate/random/setEngineName         JamesRandom                          # Method by which the seed will be generated\n"
+        "#/gate/random/setEngineSeed        default                              # How you wish to set the engine seed, default\n"
+        "#/gate/random/setEngineSeed        auto                                 # How you wish to set the engine seed, auto\n"
+        "#/gate/random/setEngineSeed        123456789                            # Setting the engine seed manually\n"
+        "/gate/random/setEngineSeed         default                              # ++ Same as Above ++\n"
+        "#/gate/random/resetEngineFrom      fileName                             # Set the engine seed from a file\n"
+        "/gate/random/verbose               1                                    # Set the random verbose level\n"
+        "\n"
+    )
+
+    file.write(
+        "#   STATS\n"
+        "/gate/actor/addActor                                    SimulationStatisticActor stat           # Specify the actor to add and the name of the actor. The statistics actor outputs info about the simulation after every run.  Info like run #, event #, sim time, user time etc etc. See stat.txt for more info\n"
+        "#/gate/actor/stat/save                                                                          # Set by the window macro of every chunk, see runReport.py\n"
+        "\n"
+    )
+
+    file.write(
+        "#   ROOT OUTPUT\n"
+        "/gate/output/root/enable                                                                        # Enable the root output.  Might add the *.npy output\n"
+        "#/gate/output/root/setFileName                                                                  # Set by the window macro of every chunk\n"
+        "/gate/output/root/setRootSinglesAdderFlag               0                                       # Setting to include the SinglesAdder output as a TTREE\n"
+        "/gate/output/root/setRootSinglesReadoutFlag             0                                       # Setting to include the SinglesReadout output as a TTREE\n"
+        "/gate/output/root/setRootHitFlag                        0                                       # Setting to include the Hits output as a TTREE\n"
+        "/gate/output/root/setRootSinglesFlag                    0                                       # Setting to include the Singles output as a TTREE\n"
+        "/gate/output/root/setRootCoincidencesFlag               1                                       # Setting to include the Coincidences output as a TTREE\n"
+        "\n"
+    )
+
+    file.write(
+        "#   ROOT SUMMARY\n"
+        "/gate/output/summary/enable                                                                     # Enable summary simulation run\n"
+        "#/gate/output/summary/setFileName                                                               # Set by the window macro of every chunk, see runReport.py\n"
+        "/gate/output/summary/addCollection                      Singles                                 # The number of singles detected\n"
+        "/gate/output/summary/addCollection                      Coincidences                            # The number of coincidences detected\n"
+        "/gate/output/summary/addCollection                      delay                                   # The number of randoms detected\n"
+        "\n"
+    )
+
+    file.write(
+        "#   GATE VERBOSE OPTIONS\n"
+        "/gate/verbose Physic    5                   # Physics verbose level\n"
+        "/gate/verbose Cuts      0                   # production cuts verbose level\n"
+        "/gate/verbose SD        0                   # Sensitive detector verbose level\n"
+        "/gate/verbose Actions   0                   # Actions verbose level\n"
+        "/gate/verbose Actor     0                   # Actor verbose level\n"
+        "/gate/verbose Step      0                   # Step size verbose level\n"
+        "/gate/verbose Error     0                   # Error verbose level\n"
+        "/gate/verbose Warning   0                   # Warning verbose level\n"
+        "/gate/verbose Output    0                   # Output verbose level\n"
+        "/gate/verbose Beam      0                   # Beam verbose level\n"
+        "/gate/verbose Volume    0                   # Volume verbose level\n"
+        "/gate/verbose Image     0                   # Image verbose level\n"
+        "/gate/verbose Geometry  0                   # Geometry verbose level\n"
+        "/gate/verbose Core      0                   # Core verbose level\n"
+        "\n"
+        "#   GEANT4 VERBOSE OPTIONS\n"
+        "/run/verbose            0                   # Run verbose level\n"
+        "/event/verbose          0                   # Event verbose level\n"
+        "/tracking/verbose       0                   # Tracking verbose level\n"
+        "\n"
+    )
+
+    positrons = config.sourceMode == "positron"
+    if not positrons:
+        file.write(backToBackSources(config))
+
+    if config.ga68source1 == True and positrons:
+        file.write(
+            "#   GALLIUM - 68\n"
+            "/gate/source/addSource                         ga68.1 gps                         # Source name\n"
+            "/gate/source/ga68.1/setActivity                  {}                       # Activity of source  1978020 Bq\n"
+            "/gate/source/ga68.1/gps/particle                 e+                               # Specifying the primary particle to be positrons\n"
+            "/gate/source/ga68.1/gps/energytype               UserSpectrum                     # Specifying the energy type\n"
+            "/gate/source/ga68.1/gps/setSpectrumFile          data/ga68_spectrum.txt           # Where to find user defined spectrum\n"
+            "#/gate/source/ga68.1/gps/type                     Volume                          # Specifying that the source is a volume\n"
+            "#/gate/source/ga68.1/gps/shape                    Sphere                          # Specifying the shape of the voxelised source\n"
+            "#/gate/source/ga68.1/gps/radius                   301.0 um                         # Radius of source\n" 
+            "#/gate/source/ga68.1/gps/radius0                  300.0 um                         # Radius of source\n" 
+            "/gate/source/ga68.1/setForcedUnstableFlag        true                             # Forcing the source to be unstable and have the ability to decay\n"
+            "/gate/source/ga68.1/setForcedHalfLife            4062.6 s                         # Sepecifying the half life of the source, 2.341e+7\n"
+            "/gate/source/ga68.1/gps/centre                   0.0 0.0 0.0 cm                   # Specifying the position of the source\n"
+            "/gate/source/ga68.1/gps/angtype                  iso                              # Specfying the angular distribution of the decay particles\n"
+            "/gate/source/ga68.1/attachTo                     {}                          # Attaching the source to a volume.  This is for motion.  The location os the source is now relative to the volume it is attached to.\n"
+            "\n".format(config.sourceActivity1, config.sourceAttach1)
+        )
+
+    if config.ga68sourceSphere1 == True and positrons:
+        file.write(
+            "#   GALLIUM - 68 - SPHERE\n"
+            "/gate/source/addSource                         ga68_1 gps                         # Source name\n"
+            "/gate/source/ga68_1/setActivity                  {}                       # Activity of source  1978020 Bq\n"
+            "/gate/source/ga68_1/gps/particle                 e+                               # Specifying the primary particle to be positrons\n"
+            "/gate/source/ga68_1/gps/energytype               UserSpectrum                     # Specifying the energy type\n"
+            "/gate/source/ga68_1/gps/setSpectrumFile          data/ga68_spectrum.txt           # Where to find user defined spectrum\n"
+            "/gate/source/ga68_1/gps/type                     Volume                          # Specifying that the source is a volume\n"
+            "/gate/source/ga68_1/gps/shape                    Sphere                          # Specifying the shape of the voxelised source\n"
+            "/gate/source/ga68_1/gps/radius                    {}                         # Radius of source\n" 
+            "/gate/source/ga68_1/setForcedUnstableFlag        true                             # Forcing the source to be unstable and have the ability to decay\n"
+            "/gate/source/ga68_1/setForcedHalfLife            4062.6 s                         # Sepecifying the half life of the source, 2.341e+7\n"
+            "/gate/source/ga68_1/gps/centre                   0.0 0.0 0.0 cm                   # Specifying the position of the source\n"
+            "/gate/source/ga68_1/gps/angtype                  iso                              # Specfying the angular distribution of the decay particles\n"
+            "/gate/source/ga68_1/attachTo                     {}                          # Attaching the source to a volume.  This is for motion.  The location os the source is now relative to the volume it is attached to.\n"
+            "/gate/source/ga68_1/gps/Forbid                        {}\n"
+            "/gate/source/ga68_1/dump                          {}\n"
+            "\n".format(config.sourceActivity1, config.sourceActivity1Radius ,config.sourceAttach1, config.sourceForbid1, 1)
+        )
+
+
+    if config.f18source1 == True and positrons:
+        file.write(
+            "#   FLUORINE - 18\n"
+            "/gate/source/addSource                         f18.1 gps                         # ++ Same as Above ++\n"
+            "/gate/source/f18.1/setActivity                   {}                      # ++ Same as Above ++\n" 
+            "/gate/source/f18.1/gps/particle                  e+                              # ++ Same as Above ++\n" 
+            "/gate/source/f18.1/gps/energytype                UserSpectrum                    # ++ Same as Above ++\n" 
+            "/gate/source/f18.1/gps/setSpectrumFile           data/f18_spectrum.txt           # ++ Same as Above ++\n" 
+            "/gate/source/f18.1/setForcedUnstableFlag         true                            # ++ Same as Above ++\n"  
+            "/gate/source/f18.1/setForcedHalfLife             6586.26 s                       # ++ Same as Above ++\n"
+            "/gate/source/f18.1/gps/centre                    0.0 0.0 0.0 cm                  # ++ Same as Above ++\n"
+            "/gate/source/f18.1/gps/angtype                   iso                             # ++ Same as Above ++\n"
+            "/gate/source/f18.1/attachTo                      {}                         # ++ Same as Above ++\n"
+            "\n".format(config.sourceActivity1, config.sourceAttach1)
+        )
+
+    if config.na22source1 == True and positrons:
+        file.write(
+            "#   SODIUM - 22\n"
+            "/gate/source/addSource                          na22.1 gps                        # ++ Same as Above ++\n"
+            "/gate/source/na22.1/setActivity                   {}                      # ++ Same as Above ++\n"
+            "/gate/source/na22.1/gps/particle                  e+                              # ++ Same as Above ++\n"
+            "/gate/source/na22.1/gps/energytype                UserSpectrum                    # ++ Same as Above ++\n"
+            "/gate/source/na22.1/gps/setSpectrumFile           data/na22_spectrum.txt          # ++ Same as Above ++\n"
+            "/gate/source/na22.1/setForcedUnstableFlag         true                            # ++ Same as Above ++\n"
+            "/gate/source/na22.1/setForcedHalfLife             8.199e+7 s                      # ++ Same as Above ++\n"
+            "/gate/source/na22.1/gps/centre                    0.0 0.0 0.0 cm                  # ++ Same as Above ++\n"
+            "/gate/source/na22.1/gps/angtype                   iso                             # ++ Same as Above ++\n"
+            "/gate/source/na22.1/attachTo                      {}                         # ++ Same as Above ++\n"
+            "\n".format(config.sourceActivity1, config.sourceAttach1)
+        )
+
+    if config.activatePhantom2 == True and positrons:
+        if config.ga68source2 == True:
+            file.write(
+                "#   GALLIUM - 68\n"
+                "/gate/source/addSource                         ga68.2 gps                         # Source name\n"
+                "/gate/source/ga68.2/setActivity                  {}                       # Activity of source  1978020 Bq\n"
+                "/gate/source/ga68.2/gps/particle                 e+                               # Specifying the primary particle to be positrons\n"
+                "/gate/source/ga68.2/gps/energytype               UserSpectrum                     # Specifying the energy type\n"
+                "/gate/source/ga68.2/gps/setSpectrumFile          data/ga68_spectrum.txt           # Where to find user defined spectrum\n"
+                "#/gate/source/ga68.2/gps/type                     Volume                          # Specifying that the source is a volume\n"
+                "#/gate/source/ga68.2/gps/shape                    Sphere                          # Specifying the shape of the voxelised source\n"
+                "#/gate/source/ga68.2/gps/radius                   301.0 um                         # Radius of source\n" 
+                "#/gate/source/ga68.2/gps/radius0                  300.0 um                         # Radius of source\n" 
+                "/gate/source/ga68.2/setForcedUnstableFlag        true                             # Forcing the source to be unstable and have the ability to decay\n"
+                "/gate/source/ga68.2/setForcedHalfLife            4062.6 s                         # Sepecifying the half life of the source, 2.341e+7\n"
+                "/gate/source/ga68.2/gps/centre                   0.0 0.0 0.0 cm                   # Specifying the position of the source\n"
+                "/gate/source/ga68.2/gps/angtype                  iso                              # Specfying the angular distribution of the decay particles\n"
+                "/gate/source/ga68.2/attachTo                     {}                          # Attaching the source to a volume.  This is for motion.  The location os the source is now relative to the volume it is attached to.\n"
+                "\n".format(config.sourceActivity2, config.sourceAttach2)
+            )
+
+        if config.f18source2 == True:
+            file.write(
+                "#   FLUORINE - 18\n"
+                "/gate/source/addSource                         f18.2 gps                         # ++ Same as Above ++\n"
+                "/gate/source/f18.2/setActivity                   {}                      # ++ Same as Above ++\n" 
+                "/gate/source/f18.2/gps/particle                  e+                              # ++ Same as Above ++\n" 
+                "/gate/source/f18.2/gps/energytype                UserSpectrum                    # ++ Same as Above ++\n" 
+                "/gate/source/f18.2/gps/setSpectrumFile           data/f18_spectrum.txt           # ++ Same as Above ++\n" 
+                "/gate/source/f18.2/setForcedUnstableFlag         true                            # ++ Same as Above ++\n"  
+                "/gate/source/f18.2/setForcedHalfLife             6586.26 s                       # ++ Same as Above ++\n"
+                "/gate/source/f18.2/gps/centre                    0.0 0.0 0.0 cm                  # ++ Same as Above ++\n"
+                "/gate/source/f18.2/gps/angtype                   iso                             # ++ Same as Above ++\n"
+                "/gate/source/f18.2/attachTo                      {}                         # ++ Same as Above ++\n"
+                "\n".format(config.sourceActivity2, config.sourceAttach2)
+            )
+
+        if config.na22source2 == True:
+            file.write(
+                "#   SODIUM - 22\n"
+                "/gate/source/addSource                          na22.2 gps                        # ++ Same as Above ++\n"
+                "/gate/source/na22.2/setActivity                   {}                      # ++ Same as Above ++\n"
+                "/gate/source/na22.2/gps/particle                  e+                              # ++ Same as Above ++\n"
+                "/gate/source/na22.2/gps/energytype                UserSpectrum                    # ++ Same as Above ++\n"
+                "/gate/source/na22.2/gps/setSpectrumFile           data/na22_spectrum.txt          # ++ Same as Above ++\n"
+                "/gate/source/na22.2/setForcedUnstableFlag         true                            # ++ Same as Above ++\n"
+                "/gate/source/na22.2/setForcedHalfLife             8.199e+7 s                      # ++ Same as Above ++\n"
+                "/gate/source/na22.2/gps/centre                    0.0 0.0 0.0 cm                  # ++ Same as Above ++\n"
+                "/gate/source/na22.2/gps/angtype                   iso                             # ++ Same as Above ++\n"
+                "/gate/source/na22.2/attachTo                      {}                         # ++ Same as Above ++\n"
+                "\n".format(config.sourceActivity2, config.sourceAttach2)
+            )
+
+
+    if config.voxelSource == True:
+        file.write(
+            "/gate/source/addSource                                             bubbleTest voxel\n"
+            "/gate/source/bubbleTest/reader/insert                              image\n"
+            "/gate/source/bubbleTest/imageReader/translator/insert              range\n"
+            "/gate/source/bubbleTest/imageReader/rangeTranslator/readTable      {}\n"
+            "/gate/source/bubbleTest/imageReader/readFile                       {}\n"
+            "/gate/source/bubbleTest/imageReader/verbose                        0\n"
+            "/gate/source/bubbleTest/setPosition                                {}\n"
+            "/gate/source/bubbleTest/dump                                       0\n"
+            "/gate/source/bubbleTest/setType                                    {}\n"
+            "/gate/source/bubbleTest/gps/particle                               {}\n"
+            "/gate/source/bubbleTest/gps/energytype                             {}\n"
+            "/gate/source/bubbleTest/gps/monoenergy                             {}\n"
+            "/gate/source/bubbleTest/gps/angtype                                {}\n"
+            "/gate/source/bubbleTest/gps/confine                                NULL"
+            "\n".format(config.voxelSourcePixel2Activity, config.voxelSourceImage, config.voxelSourcePosition, config.voxelSourceType, config.voxelSourceParticle, config.voxelSourceParticleEnergyType, config.voxelSourceParticleEnergy, config.voxelSourceAngularDist)
+        )
+
+    file.write(
+        "/gate/source/list                                                       # Lists the sources being used\n"
+        "\n"
+    )
+
+    return file.getvalue()
+
+def renderMotion(slices: dict) -> str:
+    """
+    Function that writes the motion macro of a chunk, the placements slices of its generic moves.  GATE
+    appends every file it is given to the keyframe list, so it is only executed when a persistent worker
+    chains the window after another one, the first window of a process has its slices read by the setup.
+
+    Input:
+        slices: Dictionary of phantom number: placements slice of the chunk
+
+    Output:
+        macro: The motion macro text
+    """
+
+    return "#   MOTION\n" + "".join(
+        "/gate/phantom{}/genericMove/setPlacementsFilename  {}      # The trajectory of this chunk, added to the keyframes read so far\n".format(phantom, path)
+        for phantom, path in slices.items()
+    )
+
+def renderWindow(config, index: int, chunkStart: float, chunkEnd: float) -> str:
+    """
+    Function that writes the window macro of a chunk, everything that changes from chunk to chunk once
+    GATE is initialised.
+
+    Input:
+        config: The SimulationConfig
+        index: The chunk index
+        chunkStart, chunkEnd: The chunk window in s
+
+    Output:
+        macro: The window macro text
+    """
+
+    return (
+        "#   ACQUISITION SETTINGS\n"
+        "/control/echo                      GateOrchestrator window {} start     # Tells the orchestrator the window started\n"
+        "/gate/output/root/setFileName      {}{}_{}               # The name and path of the root file of this chunk\n"
+        "/gate/actor/stat/save              {}               # Statistics of this chunk (events, tracks, time), every process used to overwrite output/stat.txt\n"
+        "/gate/output/summary/setFileName   {}               # Singles, coincidences and delays of this chunk\n"
+        "/gate/random/setEngineSeed         {}                           # The seed of this chunk, set before every startDAQ\n"
+        "/gate/application/startDAQCluster  {} {} 0 s                          # Simulate the window of the chunk, the time slices of the run are cut at its edges\n"
+        "/control/echo                      GateOrchestrator window {} end       # Tells the orchestrator the window and its root file are done\n"
+        "\n".format(index, config.ROOT_FOLDER, "mp", index, runReport.statFile(config, index), runReport.summaryFile(config, index),
+                    chunkCache.chunkSeed(config.runSeed, chunkStart, chunkEnd), chunkStart, chunkEnd, index)
+    )
+
+def compileMacros(config, timeChunks: list, timeSlice: float, tables: dict = None) -> list:
+    """
+    Function that writes the shared setup macro and the chunk and window macros of a run.
+
+    Input:
+        config: The SimulationConfig
+        timeChunks: List of (chunkStart, chunkEnd) tuples in s
+        timeSlice: The time slice of the run in s, see timeSlicing.resolveTimeSlice
+        tables: Optional dictionary from physicsTables.prepareTables, the chunks read or store the physics tables
+
+    Output:
+        macros: List of (chunk macro, window macro, motion macro) paths, one per chunk, the motion macro is
+                None without generic moves
+    """
+
+    setupFile = "{}{}_setup_{}.mac".format(config.MACRO_FOLDER, config.NAME, setupHash(config))
+    if not os.path.exists(setupFile):
+        with open(setupFile + ".tmp", "w") as file:
+            file.write(renderSetup(config))
+        os.replace(setupFile + ".tmp", setupFile)
+
+    # Every chunk only reads its part of the trajectories, from the start of the time slice its window starts in
+    sliceStart = lambda t: config.startTime + math.floor((t - config.startTime)/timeSlice + 1e-9)*timeSlice
+    motionWindows = [(min(sliceStart(chunkStart), chunkStart), chunkEnd) for chunkStart, chunkEnd in timeChunks]
+    motionSlices = {phantom: placements.writeSlices(path, motionWindows, "{}{}_phantom{}".format(config.MACRO_FOLDER, config.NAME, phantom))
+                    for phantom, path in placements.motionFiles(config).items()}
+
+    macros = []
+    for i, (chunkStart, chunkEnd) in enumerate(timeChunks):
+        macro = "{}{}_{}.mac".format(config.MACRO_FOLDER, config.NAME, i)
+        window = "{}{}_{}_window.mac".format(config.MACRO_FOLDER, config.NAME, i)
+        motion = "{}{}_{}_motion.mac".format(config.MACRO_FOLDER, config.NAME, i) if motionSlices else None
+        slices = {phantom: motionSlices[phantom][i] for phantom in motionSlices}
+        readTables, storeTables = physicsTables.tableCommands(tables, i)
+        with open(macro, "w") as file:
+            for phantom, path in slices.items():
+                file.write("/control/alias                     placements{}  {}                   # Read by the generic move of the setup\n".format(phantom, path))
+            file.write(
+                "#   SETUP\n"
+                "/control/execute                   {}                   # Geometry, physics, digitiser and sources, the same for every chunk\n"
+                "\n"
+                "#   TIME SLICES\n"
+                "/gate/application/setTimeSlice     {:.9g} s                         # Chosen from the motion if timeStep is auto, controls the granularity of motion\n"
+                "/gate/application/setTimeStart     {}   s                               # The acquisition start time of the whole run, so the slices don't depend on the chunks\n"
+                "/gate/application/setTimeStop      {}  s                               # The acquisition end time of the whole run\n"
+                "\n"
+                "{}"
+                "#   ACQUISITION SETTINGS\n"
+                "/control/execute                   {}                   # The time window of this chunk.  A persistent worker executes the windows of its next chunks after it\n"
+                "\n"
+                "{}".format(setupFile, timeSlice, config.startTime, config.endTime, readTables, window, storeTables)
+            )
+        with open(window, "w") as file:
+            file.write(renderWindow(config, i, chunkStart, chunkEnd))
+        if motion is not None:
+            with open(motion, "w") as file:
+                file.write(renderMotion(slices))
+        macros.append((macro, window, motion))
+    return macros
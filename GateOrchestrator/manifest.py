@@ -0,0 +1,208 @@
+"""
+Crash-safe run manifest.  The manifest is a JSON file that records, for every time chunk of a run, the
+configuration hash, the time window, the exit status of GATE, the size of the output ROOT file and the
+number of coincidences and delayed coincidences in it.  It is rewritten atomically every time a chunk finishes, so a run that
+dies part way can be resumed and only the chunks that failed or never ran are simulated again.  The
+merge step checks every chunk against the manifest and refuses to merge if any of them is bad.
+
+Required Packages: None (standard library)
+Optional Packages: uproot (counts the coincidences in each chunk file)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import uproot
+except ImportError: # Without uproot the chunks are only checked on exit status and file size
+    uproot = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+COINCIDENCES_TREE = "Coincidences"
+DELAYS_TREE = "delay" # The delayed coincidence sorter
+OUTPUT_COUNTS = ("fileSize", "entries", "delays") # What checkChunk records about the output of a chunk
+
+# Controls that don't change what a chunk simulates
+HASH_IGNORE = {"NAME", "DIR", "MACRO_FOLDER", "ROOT_FOLDER", "SCRATCH", "OUTPUT_ROOT", "OUTPUT_ROOT_FILE_NAME", "OUTPUT_NPY", "COST_HISTORY", "CHUNK_CACHE", "PHYSICS_TABLES", "GOVERNOR_CONFIG", "RUN_MANIFEST", "RUNNING_MERGE",
+               "LOG_FOLDER", "cores", "chunksPerCore", "persistentWorkers", "mergeRoot", "listmodeTimeQuantum", "listmodeFaceOffset", "listmodeCompact"}
+
+saveLock = threading.RLock() # Chunks finish on several worker threads, hold it while changing a manifest
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def configHash(controls: dict) -> str:
+    """
+    Function that hashes every control that changes the output of a chunk.
+
+    Input:
+        controls: The simulation controls, SimulationConfig.controls()
+
+    Output:
+        digest: A short hex digest
+    """
+
+    relevant = {key: value for key, value in controls.items()
+                if not key.startswith("_") and key not in HASH_IGNORE and isinstance(value, (str, int, float, bool))}
+    return hashlib.sha1(json.dumps(relevant, sort_keys = True).encode()).hexdigest()[:16]
+
+def saveManifest(path: str, manifest: dict) -> None:
+    """
+    Function that writes the manifest atomically, a crash leaves either the old or the new manifest.
+
+    Input:
+        path: The manifest file
+        manifest: The manifest dictionary
+    """
+
+    with saveLock:
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, "w") as f:
+            json.dump(manifest, f, indent = 1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaryPath, path)
+
+def newManifest(path: str, runHash: str, chunks: list) -> dict:
+    """
+    Function that creates and saves the manifest of a new run.
+
+    Input:
+        path: The manifest file
+        runHash: The configuration hash of the run
+        chunks: List of chunk dictionaries with "index", "start", "stop" and "rootFile"
+
+    Output:
+        manifest: The manifest dictionary, every chunk is "pending"
+    """
+
+    manifest = {
+        "configHash": runHash,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "chunks": [{"index": chunk["index"], "start": chunk["start"], "stop": chunk["stop"], "rootFile": chunk["rootFile"],
+                    "status": "pending", "returnCode": None, "wallTime": None, "fileSize": None, "entries": None, "delays": None} for chunk in chunks],
+    }
+    saveManifest(path, manifest)
+    return manifest
+
+def loadManifest(path: str, runHash: str) -> dict:
+    """
+    Function that loads the manifest of an earlier run so it can be resumed.
+
+    Input:
+        path: The manifest file
+        runHash: The configuration hash of the current run
+
+    Output:
+        manifest: The manifest dictionary
+    """
+
+    if not os.path.exists(path):
+        raise RuntimeError("No run manifest at {}, there is nothing to resume".format(path))
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["configHash"] != runHash:
+        raise RuntimeError("The run manifest at {} was written for a different configuration ({} != {}), refusing to resume".format(path, manifest["configHash"], runHash))
+    return manifest
+
+def checkChunk(entry: dict) -> bool:
+    """
+    Function that checks the output file of a finished chunk and records its size and number of
+    coincidences (and delayed coincidences, if the file has the delay tree) in the manifest entry.
+
+    Input:
+        entry: The manifest entry of the chunk, updated in place
+
+    Output:
+        good: True if GATE exited cleanly and the output file is complete
+    """
+
+    if entry["returnCode"] != 0 or not os.path.exists(entry["rootFile"]):
+        return False
+    entry["fileSize"] = os.path.getsize(entry["rootFile"])
+    if entry["fileSize"] == 0:
+        return False
+
+    if uproot is not None:
+        try:
+            with uproot.open(entry["rootFile"]) as rootFile:
+                entry["entries"] = int(rootFile[COINCIDENCES_TREE].num_entries)
+                entry["delays"] = int(rootFile[DELAYS_TREE].num_entries) if DELAYS_TREE in rootFile else None
+        except Exception: # Truncated or unreadable file, e.g. GATE was killed before closing it
+            entry["entries"] = None
+            return False
+    return True
+
+def recordResult(path: str, manifest: dict, result: dict) -> None:
+    """
+    Function that records a finished chunk in the manifest and saves it.
+
+    Input:
+        path: The manifest file
+        manifest: The manifest dictionary
+        result: The result dictionary of the chunk from scheduler.runChunks
+    """
+
+    entry = dict(manifest["chunks"][result["index"]])
+    entry["returnCode"] = result["returnCode"]
+    entry["wallTime"] = result["wallTime"]
+    entry["status"] = "done" if checkChunk(entry) else "failed"
+    with saveLock:
+        manifest["chunks"][result["index"]] = entry
+        saveManifest(path, manifest)
+
+def unfinishedChunks(manifest: dict) -> list:
+    """
+    Function that lists the chunks that still have to be simulated.  Chunks marked done are checked
+    again in case their output was removed or changed since: the file size and the coincidence counts
+    have to match what was recorded when the chunk finished.
+
+    Input:
+        manifest: The manifest dictionary
+
+    Output:
+        indices: The indices of the chunks that failed, never finished or whose output is missing
+    """
+
+    indices = []
+    for entry in manifest["chunks"]:
+        if entry["status"] == "done":
+            recorded = [entry[key] for key in OUTPUT_COUNTS]
+            if checkChunk(entry) and [entry[key] for key in OUTPUT_COUNTS] == recorded:
+                continue
+            entry["status"] = "failed"
+        indices.append(entry["index"])
+    return indices
+
+def verifyForMerge(path: str, manifest: dict) -> list:
+    """
+    Function that checks every chunk before the merge.
+
+    Input:
+        path: The manifest file
+        manifest: The manifest dictionary
+
+    Output:
+        badChunks: The indices of the chunks that are not done, an empty list means it is safe to merge
+    """
+
+    badChunks = unfinishedChunks(manifest)
+    saveManifest(path, manifest)
+    if not badChunks:
+        entries = [entry["entries"] for entry in manifest["chunks"]]
+        if None not in entries:
+            print("All {} chunks checked, {} coincidences in total".format(len(entries), sum(entries)))
+        else:
+            print("All {} chunks checked (install uproot to also count the coincidences)".format(len(entries)))
+    return badChunks
@@ -0,0 +1,414 @@
+"""
+Merging of the per-chunk ROOT files.  RunningMerge folds finished chunks into one running merged file
+with hadd in the background while the other chunks are still simulating.  Chunks are folded in chunk
+(time) order, so the merged file is in time order, and only chunks that passed the manifest check are
+folded.  After the last chunk only the last few chunks are left to append.
+
+The number of chunks already in the running file is kept in the run manifest, so a resumed run carries
+on from where the merge stopped.  finishRun checks the chunks once the run is done, completes the merge
+and moves the merged file to the output folder (moveFile, so the output file is never left half
+written).
+
+mergeTree merges a whole list of files at once as a parallel tree: consecutive groups of fanIn files are
+merged by a pool of hadd processes, the group files are merged again in groups and so on until one file
+is left.  The entry counts are checked at every level and only the last level recompresses, with the
+compression chosen for downstream read speed.  It can also be run from the command line to merge a
+folder of mp_i files and compare against a single hadd call:
+
+    python3 -m GateOrchestrator.merge processOut/mp_*.root -o merged.root --fan-in 8 --workers 16 --compare
+
+Required Packages: None (standard library), hadd (ROOT) on the PATH
+Optional Packages: uproot (checks the number of entries of the merged files)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import errno
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import run, PIPE, STDOUT
+
+from GateOrchestrator import manifest
+
+try:
+    import uproot
+except ImportError:
+    uproot = None
+
+#######################
+###### CONSTANTS ######
+#######################
+
+# ROOT compression settings (100*algorithm + level) for the final merged file
+COMPRESSION_PRESETS = {
+    "read": 404,     # LZ4 level 4, fastest to decompress, a bit larger
+    "balanced": 505, # ZSTD level 5
+    "size": 207,     # LZMA level 7, smallest, slow to read
+}
+
+#####################
+###### CLASSES ######
+#####################
+
+class RunningMerge:
+    """
+    Background merge of finished chunks into a running merged file.
+
+    Input:
+        mergedFile: The running merged ROOT file
+        manifestPath: The run manifest file
+        runManifest: The run manifest dictionary, shared with the scheduler callbacks
+    """
+
+    def __init__(self, mergedFile: str, manifestPath: str, runManifest: dict):
+        self.mergedFile = mergedFile
+        self.manifestPath = manifestPath
+        self.runManifest = runManifest
+        self.condition = threading.Condition()
+        self.finishing = False
+        self.error = None
+        self.foldTime = 0.0
+
+        with manifest.saveLock:
+            merged = runManifest["chunks"][:runManifest.get("mergedChunks", 0)]
+            if runManifest.get("mergeState") != "idle" or not os.path.exists(mergedFile) or any(entry["status"] != "done" for entry in merged):
+                # New run, the last run died during a fold or a merged chunk has to be simulated again
+                if os.path.exists(mergedFile):
+                    os.remove(mergedFile)
+                runManifest["mergedChunks"] = 0
+                runManifest["mergeState"] = "idle"
+                manifest.saveManifest(manifestPath, runManifest)
+
+        self.thread = threading.Thread(target = self.run, daemon = True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def notify(self) -> None:
+        """
+        Tells the merge that a chunk finished, use as (part of) the scheduler onResult callback.
+        """
+
+        with self.condition:
+            self.condition.notify()
+
+    def readyChunks(self) -> list:
+        """
+        Returns the manifest entries of the finished chunks that directly follow the merged chunks.
+        """
+
+        ready = []
+        with manifest.saveLock:
+            for entry in self.runManifest["chunks"][self.runManifest["mergedChunks"]:]:
+                if entry["status"] != "done":
+                    break
+                ready.append(entry)
+        return ready
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                ready = self.readyChunks()
+                while not ready and not self.finishing:
+                    self.condition.wait()
+                    ready = self.readyChunks()
+            if not ready:
+                return
+            if not self.fold(ready):
+                return
+
+    def fold(self, entries: list) -> bool:
+        """
+        Appends the output files of entries to the running merged file.
+        """
+
+        with manifest.saveLock:
+            append = self.runManifest["mergedChunks"] > 0
+            self.runManifest["mergeState"] = "folding"
+            manifest.saveManifest(self.manifestPath, self.runManifest)
+
+        foldStart = time.time()
+        returnCode, output = hadd(self.mergedFile, [entry["rootFile"] for entry in entries], "-a" if append else "-fk")
+        self.foldTime += time.time() - foldStart
+        if returnCode != 0:
+            self.error = "hadd failed folding chunks {}-{}:\n{}".format(entries[0]["index"], entries[-1]["index"], output)
+            return False
+
+        with manifest.saveLock:
+            self.runManifest["mergedChunks"] += len(entries)
+            self.runManifest["mergeState"] = "idle"
+            manifest.saveManifest(self.manifestPath, self.runManifest)
+        print("Merged chunks {}-{} into {} ({}/{} chunks merged)".format(entries[0]["index"], entries[-1]["index"], self.mergedFile,
+              self.runManifest["mergedChunks"], len(self.runManifest["chunks"])), flush = True)
+        return True
+
+    def finish(self) -> bool:
+        """
+        Folds whatever is left and stops the background merge.
+
+        Output:
+            complete: True if every chunk of the run is in the merged file
+        """
+
+        finishStart = time.time()
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+        self.thread.join()
+        print("Final merge took {:.1f} s ({:.1f} s of merging in total, the rest overlapped the simulation)".format(time.time() - finishStart, self.foldTime), flush = True)
+
+        if self.error is not None:
+            print(self.error)
+            return False
+        return self.runManifest["mergedChunks"] == len(self.runManifest["chunks"])
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def hadd(outputFile: str, inputFiles: list, flag: str = "-fk") -> tuple:
+    """
+    Function that runs hadd on a list of files.
+
+    Input:
+        outputFile: The merged file
+        inputFiles: The files to merge, in order
+        flag: "-fk" keeps the compression of the inputs (fast basket copy), "-f404" etc. recompresses,
+              "-a" appends to an existing outputFile
+
+    Output:
+        returnCode, output: The exit status and the combined stdout/stderr of hadd
+    """
+
+    process = run(["hadd", flag, outputFile] + list(inputFiles), stdout = PIPE, stderr = STDOUT, universal_newlines = True)
+    return process.returncode, process.stdout
+
+def countEntries(path: str):
+    """
+    Function that counts the coincidences in a ROOT file.
+
+    Input:
+        path: The ROOT file
+
+    Output:
+        entries: The number of entries of the Coincidences tree, None without uproot
+    """
+
+    if uproot is None:
+        return None
+    with uproot.open(path) as rootFile:
+        return int(rootFile[manifest.COINCIDENCES_TREE].num_entries)
+
+def compressionSetting(compression) -> int:
+    """
+    Function that converts a preset name or a number to a ROOT compression setting.
+
+    Input:
+        compression: A name from COMPRESSION_PRESETS or a setting like 404
+
+    Output:
+        setting: The ROOT compression setting
+    """
+
+    if str(compression) in COMPRESSION_PRESETS:
+        return COMPRESSION_PRESETS[str(compression)]
+    if not re.fullmatch(r"\d{1,3}", str(compression)):
+        raise ValueError("Unknown compression '{}', use one of {} or a ROOT setting like 404".format(compression, list(COMPRESSION_PRESETS)))
+    return int(compression)
+
+def mergeTree(inputFiles: list, outputFile: str, fanIn: int = 8, workers: int = 8, compression = None, scratchFolder: str = None) -> dict:
+    """
+    Function that merges many ROOT files as a parallel tree of hadd calls.  Consecutive groups keep the
+    input order, so chunk files given in time order give a merged file in time order.
+
+    Input:
+        inputFiles: The files to merge, in order
+        outputFile: The merged file
+        fanIn: How many files each hadd call merges
+        workers: How many hadd calls run at the same time
+        compression: Compression of the final file (see compressionSetting), None keeps the input compression
+        scratchFolder: Where the intermediate files go, a temporary folder next to outputFile by default
+
+    Output:
+        stats: Dictionary with "levels", "seconds", "inputMB", "outputMB", "MBps" and "entries"
+    """
+
+    if fanIn < 2:
+        raise ValueError("fanIn must be at least 2, got {}".format(fanIn))
+
+    mergeStart = time.time()
+    inputMB = sum(os.path.getsize(path) for path in inputFiles)/1e6
+    finalFlag = "-fk" if compression is None else "-f{}".format(compressionSetting(compression))
+    scratch = tempfile.mkdtemp(prefix = "mergeTree_", dir = scratchFolder or os.path.dirname(os.path.abspath(outputFile)))
+    entries = {path: countEntries(path) for path in inputFiles}
+
+    def mergeGroup(task):
+        groupOutput, group, flag = task
+        returnCode, output = hadd(groupOutput, group, flag)
+        if returnCode != 0:
+            raise RuntimeError("hadd failed merging {} files into {}:\n{}".format(len(group), groupOutput, output))
+        expected = [entries[path] for path in group]
+        if None not in expected:
+            entries[groupOutput] = countEntries(groupOutput)
+            if entries[groupOutput] != sum(expected):
+                raise RuntimeError("{} has {} entries but its {} inputs have {}".format(groupOutput, entries[groupOutput], len(group), sum(expected)))
+        else:
+            entries[groupOutput] = None
+        return groupOutput
+
+    level = 0
+    files = list(inputFiles)
+    try:
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            while True:
+                level += 1
+                groups = [files[i:i + fanIn] for i in range(0, len(files), fanIn)]
+                if len(groups) == 1:
+                    mergeGroup((outputFile, groups[0], finalFlag))
+                    break
+                tasks = [(os.path.join(scratch, "level{}_{}.root".format(level, i)), group, "-fk") for i, group in enumerate(groups)]
+                levelStart = time.time()
+                merged = list(pool.map(mergeGroup, tasks))
+                print("Merge level {}: {} files -> {} files in {:.1f} s".format(level, len(files), len(merged), time.time() - levelStart), flush = True)
+                for path in files: # Intermediate files of the level below are no longer needed
+                    if path.startswith(scratch):
+                        os.remove(path)
+                files = merged
+    finally:
+        shutil.rmtree(scratch, ignore_errors = True)
+
+    seconds = time.time() - mergeStart
+    stats = {"levels": level, "seconds": seconds, "inputMB": inputMB, "outputMB": os.path.getsize(outputFile)/1e6,
+             "MBps": inputMB/seconds if seconds > 0 else float("inf"), "entries": entries[outputFile]}
+    print("Merged {} files ({:.1f} MB) into {} ({:.1f} MB) in {} level(s), {:.1f} s, {:.1f} MB/s, {} entries".format(
+          len(inputFiles), inputMB, outputFile, stats["outputMB"], level, seconds, stats["MBps"], stats["entries"]), flush = True)
+    return stats
+
+def checkMergedEntries(mergedFile: str, runManifest: dict) -> bool:
+    """
+    Function that checks that the merged file holds every coincidence of the chunk files.
+
+    Input:
+        mergedFile: The merged ROOT file
+        runManifest: The run manifest dictionary
+
+    Output:
+        good: True if the entry counts match, or if they can't be counted (no uproot)
+    """
+
+    expected = [entry["entries"] for entry in runManifest["chunks"]]
+    if uproot is None or None in expected:
+        return True
+    entries = countEntries(mergedFile)
+    if entries != sum(expected):
+        print("The merged file has {} coincidences but the chunks have {}".format(entries, sum(expected)))
+        return False
+    return True
+
+def moveFile(source: str, destination: str) -> None:
+    """
+    Function that moves a file so that the destination is either missing or complete.  On the same file
+    system it is renamed, otherwise it is copied to a partial file next to the destination first, which
+    is then renamed over it.
+
+    Input:
+        source: The file to move
+        destination: Where it is moved to
+    """
+
+    try:
+        os.replace(source, destination)
+        return
+    except OSError as error:
+        if error.errno != errno.EXDEV: # Anything but a move across file systems
+            raise
+
+    handle, partial = tempfile.mkstemp(prefix = "." + os.path.basename(destination) + ".partial_", dir = os.path.dirname(os.path.abspath(destination)))
+    try:
+        with os.fdopen(handle, "wb") as f, open(source, "rb") as sourceFile:
+            shutil.copyfileobj(sourceFile, f, 16*1024*1024)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, destination)
+    except BaseException: # Also Ctrl-C, a partial file is never left behind
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(source)
+
+def finishRun(runningMerge: RunningMerge, manifestPath: str, runManifest: dict, outputFile: str, workers: int) -> bool:
+    """
+    Function that finishes the merge of a run once its chunks are done.  Every chunk is checked against
+    the manifest, the background merge falls back to a tree merge if it failed and the merged file is
+    moved to the output file only once its number of coincidences has been checked.
+
+    Input:
+        runningMerge: The background merge of the run, None if the run isn't merged (only the chunks are checked)
+        manifestPath: The manifest file
+        runManifest: The manifest dictionary
+        outputFile: Where the merged file is moved to
+        workers: How many hadd calls the fallback tree merge may run at the same time
+
+    Output:
+        done: True if the output file was written (or every chunk passed without a merge), otherwise the
+              chunk outputs are left in place
+    """
+
+    rootFolder = os.path.dirname(manifestPath)
+    mergeComplete = runningMerge.finish() if runningMerge is not None else False # Appends the last finished chunks
+
+    badChunks = manifest.verifyForMerge(manifestPath, runManifest) # Every chunk has to be checked before the merge is accepted
+    if badChunks:
+        print("NOT merging, {} chunk(s) failed or are missing: {}".format(len(badChunks), badChunks))
+        print("The chunk outputs are kept in {}, rerun with --resume to simulate only these chunks".format(rootFolder))
+        return False
+    if runningMerge is None:
+        return True
+
+    if not mergeComplete: # The background merge failed, merge every chunk file as a parallel tree instead
+        try:
+            mergeTree([entry["rootFile"] for entry in runManifest["chunks"]], runningMerge.mergedFile, workers = workers)
+            mergeComplete = True
+        except RuntimeError as error:
+            print(error)
+
+    if not mergeComplete or not checkMergedEntries(runningMerge.mergedFile, runManifest):
+        print("hadd failed, the chunk outputs are kept in {}".format(rootFolder))
+        return False
+
+    moveFile(runningMerge.mergedFile, outputFile) # Atomic, also from a scratch disk to OUTPUT_ROOT
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description = "Merge ROOT files as a parallel tree of hadd calls")
+    parser.add_argument("inputs", nargs = "+", help = "The ROOT files to merge, in order")
+    parser.add_argument("-o", "--output", required = True, help = "The merged ROOT file")
+    parser.add_argument("--fan-in", type = int, default = 8, help = "How many files each hadd call merges")
+    parser.add_argument("--workers", type = int, default = 8, help = "How many hadd calls run at the same time")
+    parser.add_argument("--compression", default = None, help = "Compression of the final file: {} or a ROOT setting, default keeps the input compression".format(", ".join(COMPRESSION_PRESETS)))
+    parser.add_argument("--compare", action = "store_true", help = "Also time a single hadd call over every input")
+    args = parser.parse_args()
+
+    inputs = sorted(args.inputs, key = lambda path: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]) # mp_2 before mp_10
+    mergeTree(inputs, args.output, fanIn = args.fan_in, workers = args.workers, compression = args.compression)
+
+    if args.compare:
+        singleOutput = os.path.splitext(args.output)[0] + "_singleHadd.root"
+        singleStart = time.time()
+        returnCode, output = hadd(singleOutput, inputs, "-f")
+        seconds = time.time() - singleStart
+        if returnCode != 0:
+            print(output)
+        inputMB = sum(os.path.getsize(path) for path in inputs)/1e6
+        print("Single hadd: {:.1f} s, {:.1f} MB/s ({})".format(seconds, inputMB/seconds, singleOutput))
+
+if __name__ == "__main__":
+    main()
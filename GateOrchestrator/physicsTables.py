@@ -0,0 +1,194 @@
+"""
+Cache of the Geant4 physics tables.  Every GATE process builds the emstandard tables and the production cut
+couples of all the materials at its first time slice, which is most of its start up.  The tables only
+depend on the physics (physics list and cuts), the materials and the GATE build, so they are stored once
+per combination in PHYSICS_TABLES/<key>/ and read back by every later process:
+
+    cold    no tables for the key yet, the first chunk of the run stores the tables it built
+            (/run/particle/storePhysicsTable) into a partial folder that is published under the key when
+            the run is over and the chunk has finished
+    warm    every chunk reads the tables (/run/particle/retrievePhysicsTable) before its first window.
+            Geant4 checks the stored cut couples and builds the tables itself if they don't match
+
+The tables are stored in binary, so retrieved tables are the same as built ones and the chunk outputs
+(and the chunk cache keys) don't depend on the cache.  The start up of every process is recorded in
+PHYSICS_TABLES/startups.jsonl and the cold (built) and warm (read) start ups of the key are reported at the
+end of the run.  A new GATE executable gets a new key, remove PHYSICS_TABLES to free the space.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from GateOrchestrator import chunkCache
+
+#######################
+###### CONSTANTS ######
+#######################
+
+TABLE_LINES = ("/gate/physics/", "/gate/geometry/setMaterialDatabase") # Setup lines the tables depend on, with every material
+COUPLE_FILE = "couple.dat" # Written first by storePhysicsTable, a folder without it holds no tables
+STALE_PARTIAL = 86400.0 # s after which the partial folder of a stopped run is removed
+STARTUP_FILE = "startups.jsonl" # The process start ups of every key, cold and warm
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def tableKey(setup: str) -> str:
+    """
+    Function that hashes what the physics tables depend on: the physics lines of the setup macro, the
+    materials in the order they are placed, the material database and the GATE executable.
+
+    Input:
+        setup: The setup macro text
+
+    Output:
+        key: A short hex digest
+    """
+
+    digest = hashlib.sha1()
+    for line in setup.splitlines():
+        line = line.split("#")[0].strip()
+        if line.startswith(TABLE_LINES) or line.split(" ")[0].endswith("/setMaterial"):
+            digest.update(line.split(" ")[-1].encode() if line.split(" ")[0].endswith("/setMaterial") else line.encode())
+            digest.update(b"\n")
+            if line.startswith("/gate/geometry/setMaterialDatabase") and os.path.exists(line.split()[-1]):
+                digest.update(chunkCache.fileHash(line.split()[-1]).encode())
+
+    gate = shutil.which("Gate")
+    if gate is not None:
+        status = os.stat(gate)
+        digest.update("{} {} {}".format(os.path.realpath(gate), status.st_size, int(status.st_mtime)).encode())
+    return digest.hexdigest()[:16]
+
+def prepareTables(config, setup: str) -> dict:
+    """
+    Function that decides whether the chunks of a run read the physics tables or the first chunk stores them.
+
+    Input:
+        config: The SimulationConfig, PHYSICS_TABLES is the cache folder (None switches the cache off)
+        setup: The setup macro text
+
+    Output:
+        tables: Dictionary with the "key", the "folder" of the tables and the "mode", "retrieve" or
+                "store" (with the "partial" folder the first chunk stores into), None without a cache
+    """
+
+    if not config.PHYSICS_TABLES:
+        return None
+    if not os.path.exists(config.PHYSICS_TABLES):
+        os.makedirs(config.PHYSICS_TABLES)
+    for name in os.listdir(config.PHYSICS_TABLES):                                                   # Left by runs that were stopped
+        path = os.path.join(config.PHYSICS_TABLES, name)
+        if ".partial_" in name and time.time() - os.path.getmtime(path) > STALE_PARTIAL:
+            shutil.rmtree(path, ignore_errors = True)
+
+    key = tableKey(setup)
+    folder = os.path.join(config.PHYSICS_TABLES, key)
+    if os.path.exists(os.path.join(folder, COUPLE_FILE)):
+        print("Physics tables {} are cached, every chunk reads them".format(key))
+        return {"key": key, "folder": folder, "mode": "retrieve"}
+    print("Physics tables {} are not cached yet, the first chunk stores them".format(key))
+    return {"key": key, "folder": folder, "mode": "store", "partial": tempfile.mkdtemp(prefix = key + ".partial_", dir = config.PHYSICS_TABLES)}
+
+def tableCommands(tables: dict, index: int) -> tuple:
+    """
+    Function that writes the physics table commands of a chunk macro.
+
+    Input:
+        tables: Dictionary from prepareTables, or None
+        index: The chunk index
+
+    Output:
+        before: Lines for before the first window (read the tables)
+        after: Lines for after the first window (store the tables)
+    """
+
+    if tables is None:
+        return "", ""
+    if tables["mode"] == "retrieve":
+        return ("#   PHYSICS TABLES\n"
+                "/run/particle/retrievePhysicsTable {}/                   # Built by an earlier run with the same physics and materials, see physicsTables.py\n"
+                "\n".format(tables["folder"])), ""
+    if index == 0:
+        return "", ("#   PHYSICS TABLES\n"
+                    "/run/particle/setStoredInAscii     0                   # Binary, so the tables read back are exactly the ones built\n"
+                    "/run/particle/storePhysicsTable    {}/                   # For the later runs with the same physics and materials\n"
+                    "\n".format(tables["partial"]))
+    return "", ""
+
+def tableState(tables: dict, index: int) -> str:
+    """
+    Function that returns how a chunk gets its physics tables: "retrieved", "stored" (built and stored),
+    "built" or None without a cache.
+    """
+
+    if tables is None:
+        return None
+    if tables["mode"] == "retrieve":
+        return "retrieved"
+    return "stored" if index == 0 else "built"
+
+def publishTables(tables: dict, results: list) -> None:
+    """
+    Function that publishes the tables stored by the first chunk of a run under their key, or removes them
+    if that chunk failed.
+
+    Input:
+        tables: Dictionary from prepareTables, or None
+        results: The chunk results of the run
+    """
+
+    if tables is None or tables["mode"] != "store" or not os.path.exists(tables["partial"]):
+        return
+    stored = [result for result in results if result.get("physicsTables") == "stored"]
+    if stored and stored[0]["returnCode"] == 0 and os.path.exists(os.path.join(tables["partial"], COUPLE_FILE)) and not os.path.exists(tables["folder"]):
+        try:
+            os.rename(tables["partial"], tables["folder"])                                     # Atomic, a run that published first wins
+            print("Stored the physics tables {} in {}".format(tables["key"], tables["folder"]))
+            return
+        except OSError:
+            pass
+    shutil.rmtree(tables["partial"], ignore_errors = True)
+
+def reportStartups(tables: dict, results: list) -> None:
+    """
+    Function that records the start up of the GATE processes of a run in PHYSICS_TABLES/startups.jsonl and
+    prints the cold (tables built) and warm (tables read) start ups of the key over all the runs.
+
+    Input:
+        tables: Dictionary from prepareTables, or None
+        results: The chunk results, with the "physicsTables" state of their chunk
+    """
+
+    if tables is None:
+        return
+    path = os.path.join(os.path.dirname(tables["folder"]), STARTUP_FILE)
+    with open(path, "a") as f:
+        for result in results:
+            if result.get("firstWindow") and result.get("startupTime") is not None and result["returnCode"] == 0:
+                state = "warm" if result.get("physicsTables") == "retrieved" else "cold"
+                f.write(json.dumps({"key": tables["key"], "state": state, "startupTime": result["startupTime"]}) + "\n")
+
+    startups = {"cold": [], "warm": []}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["key"] == tables["key"]:
+                startups[record["state"]].append(record["startupTime"])
+    medians = {state: sorted(times)[len(times)//2] for state, times in startups.items() if times}
+    for state, label in (("cold", "tables built"), ("warm", "tables read")):
+        if state in medians:
+            print("Process start-up {} ({}): median {:.1f} s over {} processes".format(state, label, medians[state], len(startups[state])))
+    if len(medians) == 2:
+        print("The physics table cache saves {:.1f} s per process start-up".format(medians["cold"] - medians["warm"]))
@@ -0,0 +1,137 @@
+"""
+GATE *.placements files of the generic moves.  Every GATE process only simulates the time window of its
+chunk, but used to read (and hold) the whole trajectory, which for random walks with 1 us keyframes is
+millions of lines per process, and GATE searches the keyframe list from the start at every time slice.
+The placements file of a phantom is now read once by the orchestrator and cut into one slice per chunk:
+the keyframes inside the chunk window plus one keyframe on each side, so GATE still finds the nearest
+keyframe up to the window edges.  The slices are byte for byte copies of the original lines.
+
+The shared setup macro names the placements file through a Geant4 alias ({placements1}, {placements2})
+that the chunk macro sets to its slice before executing the setup.  GATE appends every file it is given to
+the keyframe list and never drops one, so the slice of a window is only given once: by the setup for the
+first window of a process, by the motion macro of the chunk for a window a persistent worker chains after
+it (and the worker only goes forward in time through its windows, see scheduler.runGateWorker).  A GATE
+process therefore holds, and searches from the start at every time slice, the keyframes of every window
+it has simulated: one chunk of the trajectory with persistentWorkers False, the share of the whole
+trajectory its worker simulates (about the acquisition over the number of workers) with persistent
+workers, instead of the whole trajectory in every process.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import io
+import os
+import numpy as np
+
+from GateOrchestrator import costModel
+
+#######################
+###### CONSTANTS ######
+#######################
+
+HEADER_LINES = 3 # Time, Rotation and Translation units
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def motionFiles(config) -> dict:
+    """
+    Function that lists the placements files of the phantoms that use a generic move.
+
+    Input:
+        config: The SimulationConfig
+
+    Output:
+        files: Dictionary of phantom number: placements file, e.g. {1: "data/RW4.placements"}
+    """
+
+    files = {}
+    if config.movePhantom1 and config.genericMotion1:
+        files[1] = "data/" + config.genericMotionFileName1
+    if config.movePhantom2 and config.genericMotion2:
+        files[2] = "data/" + config.genericMotionFileName2
+    return files
+
+def readPlacements(path: str) -> tuple:
+    """
+    Function that reads a placements file into its raw bytes, the byte span of every keyframe line and the
+    keyframe times.
+
+    Input:
+        path: The placements file
+
+    Output:
+        data: The content of the file
+        header: The unit lines, bytes
+        spans: (n, 2) array of the start and end byte of every keyframe line, the end includes the newline
+        times: The keyframe times in s
+    """
+
+    with open(path, "rb") as f:
+        data = f.read()
+    newlines = np.flatnonzero(np.frombuffer(data, dtype = np.uint8) == ord("\n"))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines + 1, [len(data)]])
+    lengths = np.concatenate([newlines, [len(data)]]) - starts                              # Without the newline
+    spans = np.stack([starts, ends], axis = 1)[lengths > 0]                                     # Empty lines are skipped, as GATE does
+    if len(spans) <= HEADER_LINES:
+        raise ValueError("The placements file {} has no keyframes".format(path))
+
+    header = data[:spans[HEADER_LINES][0]]
+    timeUnit = data[spans[0][0]:spans[0][1]].split()[-1].decode()
+    spans = spans[HEADER_LINES:]
+    times = np.loadtxt(io.BytesIO(data[spans[0][0]:]), usecols = 0, ndmin = 1)*costModel.UNITS[timeUnit]
+    if len(times) != len(spans):
+        raise ValueError("Could not read the keyframe times of {}".format(path))
+    return data, header, spans, times
+
+def sliceRange(times: np.ndarray, chunkStart: float, chunkEnd: float) -> tuple:
+    """
+    Function that finds the keyframes a chunk needs: those in its window and one on each side.
+
+    Input:
+        times: The sorted keyframe times in s
+        chunkStart, chunkEnd: The chunk window in s
+
+    Output:
+        first, last: The keyframes times[first:last]
+    """
+
+    first = max(0, int(np.searchsorted(times, chunkStart, side = "right")) - 1)
+    last = min(len(times), int(np.searchsorted(times, chunkEnd, side = "left")) + 1)
+    return first, max(last, first + 1)
+
+def writeSlices(path: str, timeChunks: list, prefix: str) -> list:
+    """
+    Function that cuts a placements file into one file per chunk.
+
+    Input:
+        path: The placements file
+        timeChunks: List of (chunkStart, chunkEnd) tuples in s
+        prefix: The slices are written to prefix_i.placements
+
+    Output:
+        slices: The slice file of every chunk
+    """
+
+    data, header, spans, times = readPlacements(path)
+    slices = []
+    largest = 0
+    for i, (chunkStart, chunkEnd) in enumerate(timeChunks):
+        first, last = sliceRange(times, chunkStart, chunkEnd)
+        largest = max(largest, last - first)
+        slicePath = "{}_{}.placements".format(prefix, i)
+        with open(slicePath + ".tmp", "wb") as f:
+            f.write(header)
+            f.write(data[spans[first][0]:spans[last - 1][1]])
+            if data[spans[last - 1][1] - 1:spans[last - 1][1]] != b"\n":     # The last line of the file has no newline
+                f.write(b"\n")
+        os.replace(slicePath + ".tmp", slicePath)
+        slices.append(slicePath)
+    print("Sliced {} ({} keyframes) into {} chunks of up to {} keyframes".format(path, len(times), len(timeChunks), largest))
+    return slices
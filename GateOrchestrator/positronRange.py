@@ -0,0 +1,131 @@
+"""
+Positron range kernels for the back to back source mode.  With sourceMode = "backtoback" the phantom
+sources emit two 511 keV gammas directly instead of a positron that GATE tracks until it annihilates,
+which skips the most expensive part of a small tracer simulation.  Without a kernel the pairs start where
+the positrons would have been emitted.  With positronRangeKernel the pairs start where the positrons would
+have annihilated, sampled here in python:
+
+    energy          drawn from the beta+ spectrum of the isotope (data/<isotope>_spectrum.txt, the file the
+                    positron sources use)
+    range           the Katz-Penfold range of that energy, R = 0.412 E^(1.265 - 0.0954 ln E) g/cm2 (E in
+                    MeV), divided by positronRangeDensity
+    annihilation    the emission point (uniform in the tracer shell) plus the range in a random direction
+
+The mean annihilation distances this gives in water (F-18 0.6 mm, Ga-68 3 mm) are close to the published
+3D ranges, the tails are cruder than full positron tracking.  GATE can't read such a distribution, so the
+annihilation density around the tracer centre, which falls with the distance, is written as a stack of
+uniform spheres of growing radius, each a back to back source with its share of the activity.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import numpy as np
+
+#######################
+###### CONSTANTS ######
+#######################
+
+SPECTRA = {"ga68": "data/ga68_spectrum.txt", "f18": "data/f18_spectrum.txt", "na22": "data/na22_spectrum.txt"}
+SAMPLES = 1000000 # Positrons sampled per kernel
+SHELLS = 16 # Uniform spheres the kernel is written as
+KERNEL_SEED = 68 # Fixed, so the same settings give the same setup macro (and chunk cache hits)
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def readSpectrum(path: str) -> tuple:
+    """
+    Function that reads a GATE user spectrum file (a "3 0" header line then energy in MeV and weight).
+
+    Input:
+        path: The spectrum file
+
+    Output:
+        energies: The energies in MeV
+        weights: The weights of the energies, normalised
+    """
+
+    table = np.loadtxt(path, skiprows = 1, ndmin = 2)
+    return table[:, 0], table[:, 1]/table[:, 1].sum()
+
+def katzPenfoldRange(energies: np.ndarray, density: float) -> np.ndarray:
+    """
+    Function that computes the practical range of electrons and positrons.
+
+    Input:
+        energies: The kinetic energies in MeV
+        density: The density of the medium in g/cm3
+
+    Output:
+        ranges: The ranges in mm
+    """
+
+    energies = np.clip(energies, 1e-3, None)
+    return 10*0.412*energies**(1.265 - 0.0954*np.log(energies))/density
+
+def sampleAnnihilations(isotope: str, density: float, radiusMin: float, radiusMax: float, samples: int = SAMPLES) -> np.ndarray:
+    """
+    Function that samples where the positrons of a tracer annihilate.
+
+    Input:
+        isotope: "ga68", "f18" or "na22"
+        density: The density of the medium the positrons slow down in, g/cm3
+        radiusMin, radiusMax: The tracer shell the positrons are emitted from in mm, 0 and 0 for a point
+        samples: The number of positrons
+
+    Output:
+        distances: The distance of every annihilation from the tracer centre in mm
+    """
+
+    rng = np.random.default_rng(KERNEL_SEED)
+    energies, weights = readSpectrum(SPECTRA[isotope])
+    areas = (weights[:-1] + weights[1:])*np.diff(energies)                                        # Trapezoids, the grids aren't uniform
+    bins = rng.choice(len(energies) - 1, size = samples, p = areas/areas.sum())
+    a, b, u = weights[bins], weights[bins + 1], rng.random(samples)
+    root = a + np.sqrt(a**2 + u*(b**2 - a**2))
+    fraction = np.divide(u*(a + b), root, out = u.copy(), where = root > 0)                       # Inverse CDF of the density linear between the tabulated points
+    energy = energies[bins] + fraction*(energies[bins + 1] - energies[bins])
+    ranges = katzPenfoldRange(energy, density)
+
+    radius = np.cbrt(radiusMin**3 + rng.random(samples)*(radiusMax**3 - radiusMin**3))           # Uniform in the shell
+    cosine = rng.uniform(-1.0, 1.0, samples)                                                      # Angle between the emission point and the flight
+    return np.sqrt(radius**2 + ranges**2 + 2*radius*ranges*cosine)
+
+def kernelSpheres(distances: np.ndarray, shells: int = SHELLS) -> list:
+    """
+    Function that writes the annihilation density around the tracer centre as a stack of uniform spheres.
+    The density is averaged over shells that hold fewer annihilations further out (so the long tail isn't
+    one coarse shell), made non increasing outwards (pooling shells that aren't) and every step down of the
+    density becomes a sphere.
+
+    Input:
+        distances: The distances of the annihilations from the tracer centre in mm
+        shells: The number of shells
+
+    Output:
+        spheres: List of (radius in mm, fraction of the activity) tuples, the fractions sum to 1
+    """
+
+    edges = np.quantile(distances, 1.0 - (1.0 - np.linspace(0.0, 1.0, shells + 1))**2)
+    edges[0] = 0.0
+    edges = np.unique(edges)
+    counts = np.histogram(distances, bins = edges)[0].astype(float)
+    volumes = 4.0/3.0*np.pi*(edges[1:]**3 - edges[:-1]**3)
+
+    pools = [] # [count, volume, last shell] of the pooled shells
+    for k in range(len(counts)):
+        pools.append([counts[k], volumes[k], k])
+        while len(pools) > 1 and pools[-2][0]/pools[-2][1] < pools[-1][0]/pools[-1][1]:
+            count, volume, last = pools.pop()
+            pools[-1] = [pools[-1][0] + count, pools[-1][1] + volume, last]
+
+    densities = np.array([count/volume for count, volume, last in pools])
+    radii = np.array([edges[last + 1] for count, volume, last in pools])
+    steps = densities - np.append(densities[1:], 0.0)
+    fractions = steps*4.0/3.0*np.pi*radii**3/len(distances)
+    return [(float(radius), float(fraction)) for radius, fraction in zip(radii, fractions) if fraction > 0]
@@ -0,0 +1,182 @@
+"""
+Run report from the statistics GATE writes for every chunk.  The setup macro adds the statistics actor and
+the summary output, and the window macro of chunk i points them at LOG_FOLDER/chunk_i_stat.txt and
+LOG_FOLDER/chunk_i_summary.txt, so every GATE process writes its own files instead of all of them
+overwriting output/stat.txt and output/pet_summary.txt.  Once the chunks are done the files are parsed into
+one report:
+
+    per chunk   primaries and tracks and their rates per second of GATE time after the initialisation,
+                singles, coincidences and delays, the CPU time of GATE (measured by the scheduler) and
+                the CPU time per simulated second
+    run         the totals and the rates over all the chunks
+    flags       chunks that took more than IMBALANCE times the median CPU time (the chunk plan should make
+                every chunk cost the same; first windows of a process, which pay the initialisation, are
+                compared with each other), and a run whose tracks per CPU second are more than REGRESSION
+                below those of the earlier chunks with the same signature in COST_HISTORY
+
+GATE counts from the start of the process (the statistics actor) or over every acquisition (the summary
+collections), so the counts of a window of a persistent worker are the differences to the window before
+it in the same process.  The report is printed and written next to the output file as
+<output>_report.json, the per chunk numbers also go into COST_HISTORY for the regression check.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import json
+import os
+
+#######################
+###### CONSTANTS ######
+#######################
+
+STAT_KEYS = {"primaries": "NumberOfEvents", "tracks": "NumberOfTracks", "gateTime": "ElapsedTimeWoInit"} # Report name: statistics actor key, counted from the start of the process
+SUMMARY_KEYS = {"singles": "Singles", "coincidences": "Coincidences", "delays": "delay"} # Report name: summary collection, counted over every acquisition of the process
+IMBALANCE = 1.5 # A chunk with more than this times the median CPU time is flagged
+MIN_CPU_TIME = 10.0 # s, shorter chunks are never flagged, their CPU time is mostly noise
+REGRESSION = 0.2 # A run whose tracks per CPU second are this fraction below those of the history is flagged
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def statFile(config, index: int) -> str:
+    return "{}chunk_{}_stat.txt".format(config.LOG_FOLDER, index)
+
+def summaryFile(config, index: int) -> str:
+    return "{}chunk_{}_summary.txt".format(config.LOG_FOLDER, index)
+
+def readGateCounts(path: str) -> dict:
+    """
+    Function that reads a statistics actor or summary file ("# Name = value" lines).
+
+    Input:
+        path: The file
+
+    Output:
+        counts: Dictionary of name: value (float if it is a number), None if the file can't be read
+    """
+
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    counts = {}
+    for line in lines:
+        name, equals, value = line.lstrip("#").partition("=")
+        if not equals:
+            continue
+        try:
+            counts[name.strip()] = float(value)
+        except ValueError:
+            counts[name.strip()] = value.strip()
+    return counts
+
+def chunkStatistics(results: list) -> list:
+    """
+    Function that reads the statistics and summary files of the chunks of a run.
+
+    Input:
+        results: The chunk results of the run, with the "stat" and "summary" files of their chunk
+
+    Output:
+        statistics: One dictionary per successful chunk with its "index", "duration" (simulated s),
+                    "cpuTime" and the counts of STAT_KEYS and SUMMARY_KEYS (None where a file is missing)
+    """
+
+    statistics = []
+    previous = {} # worker: (statistics counts, summary counts) at the end of its last window
+    for result in sorted(results, key = lambda result: result["launched"]):
+        if result["returnCode"] != 0:
+            continue
+        stat, summary = readGateCounts(result["stat"]), readGateCounts(result["summary"])
+        before = previous.get(result.get("worker"), ({}, {})) if not result.get("firstWindow") else ({}, {})
+        if "worker" in result:
+            previous[result["worker"]] = (stat or {}, summary or {})
+
+        chunk = {"index": result["index"], "duration": result["stop"] - result["start"], "cpuTime": result.get("cpuTime"), "firstWindow": bool(result.get("firstWindow"))}
+        for counts, start, keys in ((stat, before[0], STAT_KEYS), (summary, before[1], SUMMARY_KEYS)):
+            for name, key in keys.items():
+                known = counts is not None and isinstance(counts.get(key), float) and (result.get("firstWindow") or key in start)
+                chunk[name] = counts[key] - start.get(key, 0.0) if known else None
+        statistics.append(chunk)
+    return sorted(statistics, key = lambda chunk: chunk["index"])
+
+def rate(count, seconds):
+    return count/seconds if count is not None and seconds else None
+
+def buildReport(statistics: list, history: list) -> dict:
+    """
+    Function that sums the chunk statistics into the run report and flags slow chunks and a slow run.
+
+    Input:
+        statistics: The list from chunkStatistics
+        history: The COST_HISTORY records of earlier runs with the same signature
+
+    Output:
+        report: Dictionary with the "chunks" (with their rates added), the "run" totals and rates and
+                the "warnings"
+    """
+
+    for chunk in statistics:
+        chunk["primariesPerSecond"] = rate(chunk["primaries"], chunk["gateTime"])
+        chunk["tracksPerSecond"] = rate(chunk["tracks"], chunk["gateTime"])
+        chunk["cpuPerSimulatedSecond"] = rate(chunk["cpuTime"], chunk["duration"])
+
+    total = lambda name: sum(chunk[name] for chunk in statistics) if statistics and all(chunk[name] is not None for chunk in statistics) else None
+    run = {name: total(name) for name in ("duration", "cpuTime") + tuple(STAT_KEYS) + tuple(SUMMARY_KEYS)}
+    run.update(chunks = len(statistics), primariesPerSecond = rate(run["primaries"], run["gateTime"]), tracksPerSecond = rate(run["tracks"], run["gateTime"]),
+               tracksPerCpuSecond = rate(run["tracks"], run["cpuTime"]), cpuPerSimulatedSecond = rate(run["cpuTime"], run["duration"]))
+
+    warnings = []
+    for firstWindow, label in ((True, "started a GATE process"), (False, "ran on a persistent worker")): # Only the first window of a process pays the initialisation
+        group = [chunk for chunk in statistics if chunk["firstWindow"] == firstWindow and chunk["cpuTime"] is not None]
+        if not group:
+            continue
+        median = sorted(chunk["cpuTime"] for chunk in group)[len(group)//2]
+        slow = [chunk["index"] for chunk in group if chunk["cpuTime"] > IMBALANCE*median and chunk["cpuTime"] > MIN_CPU_TIME]
+        if slow:
+            warnings.append("{} chunk(s) that {} took more than {:.1f}x their median CPU time of {:.1f} s, the chunk plan is off for: {}".format(len(slow), label, IMBALANCE, median, slow))
+
+    earlier = [record for record in history if record.get("tracks") and record.get("cpuTime")]
+    if earlier and run["tracksPerCpuSecond"] is not None:
+        run["historyTracksPerCpuSecond"] = sum(record["tracks"] for record in earlier)/sum(record["cpuTime"] for record in earlier)
+        if run["tracksPerCpuSecond"] < (1 - REGRESSION)*run["historyTracksPerCpuSecond"]:
+            warnings.append("{:.4g} tracks per CPU second, {:.0f} % below the {:.4g} of {} earlier chunks".format(
+                            run["tracksPerCpuSecond"], 100*(1 - run["tracksPerCpuSecond"]/run["historyTracksPerCpuSecond"]), run["historyTracksPerCpuSecond"], len(earlier)))
+    return {"chunks": statistics, "run": run, "warnings": warnings}
+
+def cell(value, spec: str, width: int) -> str:
+    return format(value, spec).rjust(width) if value is not None else "-".rjust(width)
+
+def printReport(report: dict) -> None:
+    """
+    Function that prints the run report, one line per chunk then the run.
+    """
+
+    columns = [("chunk", "d", 6, "index"), ("sim (s)", ".6f", 11, "duration"), ("primaries", ".4g", 10, "primaries"), ("prim./s", ".4g", 10, "primariesPerSecond"),
+               ("tracks", ".4g", 10, "tracks"), ("tracks/s", ".4g", 10, "tracksPerSecond"), ("singles", ".0f", 9, "singles"), ("coinc.", ".0f", 9, "coincidences"),
+               ("delays", ".0f", 9, "delays"), ("CPU (s)", ".1f", 9, "cpuTime"), ("CPU/sim s", ".4g", 10, "cpuPerSimulatedSecond")]
+    print("\n###### RUN REPORT ######")
+    print(" ".join(title.rjust(width) for title, spec, width, name in columns))
+    for chunk in report["chunks"]:
+        print(" ".join(cell(chunk[name], spec, width) for title, spec, width, name in columns))
+
+    run = report["run"]
+    print("\nPrimaries: {}  Tracks: {}  Singles: {}  Coincidences: {}  Delays: {}".format(*(cell(run[name], ".4g", 0) for name in ("primaries", "tracks", "singles", "coincidences", "delays"))))
+    print("Primaries per second: {}  Tracks per second: {}  Tracks per CPU second: {}".format(*(cell(run[name], ".4g", 0) for name in ("primariesPerSecond", "tracksPerSecond", "tracksPerCpuSecond"))))
+    print("CPU time: {} s, {} s per simulated second".format(cell(run["cpuTime"], ".1f", 0), cell(run["cpuPerSimulatedSecond"], ".4g", 0)))
+    for warning in report["warnings"]:
+        print("WARNING: " + warning)
+
+def writeReport(path: str, report: dict) -> None:
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(path + ".tmp", "w") as f:
+        json.dump(report, f, indent = 1)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,500 @@
+"""
+Time-chunk scheduler for running GATE on many cores.  The acquisition is cut into many small time
+chunks which are put on a shared queue.  A bounded pool of workers (one GATE process per worker at a
+time) pulls the next chunk off the queue as soon as it is idle, so a slow chunk only holds up one
+worker instead of the whole run.  The output of every GATE process is streamed line by line into the
+chunk log file and its progress is passed to a telemetry.ProgressBoard.  An optional governor.Governor
+holds back launches while the server is busy.  The wall time of every chunk is recorded and reported at
+the end.
+
+runPersistentChunks runs persistent workers instead: a GATE process initialises once with the macro of
+its first chunk and then simulates the time windows of further chunks, so the geometry and physics set up
+is paid once per process instead of once per chunk.  Every chunk macro ends by executing its window macro
+(setFileName, setTimeStart/Stop, startDAQ between two /control/echo markers).  The worker's driver macro
+chains "next" macros that are written just in time, one window ahead, from the shared queue, and an
+empty next macro ends the process, also when the governor allows fewer processes than run (checked before
+every next window, so a busy server throttles persistent workers too).  The start-up overhead of every window (launch or window start to the
+first time slice) is measured and reported.
+
+Every GATE process is started in its own process group (launchGate).  When the run is stopped (Ctrl-C, or
+SIGTERM and SIGHUP, see scratch.py) stopProcesses sends SIGTERM to the group of every GATE process that
+still runs, SIGKILL to those still running STOP_TIMEOUT s later, and the workers record their chunks
+before the stop goes on, so nothing writes into ROOT_FOLDER while it is cleaned up and no GATE process is
+left holding the cores.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import itertools
+import os
+import queue
+import re
+import signal
+import threading
+import time
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+
+from GateOrchestrator import telemetry
+
+#######################
+###### CONSTANTS ######
+#######################
+
+WINDOW_PATTERN = re.compile(r"^GateOrchestrator window \S+ (start|end)") # Echoed by the window macros
+STOP_TIMEOUT = 10.0 # s the GATE processes get to exit after SIGTERM before they are killed
+
+liveProcesses = set() # The running GATE processes, see launchGate
+liveLock = threading.Lock()
+stopping = threading.Event() # Set by stopProcesses, no GATE process is started any more
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def makeTimeChunks(startTime: float, endTime: float, nChunks: int) -> list:
+    """
+    Function that splits the acquisition [startTime, endTime] into equal time chunks.
+
+    Input:
+        startTime: The acquisition start time in s
+        endTime: The acquisition end time in s
+        nChunks: The number of chunks to create
+
+    Output:
+        chunks: List of (chunkStart, chunkEnd) tuples in s.  The last chunk ends exactly at endTime.
+    """
+
+    if nChunks < 1:
+        raise ValueError("nChunks must be at least 1, got {}".format(nChunks))
+    if endTime <= startTime:
+        raise ValueError("endTime ({}) must be after startTime ({})".format(endTime, startTime))
+
+    chunkTime = (endTime - startTime)/nChunks
+    edges = [startTime + i*chunkTime for i in range(nChunks)] + [endTime] # Build from the start time to avoid accumulating FP error
+    return [(edges[i], edges[i+1]) for i in range(nChunks)]
+
+def launchGate(macro: str) -> Popen:
+    """
+    Function that starts GATE on a macro in a new session (its own process group), so stopProcesses can
+    stop it and anything it started.  Once the run is being stopped no process is started, the worker
+    thread asking for one ends instead.
+    """
+
+    with liveLock:
+        if stopping.is_set():
+            raise SystemExit("The run is being stopped") # Ends a worker thread quietly
+        process = Popen(["Gate", macro], stdout = PIPE, stderr = STDOUT, universal_newlines = True, bufsize = 1, start_new_session = True)
+        liveProcesses.add(process)
+    return process
+
+def forgetGate(process: Popen) -> None:
+    with liveLock:
+        liveProcesses.discard(process)
+
+def signalGroup(process: Popen, signum: int) -> None:
+    try:
+        os.killpg(process.pid, signum)
+    except (ProcessLookupError, PermissionError): # The group is gone already
+        pass
+
+def stopProcesses(timeout: float = STOP_TIMEOUT) -> None:
+    """
+    Function that stops every running GATE process: SIGTERM to its process group, then SIGKILL to the
+    groups of the processes that are still running after timeout s.  Returns once they have exited, no new
+    GATE process is started afterwards.
+
+    Input:
+        timeout: s the processes get to exit after SIGTERM
+    """
+
+    with liveLock:
+        stopping.set()
+        processes = [process for process in liveProcesses if process.poll() is None]
+    if not processes:
+        return
+    print("Stopping {} GATE process(es)".format(len(processes)), flush = True)
+    for process in processes:
+        signalGroup(process, signal.SIGTERM)
+    deadline = time.time() + timeout
+    for process in processes:
+        try:
+            process.wait(max(0.0, deadline - time.time()))
+        except TimeoutExpired:
+            print("GATE process {} didn't stop within {:.0f} s, killing it".format(process.pid, timeout), flush = True)
+            signalGroup(process, signal.SIGKILL)
+            process.wait()
+
+def runWorkers(worker, count: int) -> None:
+    """
+    Function that runs count threads of worker and waits for them.  If the run is stopped while they work
+    (Ctrl-C, or SIGTERM and SIGHUP raised as SystemExit) the GATE processes are stopped and the workers get
+    STOP_TIMEOUT s to record their chunks before the stop is raised on.  The workers are waited for on
+    events, a Thread.join that was interrupted treats its thread as finished.
+
+    Input:
+        worker: Function run by every thread
+        count: The number of threads
+    """
+
+    done = [threading.Event() for _ in range(count)]
+
+    def work(event):
+        try:
+            worker()
+        finally:
+            event.set()
+
+    for event in done:
+        threading.Thread(target = work, args = (event,), daemon = True).start()
+    try:
+        for event in done:
+            event.wait()
+    except (KeyboardInterrupt, SystemExit):
+        stopProcesses()
+        deadline = time.time() + STOP_TIMEOUT
+        for event in done:
+            event.wait(max(0.0, deadline - time.time()))
+        raise
+
+def runGateMacro(chunk: dict, board = None, governor = None) -> dict:
+    """
+    Function that runs GATE on the macro of a single chunk and times it.  The output is streamed line by
+    line to the chunk log (or printed with a chunk prefix if the chunk has no log) and never held in memory.
+
+    Input:
+        chunk: The chunk description, needs at least the "index" and "macro" (path to the macro file) keys,
+               "log" is the optional log file
+        board: Optional telemetry.ProgressBoard that is told how far the chunk has got
+        governor: Optional governor.Governor that measures the memory of the GATE process
+
+    Output:
+        result: A copy of chunk with "returnCode", "wallTime" (s), "launched" and "finished" (epoch s) and
+                the "cpuTime" (s) of GATE up to the end of the window added
+    """
+
+    log = telemetry.RotatingLog(chunk["log"]) if chunk.get("log") else None
+    if board is not None:
+        board.started(chunk)
+
+    launched = time.time()
+    startupTime = cpuTime = None
+    with launchGate(chunk["macro"]) as process:
+        if governor is not None:
+            governor.register(process.pid)
+        try:
+            for line in process.stdout:
+                if log is not None:
+                    log.write(line)
+                else:
+                    print("[chunk {}] {}".format(telemetry.chunkName(chunk), line), end = "")
+                marker = WINDOW_PATTERN.match(line)
+                if marker is not None and marker.group(1) == "end":
+                    cpuTime = telemetry.processCpuTime(process.pid) # The process still runs, after the window it only exits
+                elif line.startswith("Slice "):
+                    if startupTime is None:
+                        startupTime = time.time() - launched
+                    simTime = telemetry.parseSliceTime(line)
+                    if board is not None and simTime is not None:
+                        board.update(chunk["index"], simTime)
+        except (KeyboardInterrupt, SystemExit):                                                                    # Stopped while run on the main thread, e.g. the dry run pilot
+            stopProcesses()
+            raise
+        returnCode = process.wait()
+        forgetGate(process)
+        if governor is not None:
+            governor.unregister(process.pid)
+    finished = time.time()
+
+    if log is not None:
+        log.close()
+    if board is not None:
+        board.finished(chunk["index"])
+
+    result = dict(chunk)
+    result.update(returnCode = returnCode, wallTime = finished - launched, launched = launched, finished = finished, startupTime = startupTime, firstWindow = True, cpuTime = cpuTime)
+    return result
+
+def writeMacro(path: str, lines: list) -> None:
+    """
+    Function that writes a macro atomically, so GATE never executes a half written file.
+
+    Input:
+        path: The macro file
+        lines: The macro commands
+    """
+
+    with open(path + ".tmp", "w") as f:
+        f.write("".join(line + "\n" for line in lines))
+    os.replace(path + ".tmp", path)
+
+def runGateWorker(first: dict, workQueue: queue.Queue, worker: int, onWindow, board = None, governor = None) -> bool:
+    """
+    Function that runs one persistent GATE process.  It initialises with the macro of its first chunk and
+    then simulates the windows of chunks taken off the queue until the queue is empty, the next chunk is
+    earlier than the last one (see placements.py), that chunk is left for a new process, or the governor
+    takes the slot of the process back (Governor.keep) because the server got busy.
+
+    Input:
+        first: The first chunk, needs "index", "macro" and "window" (its window macro) keys, "motion" (its
+               motion macro) and "log" are optional
+        workQueue: The shared queue of chunks, chunks handed out but never started are put back on it
+        worker: Number of the process, used to name its macros and log
+        onWindow: Function called with the result dictionary of every window as soon as it ends
+        board: Optional telemetry.ProgressBoard that is told how far the current window has got
+        governor: Optional governor.Governor that measures the memory of the GATE process and is asked
+                  before every further window
+
+    Output:
+        released: True if the governor took the slot of the process back, don't release it again
+    """
+
+    prefix = os.path.join(os.path.dirname(first["macro"]), "worker_{}".format(worker))
+    windows = [first]
+    released = False
+
+    def handOut(k):
+        # Writes next macro k, it simulates the window of the next chunk on the queue or ends the process
+        nonlocal released
+        if governor is not None and not governor.keep():                                                    # The server got busy, the windows left go to the processes that stay
+            released = True
+            writeMacro("{}_next_{}.mac".format(prefix, k), [])
+            return False
+        try:
+            chunk = workQueue.get_nowait()
+        except queue.Empty:
+            writeMacro("{}_next_{}.mac".format(prefix, k), [])
+            return False
+        if chunk["start"] < windows[-1]["start"]:                                                     # A window put back by a dead process, GATE only moves forward through the placements slices
+            workQueue.put(chunk)
+            writeMacro("{}_next_{}.mac".format(prefix, k), [])
+            return False
+        windows.append(chunk)
+        motion = ["/control/execute {}".format(chunk["motion"])] if chunk.get("motion") else []                  # The placements slices of a chained window, the first one's are read by the setup
+        writeMacro("{}_next_{}.mac".format(prefix, k), motion + ["/control/execute {}".format(chunk["window"]), "/control/execute {}_next_{}.mac".format(prefix, k + 1)])
+        return True
+
+    writeMacro(prefix + "_driver.mac", ["/control/execute {}".format(first["macro"]), "/control/execute {}_next_1.mac".format(prefix)])
+    handing = handOut(1)
+    log = telemetry.RotatingLog(os.path.join(os.path.dirname(first["log"]), "worker_{}.log".format(worker))) if first.get("log") else None
+
+    current = -1 # The window being simulated
+    endedWindows = 0
+    lastCpu = 0.0 # CPU time of the process at the end of the last window
+    launched = windowStart = time.time()
+    startupTime = None
+    with launchGate(prefix + "_driver.mac") as process:
+        if governor is not None:
+            governor.register(process.pid)
+        for line in process.stdout:
+            if log is not None:
+                log.write(line)
+            else:
+                print("[worker {}] {}".format(worker, line), end = "")
+
+            marker = WINDOW_PATTERN.match(line)
+            if marker is not None and marker.group(1) == "start":
+                current += 1
+                windowStart = launched if current == 0 else time.time() # The first window pays the initialisation
+                startupTime = None
+                if board is not None:
+                    board.started(windows[current])
+                if current > 0 and handing:
+                    handing = handOut(current + 1)
+            elif marker is not None:
+                finished = time.time()
+                if board is not None:
+                    board.finished(windows[current]["index"])
+                processCpu = telemetry.processCpuTime(process.pid)
+                result = dict(windows[current])
+                result.update(returnCode = 0, wallTime = finished - windowStart, launched = windowStart, finished = finished,
+                              startupTime = startupTime, firstWindow = current == 0, worker = worker,
+                              cpuTime = processCpu - lastCpu if processCpu is not None and lastCpu is not None else None)
+                lastCpu = processCpu
+                endedWindows += 1
+                onWindow(result)
+            elif line.startswith("Slice ") and current >= 0:
+                if startupTime is None:
+                    startupTime = time.time() - windowStart
+                simTime = telemetry.parseSliceTime(line)
+                if board is not None and simTime is not None:
+                    board.update(windows[current]["index"], simTime)
+        returnCode = process.wait()
+        forgetGate(process)
+        if governor is not None:
+            governor.unregister(process.pid)
+    finished = time.time()
+    if log is not None:
+        log.close()
+
+    # The window that was running when GATE died (or the first chunk if it died during the initialisation)
+    # failed, the windows that were handed out but never started go back on the queue
+    if endedWindows == current + 1 and current >= 0:
+        failedWindows = []
+    else:
+        failedWindows = [windows[endedWindows]]
+        if board is not None:
+            board.finished(windows[endedWindows]["index"])
+        result = dict(windows[endedWindows])
+        result.update(returnCode = returnCode if returnCode != 0 else -1, wallTime = finished - windowStart, launched = windowStart, finished = finished,
+                      startupTime = startupTime, firstWindow = endedWindows == 0, worker = worker)
+        onWindow(result)
+    for chunk in windows[endedWindows + len(failedWindows):]:
+        workQueue.put(chunk)
+    return released
+
+def runChunks(chunks: list, cores: int, runner = runGateMacro, onResult = None, governor = None) -> list:
+    """
+    Function that runs every chunk on a bounded pool of workers.  Each worker takes the next chunk off
+    a shared queue as soon as its previous chunk is done, so the pool stays busy until the queue is empty.
+    With a governor every launch waits until the governor allows one more worker.
+
+    Input:
+        chunks: List of chunk dictionaries, each with an "index" key and whatever runner needs
+        cores: The maximum number of chunks that run at the same time
+        runner: Function that runs one chunk and returns its result dictionary
+        onResult: Optional function called with each result as soon as its chunk is done
+        governor: Optional governor.Governor that decides how many of the cores workers may run
+
+    Output:
+        results: The result dictionaries from runner, sorted by chunk index
+    """
+
+    workQueue = queue.Queue()
+    for chunk in chunks:
+        workQueue.put(chunk)
+
+    results = []
+    resultsLock = threading.Lock()
+
+    def worker():
+        while not stopping.is_set():
+            if governor is not None:
+                governor.acquire()
+            try:
+                chunk = workQueue.get_nowait()
+            except queue.Empty:
+                if governor is not None:
+                    governor.release()
+                return
+            try:
+                result = runner(chunk)
+            finally:
+                if governor is not None:
+                    governor.release()
+            with resultsLock:
+                results.append(result)
+                print("Chunk {} finished in {:.1f} s ({}/{} done)".format(telemetry.chunkName(result), result["wallTime"], len(results), len(chunks)), flush = True)
+                if onResult is not None:
+                    onResult(result)
+
+    stopping.clear()
+    runWorkers(worker, min(cores, len(chunks)))
+
+    return sorted(results, key = lambda result: result["index"])
+
+def runPersistentChunks(chunks: list, cores: int, onResult = None, governor = None, board = None) -> list:
+    """
+    Function that runs every chunk on a bounded pool of persistent GATE workers.  Each worker runs one
+    GATE process at a time that simulates chunk windows until the queue is empty, a new process is only
+    started if the previous one died.  Chunks of different jobs (the "job" key, e.g. the configurations of
+    a sweep) are kept on separate queues, a process only simulates windows of the job it was set up for.
+
+    Input:
+        chunks: List of chunk dictionaries, see runGateWorker
+        cores: The maximum number of GATE processes that run at the same time
+        onResult: Optional function called with each result as soon as its window is done
+        governor: Optional governor.Governor that decides how many of the cores processes may run
+        board: Optional telemetry.ProgressBoard that is told how far every chunk has got
+
+    Output:
+        results: The result dictionaries of the windows, sorted by chunk index
+    """
+
+    jobQueues = {} # job: queue of its chunks, in the order the jobs first appear
+    for chunk in chunks:
+        jobQueues.setdefault(chunk.get("job", 0), queue.Queue()).put(chunk)
+
+    results = []
+    resultsLock = threading.Lock()
+    processNumbers = itertools.count()
+
+    def takeChunk():
+        for workQueue in jobQueues.values():
+            try:
+                return workQueue.get_nowait(), workQueue
+            except queue.Empty:
+                continue
+        return None, None
+
+    def onWindow(result):
+        with resultsLock:
+            results.append(result)
+            print("Chunk {} finished in {:.1f} s on worker {} ({}/{} done)".format(telemetry.chunkName(result), result["wallTime"], result["worker"], len(results), len(chunks)), flush = True)
+            if onResult is not None:
+                onResult(result)
+
+    def worker():
+        while not stopping.is_set():
+            if governor is not None:
+                governor.acquire()
+            first, workQueue = takeChunk()
+            if first is None:
+                if governor is not None:
+                    governor.release()
+                return
+            released = False
+            try:
+                released = runGateWorker(first, workQueue, next(processNumbers), onWindow, board, governor)
+            finally:
+                if governor is not None and not released:
+                    governor.release()
+
+    stopping.clear()
+    runWorkers(worker, min(cores, len(chunks)))
+
+    return sorted(results, key = lambda result: result["index"])
+
+def reportChunkTimes(results: list, cores: int) -> None:
+    """
+    Function that prints the wall time of every chunk and a summary of how well the pool was used.
+
+    Input:
+        results: The result dictionaries returned by runChunks
+        cores: The number of workers the chunks were run on
+    """
+
+    if not results:
+        print("No chunks were run")
+        return
+
+    print("\n###### CHUNK WALL TIMES ######")
+    print("{:>6} {:>14} {:>14} {:>12} {:>12} {:>6}".format("chunk", "start (s)", "stop (s)", "est. (s)", "wall (s)", "exit"))
+    for result in results:
+        print("{:>6} {:>14.6f} {:>14.6f} {:>12.1f} {:>12.1f} {:>6}".format(telemetry.chunkName(result), result["start"], result["stop"], result.get("estimatedTime", float("nan")), result["wallTime"], result["returnCode"]))
+
+    wallTimes = sorted(result["wallTime"] for result in results)
+    runWallTime = max(result["finished"] for result in results) - min(result["launched"] for result in results)
+    busyTime = sum(wallTimes)
+    slowest = max(results, key = lambda result: result["wallTime"])
+
+    print("\nChunks: {}  Workers: {}".format(len(results), cores))
+    print("Chunk wall time min/median/max: {:.1f} / {:.1f} / {:.1f} s".format(wallTimes[0], wallTimes[len(wallTimes)//2], wallTimes[-1]))
+    print("Slowest chunk: {} ({:.6f} - {:.6f} s)".format(telemetry.chunkName(slowest), slowest["start"], slowest["stop"]))
+    print("Run wall time: {:.1f} s  Worker utilisation: {:.1f} %".format(runWallTime, 100.0*busyTime/(min(cores, len(results))*runWallTime) if runWallTime > 0 else 100.0))
+
+    firstStartups = sorted(result["startupTime"] for result in results if result.get("startupTime") is not None and result.get("firstWindow"))
+    windowStartups = sorted(result["startupTime"] for result in results if result.get("startupTime") is not None and not result.get("firstWindow"))
+    if firstStartups:
+        print("Process start-up (launch to first time slice) median/max: {:.1f} / {:.1f} s over {} processes, {:.1f} % of the worker time".format(
+              firstStartups[len(firstStartups)//2], firstStartups[-1], len(firstStartups), 100.0*sum(firstStartups)/busyTime if busyTime > 0 else 0.0))
+    if windowStartups:
+        print("Window start-up (window start to first time slice) median/max: {:.2f} / {:.2f} s over {} windows, {:.1f} % of the worker time".format(
+              windowStartups[len(windowStartups)//2], windowStartups[-1], len(windowStartups), 100.0*sum(windowStartups)/busyTime if busyTime > 0 else 0.0))
+
+    failed = [telemetry.chunkName(result) for result in results if result["returnCode"] != 0]
+    if failed:
+        print("WARNING: {} chunk(s) exited with a non-zero status: {}".format(len(failed), failed))
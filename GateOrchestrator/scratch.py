@@ -0,0 +1,239 @@
+"""
+Scratch space of a run.  MACRO_FOLDER and ROOT_FOLDER only hold files the run needs while it goes on (the
+macros, the chunk outputs, the running merge, the manifest and the logs), so they are moved to a fast node
+local disk or tmpfs when it has room for them:
+
+    choice      the first folder of SCRATCH (":" separated, $VARIABLES are expanded, unset ones skipped)
+                with room for the scratch the dry run plans (the simulated chunk files, the merged file and
+                the cached chunks if they have to be copied), within dryRun.DISK_MARGIN of its free space.
+                Otherwise, with SCRATCH None, or when resuming a run whose manifest is in ROOT_FOLDER, the
+                folders stay where they are configured
+    output      the merged file is moved to OUTPUT_ROOT with merge.moveFile, which copies across file
+                systems into a partial file and renames it, so the output file is never half written
+    clean up    the scratch folder of the run is removed when the run is over, also when it fails, is
+                stopped with Ctrl-C or SIGTERM or raises.  The GATE processes still running are stopped
+                first (scheduler.stopProcesses), so none of them writes into the folder.  The ROOT_FOLDER of a run that wasn't merged
+                (its manifest, the chunk outputs, the running merge and the logs) is moved back to the
+                configured ROOT_FOLDER first and the chunk paths of its manifest are rewritten, so --resume
+                continues it there as if it had never been on scratch.  A process that is killed outright
+                (SIGKILL, the node going down) can't clean up, its folder is removed by the next run on
+                the same node once that process is gone
+
+The folders kept where they are configured behave as before: MACRO_FOLDER is removed at the end (the
+macros are compiled again on --resume), ROOT_FOLDER is removed once the run is merged and kept otherwise,
+so the run can be resumed.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import json
+import os
+import shutil
+import signal
+import socket
+import tempfile
+
+from GateOrchestrator import dryRun, manifest, scheduler
+
+#######################
+###### CONSTANTS ######
+#######################
+
+SCRATCH_PREFIX = "GATE_scratch_" # Scratch folders are named GATE_scratch_<host>_<process id>_<random>
+STOP_SIGNALS = ("SIGTERM", "SIGHUP") # Signals (e.g. from the batch system) that stop the run like Ctrl-C does
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def scratchCandidates(scratch: str) -> list:
+    """
+    Function that lists the existing, writable folders of a SCRATCH setting, in order.
+    """
+
+    if not scratch:
+        return []
+    folders = []
+    for folder in scratch.split(":"):
+        folder = os.path.expandvars(folder.strip())
+        if folder and "$" not in folder and os.path.isdir(folder) and os.access(folder, os.W_OK | os.X_OK) and folder not in folders:
+            folders.append(folder)
+    return folders
+
+def processAlive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: # Alive, but someone else's
+        return True
+    return True
+
+def removeStale(folder: str) -> None:
+    """
+    Function that removes the scratch folders of runs on this host whose process is gone.
+    """
+
+    prefix = "{}{}_".format(SCRATCH_PREFIX, socket.gethostname())
+    for name in os.listdir(folder):
+        pid = name[len(prefix):].split("_")[0]
+        if name.startswith(prefix) and pid.isdigit() and not processAlive(int(pid)):
+            print("Removing the scratch folder of a stopped run: {}".format(os.path.join(folder, name)))
+            shutil.rmtree(os.path.join(folder, name), ignore_errors = True)
+
+def chooseScratch(scratch: str, needs: list) -> str:
+    """
+    Function that picks the first SCRATCH folder with room for the runs.
+
+    Input:
+        scratch: The SCRATCH setting
+        needs: (scratch bytes, cached bytes, CHUNK_CACHE or None) of every run, the cached bytes are only
+               needed if the cache is on another file system and the chunks have to be copied
+
+    Output:
+        folder: The scratch folder, None if none has room
+    """
+
+    for folder in scratchCandidates(scratch):
+        free, device = dryRun.diskSpace(folder)
+        need = sum(scratchBytes + (cachedBytes if cache and dryRun.diskSpace(cache)[1] != device else 0) for scratchBytes, cachedBytes, cache in needs)
+        if need <= dryRun.DISK_MARGIN*free:
+            print("Scratch in {}: {} planned, {} free".format(folder, dryRun.formatBytes(need), dryRun.formatBytes(free)))
+            return folder
+        print("Scratch doesn't fit in {}: {} planned, {} free".format(folder, dryRun.formatBytes(need), dryRun.formatBytes(free)))
+    return None
+
+def keepRootFolder(placed, config) -> None:
+    """
+    Function that moves the ROOT_FOLDER of a run that wasn't merged from scratch to its configured
+    ROOT_FOLDER and points the chunks of its manifest there, so the run can be resumed.
+
+    Input:
+        placed: The SimulationConfig of the run on scratch, its ROOT_FOLDER holds the manifest
+        config: The SimulationConfig as configured, its ROOT_FOLDER is replaced if it exists
+    """
+
+    if os.path.exists(config.ROOT_FOLDER):
+        shutil.rmtree(config.ROOT_FOLDER)
+    parent = os.path.dirname(config.ROOT_FOLDER.rstrip("/"))
+    if parent and not os.path.exists(parent):
+        os.makedirs(parent)
+    shutil.move(placed.ROOT_FOLDER.rstrip("/"), config.ROOT_FOLDER.rstrip("/"))                                       # Copies across file systems
+    with open(config.RUN_MANIFEST) as f:
+        runManifest = json.load(f)
+    for entry in runManifest["chunks"]:
+        if entry["rootFile"].startswith(placed.ROOT_FOLDER):
+            entry["rootFile"] = config.ROOT_FOLDER + entry["rootFile"][len(placed.ROOT_FOLDER):]
+    manifest.saveManifest(config.RUN_MANIFEST, runManifest)
+
+def raiseStop(signum, frame):
+    for name in STOP_SIGNALS:                                                                                           # A repeated stop (the batch system signals every process of the job) mustn't break off the clean up, cleanUp puts the handlers back
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_IGN)
+    raise SystemExit(128 + signum) # Unwinds like Ctrl-C, so the finally blocks run
+
+#####################
+###### CLASSES ######
+#####################
+
+class ScratchSpace:
+    """
+    Class that moves the MACRO_FOLDER and ROOT_FOLDER of one or more runs (e.g. the jobs of a sweep) to a
+    scratch folder and removes them again.  Used as
+
+        space = ScratchSpace(configs, resume)
+        try:
+            configs = space.start()
+            ...plan and run...
+        finally:
+            space.cleanUp()
+
+    Input:
+        configs: The SimulationConfigs of the runs, the SCRATCH setting of the first is used
+        resume: The runs continue from their manifest, runs whose manifest exists in their configured
+                ROOT_FOLDER (also one moved back from scratch by cleanUp) keep their folders
+        sweepJobs: Number of runs sharing the worker pool, as in simulationRun.planRun
+    """
+
+    def __init__(self, configs: list, resume: bool = False, sweepJobs: int = 1):
+        self.configs = configs
+        self.resume = resume
+        self.sweepJobs = sweepJobs
+        self.folder = None # The scratch folder of the run, None if the folders stay where they are
+        self.placed = list(configs)
+        self.handlers = {}
+
+    def start(self) -> list:
+        """
+        Function that installs the signal handlers and places the folders of the runs.
+
+        Output:
+            configs: The SimulationConfigs with MACRO_FOLDER and ROOT_FOLDER in the scratch folder, or
+                     unchanged if they stay where they are
+        """
+
+        for name in STOP_SIGNALS:
+            if hasattr(signal, name):
+                self.handlers[name] = signal.signal(getattr(signal, name), raiseStop)
+
+        scratch = self.configs[0].SCRATCH if self.configs else None
+        for folder in scratchCandidates(scratch):
+            removeStale(folder)
+        moving = [j for j, config in enumerate(self.configs) if not (self.resume and os.path.exists(config.RUN_MANIFEST))]
+        if not scratch or not moving:
+            return self.placed
+
+        needs = []
+        for j in moving:
+            plan = dryRun.planEstimates(self.configs[j], self.sweepJobs)
+            needs.append((plan["scratchBytes"], plan["cachedBytes"], self.configs[j].CHUNK_CACHE))
+        parent = chooseScratch(scratch, needs)
+        if parent is None:
+            print("No SCRATCH folder has room, MACRO_FOLDER and ROOT_FOLDER stay where they are")
+            return self.placed
+
+        self.folder = tempfile.mkdtemp(prefix = "{}{}_{}_".format(SCRATCH_PREFIX, socket.gethostname(), os.getpid()), dir = parent)
+        for j in moving:
+            jobFolder = os.path.join(self.folder, "job{}".format(j)) if len(self.configs) > 1 else self.folder
+            self.placed[j] = self.configs[j].replace(MACRO_FOLDER = jobFolder + "/macros/", ROOT_FOLDER = jobFolder + "/root/")
+        print("MACRO_FOLDER and ROOT_FOLDER are in {}".format(self.folder))
+        return self.placed
+
+    def cleanUp(self) -> None:
+        """
+        Function that stops the GATE processes that still run, removes the scratch folder (moving the
+        ROOT_FOLDER of runs that weren't merged back to their configured ROOT_FOLDER, see keepRootFolder)
+        and the MACRO_FOLDER of runs that stayed where they are configured, then puts the signal handlers
+        back.  Safe to call more than once.
+        """
+
+        scheduler.stopProcesses() # Normally done by the scheduler when the run is stopped, nothing may write into the folders
+        kept = False
+        try:
+            for config, placed in zip(self.configs, self.placed):
+                if placed is config:
+                    shutil.rmtree(config.MACRO_FOLDER, ignore_errors = True)
+                elif os.path.exists(placed.RUN_MANIFEST): # Not merged, runJobs removes ROOT_FOLDER once it is
+                    try:
+                        keepRootFolder(placed, config)
+                    except OSError as error:
+                        kept = True
+                        print("Moving {} to {} failed ({}), the scratch folder is kept".format(placed.ROOT_FOLDER, config.ROOT_FOLDER, error))
+                        continue
+                    print("The run was not merged, its manifest, chunk outputs and logs are kept in {}, rerun with --resume to continue it".format(config.ROOT_FOLDER))
+                elif os.path.exists(placed.LOG_FOLDER):                                                             # Stopped before its manifest was written
+                    shutil.rmtree(config.LOG_FOLDER, ignore_errors = True)
+                    shutil.copytree(placed.LOG_FOLDER, config.LOG_FOLDER)
+                    print("The run was not merged, its logs are kept in {}".format(config.LOG_FOLDER))
+        finally:
+            if self.folder is not None and not kept:
+                shutil.rmtree(self.folder, ignore_errors = True)
+                self.folder = None
+            for name, handler in self.handlers.items():
+                signal.signal(getattr(signal, name), handler)
+            self.handlers = {}
+            self.placed = list(self.configs)
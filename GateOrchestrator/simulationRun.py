@@ -0,0 +1,224 @@
+"""
+The two steps of a simulation run, shared by the Siemens_ECAT_HR++_*.py scripts and the sweep.  planRun
+plans the time chunks of a SimulationConfig with the cost model (costInputs and planTimeWindows, which
+write nothing and are also used by the dry run), keeps the windows that are already in the chunk cache,
+compiles the macros and writes (or, with resume, reloads) the run manifest.  runJobs runs the
+chunks of one or more planned runs on one pool of GATE workers under one governor, merges every run in the
+background into its own output file (and, with OUTPUT_NPY, converts its chunks to the listmode file) and
+removes the temporary folders of the runs that were written.
+
+Required Packages: numpy
+Optional Packages: uproot (listmode output)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+import shutil
+
+from GateOrchestrator import scheduler, costModel, manifest, merge, telemetry, governor, chunkCache, macroCompiler, timeSlicing, physicsTables, runReport, listmode
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def createFolderIfNotExist(folder):
+    if not os.path.exists(folder):
+            os.makedirs(folder)
+
+def costInputs(config, sweepJobs: int = 1) -> dict:
+    """
+    Function that collects what the chunk planning needs, without writing anything.
+
+    Input:
+        config: The SimulationConfig of the run
+        sweepJobs: Number of runs sharing the worker pool, each is cut into 1/N of the chunks
+
+    Output:
+        inputs: Dictionary with the "controls", "workers", "nChunks", "timeSliceSeconds", the cost model
+                "signature", "history" and "costCoefficients", the "runHash", the active "sources" and
+                "keyframeTimes", the "cacheSignature" and the "cachedWindows"
+    """
+
+    inputs = {"controls": config.controls()}
+    controls = inputs["controls"]
+    inputs["workers"] = governor.Governor(config.GOVERNOR_CONFIG, config.cores).maxWorkers # The most GATE processes the governor will ever allow
+    inputs["nChunks"] = max(1, round(inputs["workers"]*config.chunksPerCore/sweepJobs))
+    inputs["timeSliceSeconds"] = timeSlicing.resolveTimeSlice(config)                                                    # Chosen from the motion if timeStep is auto
+    inputs["signature"] = costModel.configSignature(controls)
+    inputs["runHash"] = manifest.configHash(controls)
+    inputs["sources"] = costModel.activeSources(controls)
+    inputs["keyframeTimes"] = costModel.activeKeyframeTimes(controls)
+    inputs["history"] = costModel.loadHistory(config.COST_HISTORY, inputs["signature"])
+    inputs["costCoefficients"] = costModel.fitCostModel(inputs["history"])
+    inputs["cacheSignature"] = chunkCache.cacheSignature(controls)
+    inputs["cachedWindows"] = chunkCache.cachedWindows(config.CHUNK_CACHE, inputs["cacheSignature"], config.startTime, config.endTime) if config.CHUNK_CACHE else []
+    return inputs
+
+def planTimeWindows(config, inputs: dict) -> list:
+    """
+    Function that plans the time chunks of a run.  The chunks are sized so each has about the same
+    estimated cost (decays, keyframes and time slices), the cost model is fit to the history of earlier
+    runs with the same signature.  Windows of this configuration that are already in the chunk cache are
+    kept and only the rest is planned.
+
+    Input:
+        config: The SimulationConfig of the run
+        inputs: Dictionary from costInputs
+
+    Output:
+        timeChunks: Sorted (chunkStart, chunkEnd) tuples in s
+    """
+
+    sources, keyframeTimes, timeSliceSeconds, costCoefficients = inputs["sources"], inputs["keyframeTimes"], inputs["timeSliceSeconds"], inputs["costCoefficients"]
+    planChunks = lambda a, b, n: costModel.planTimeChunks(a, b, n, sources, keyframeTimes, timeSliceSeconds, costCoefficients)
+    chunkCost = lambda a, b: costModel.estimateChunkTime(costModel.intervalFeatures(a, b, sources, keyframeTimes, timeSliceSeconds), costCoefficients) - costCoefficients["overhead"]
+    return chunkCache.planAroundCache(config.startTime, config.endTime, inputs["nChunks"], inputs["cachedWindows"], planChunks, chunkCost)
+
+def planRun(config, resume: bool = False, sweepJobs: int = 1) -> dict:
+    """
+    Function that plans the chunks of a run and writes their macros and manifest.
+
+    Input:
+        config: The SimulationConfig of the run
+        resume: Continue the run recorded in RUN_MANIFEST, only its unfinished chunks are returned
+        sweepJobs: Number of runs sharing the worker pool, each is cut into 1/N of the chunks
+
+    Output:
+        job: Dictionary with the "config", the "chunks" still to simulate, the "runManifest", the
+             "signature" and "cacheSignature" the results are recorded under and the "physicsTables"
+    """
+
+    createFolderIfNotExist(config.MACRO_FOLDER)
+    createFolderIfNotExist(config.ROOT_FOLDER)
+    createFolderIfNotExist(config.LOG_FOLDER)
+
+    #   CHUNK PLANNING
+    # When resuming, the chunks are taken from the run manifest instead.
+    inputs = costInputs(config, sweepJobs)
+    if resume and not os.path.exists(config.RUN_MANIFEST) and config.CHUNK_CACHE:                                     # A run killed on scratch leaves no manifest, its finished chunks are in the cache
+        print("No run manifest at {}, planning the run again, its finished chunks are restored from CHUNK_CACHE".format(config.RUN_MANIFEST))
+        resume = False
+    if resume:
+        runManifest = manifest.loadManifest(config.RUN_MANIFEST, inputs["runHash"])
+        timeChunks = [(entry["start"], entry["stop"]) for entry in runManifest["chunks"]]
+        print("Resuming {} chunks from {}".format(len(timeChunks), config.RUN_MANIFEST))
+    else:
+        timeChunks = planTimeWindows(config, inputs)
+        print("Planned {} chunks ({} cached) from {} history records (signature {}), cost model: {}".format(
+              len(timeChunks), len(inputs["cachedWindows"]), len(inputs["history"]), inputs["signature"], inputs["costCoefficients"]))
+    print("Time slice {:.6g} s ({})".format(inputs["timeSliceSeconds"], "chosen from the motion" if config.timeStep.strip() == timeSlicing.AUTO else "timeStep"))
+
+    #   MACROS
+    tables = physicsTables.prepareTables(config, macroCompiler.renderSetup(config))
+    macros = macroCompiler.compileMacros(config, timeChunks, inputs["timeSliceSeconds"], tables)
+
+    chunks = []
+    for i, (chunkStart, chunkEnd) in enumerate(timeChunks):
+        chunk = {"index": i, "start": chunkStart, "stop": chunkEnd, "macro": macros[i][0], "window": macros[i][1], "motion": macros[i][2], "rootFile": "{}{}_{}.root".format(config.ROOT_FOLDER, "mp", i)}
+        chunk["log"] = "{}chunk_{}.log".format(config.LOG_FOLDER, i)
+        chunk["stat"], chunk["summary"] = runReport.statFile(config, i), runReport.summaryFile(config, i)
+        chunk["seed"] = chunkCache.chunkSeed(config.runSeed, chunkStart, chunkEnd)
+        chunk.update(costModel.intervalFeatures(chunkStart, chunkEnd, inputs["sources"], inputs["keyframeTimes"], inputs["timeSliceSeconds"]))
+        chunk["estimatedTime"] = costModel.estimateChunkTime(chunk, inputs["costCoefficients"])
+        chunk["physicsTables"] = physicsTables.tableState(tables, i)
+        chunks.append(chunk)
+
+    if resume:
+        unfinished = manifest.unfinishedChunks(runManifest)
+        print("{} of {} chunks are unfinished: {}".format(len(unfinished), len(chunks), unfinished))
+        chunks = [chunks[index] for index in unfinished]
+    else:
+        runManifest = manifest.newManifest(config.RUN_MANIFEST, inputs["runHash"], chunks)
+
+    if config.CHUNK_CACHE:
+        chunks = chunkCache.restoreChunks(config.CHUNK_CACHE, config.RUN_MANIFEST, runManifest, chunks)               # Chunks simulated by an earlier run are linked from the cache
+
+    return {"config": config, "chunks": chunks, "runManifest": runManifest, "signature": inputs["signature"], "cacheSignature": inputs["cacheSignature"], "physicsTables": tables}
+
+def runJobs(jobs: list, statusFile: str = None) -> list:
+    """
+    Function that runs the chunks of planned runs on one pool of workers and merges every run into its
+    own output file and listmode file.
+
+    Input:
+        jobs: The job dictionaries from planRun, the governor settings of the first are used
+        statusFile: The file the run progress is written to
+
+    Output:
+        failed: The indices of the jobs whose output could not be written, their folders are kept
+    """
+
+    first = jobs[0]["config"]
+    coreGovernor = governor.Governor(first.GOVERNOR_CONFIG, first.cores)
+    workers = coreGovernor.maxWorkers
+
+    chunks = []
+    runningMerges = []
+    listmodeShards = []
+    for j, job in enumerate(jobs):
+        config = job["config"]
+        runningMerge = merge.RunningMerge(config.RUNNING_MERGE, config.RUN_MANIFEST, job["runManifest"]) if config.mergeRoot else None # Merges finished chunks in the background, in time order
+        shards = listmode.ListmodeShards(config, job["runManifest"]) if config.OUTPUT_NPY else None                  # Converts finished chunks to listmode in the background
+        for background in (runningMerge, shards):
+            if background is not None:
+                background.start()
+        runningMerges.append(runningMerge)
+        listmodeShards.append(shards)
+        for chunk in job["chunks"]:
+            name = chunk["index"] if len(jobs) == 1 else "{}.{}".format(j, chunk["index"])                            # Job and manifest index in the logs
+            chunks.append(dict(chunk, index = len(chunks), job = j, jobIndex = chunk["index"], name = name)) # Unique index across the jobs
+
+    def onChunkDone(result):
+        job = jobs[result["job"]]
+        config = job["config"]
+        manifest.recordResult(config.RUN_MANIFEST, job["runManifest"], dict(result, index = result["jobIndex"])) # Check the chunk and save the manifest
+        if config.CHUNK_CACHE and job["runManifest"]["chunks"][result["jobIndex"]]["status"] == "done":
+            chunkCache.storeChunk(config.CHUNK_CACHE, job["cacheSignature"], result)
+        for background in (runningMerges[result["job"]], listmodeShards[result["job"]]):
+            if background is not None:
+                background.notify()
+
+    if len(jobs) > 1:
+        print("Running {} chunks of {} jobs on up to {} workers".format(len(chunks), len(jobs), workers), flush = True)
+    progress = telemetry.ProgressBoard(sum(chunk["stop"] - chunk["start"] for chunk in chunks), statusFile) # Simulated time, throughput, ETA and slowest chunks
+    progress.start()
+    if first.persistentWorkers:                                                                                         # Queue the chunks and run them on as many GATE processes as the governor allows
+        results = scheduler.runPersistentChunks(chunks, workers, onResult = onChunkDone, governor = coreGovernor, board = progress)
+    else:
+        results = scheduler.runChunks(chunks, workers, runner = lambda chunk: scheduler.runGateMacro(chunk, progress, coreGovernor), onResult = onChunkDone, governor = coreGovernor)
+    progress.stop()
+    scheduler.reportChunkTimes(results, workers)                                                                          # Per chunk wall times, to spot slow chunks
+
+    failed = []
+    for j, job in enumerate(jobs):
+        config = job["config"]
+        if len(jobs) > 1:
+            print("\n###### JOB {}: {} ######".format(j, job.get("point", config.OUTPUT_ROOT_FILE_NAME)))
+        jobResults = [dict(result, index = result["jobIndex"], **{key: job["runManifest"]["chunks"][result["jobIndex"]].get(key) for key in manifest.OUTPUT_COUNTS})
+                      for result in results if result["job"] == j]
+        statistics = runReport.chunkStatistics(jobResults)                                                              # GATE statistics and summary of every chunk
+        report = runReport.buildReport(statistics, costModel.loadHistory(config.COST_HISTORY, job["signature"]))
+        runReport.printReport(report)
+        runReport.writeReport(os.path.splitext(config.OUTPUT_ROOT + config.OUTPUT_ROOT_FILE_NAME)[0] + "_report.json", report)
+        chunkNumbers = {chunk["index"]: chunk for chunk in statistics}
+        jobResults = [dict(result, **{name: chunkNumbers.get(result["index"], {}).get(name) for name in costModel.STATISTICS}) for result in jobResults]
+        costModel.recordHistory(config.COST_HISTORY, job["signature"], jobResults)                                      # So the next run with this config gets a better plan
+        physicsTables.publishTables(job["physicsTables"], jobResults)                                                   # The tables the first chunk stored, for the next runs
+        physicsTables.reportStartups(job["physicsTables"], jobResults)
+        outputFile = config.OUTPUT_ROOT + config.OUTPUT_ROOT_FILE_NAME
+        written = merge.finishRun(runningMerges[j], config.RUN_MANIFEST, job["runManifest"], outputFile, workers)      # Checks every chunk, completes the merge and moves it to the output folder
+        if written and config.mergeRoot:
+            print("Written {}".format(outputFile))
+        if written and listmodeShards[j] is not None:
+            written = listmodeShards[j].finish(listmode.listmodeFile(config))                                           # Writes the shards of the chunks into the listmode file, in time order
+            if written:
+                print("Written {}".format(listmode.listmodeFile(config)))
+        if written:
+            shutil.rmtree(config.MACRO_FOLDER)                                                                          # Removes the temporary folders
+            shutil.rmtree(config.ROOT_FOLDER)
+        else:
+            failed.append(j)
+    return failed
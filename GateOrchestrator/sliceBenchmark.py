@@ -0,0 +1,68 @@
+"""
+Benchmark of the automatic time slice (see timeSlicing.py).  The first seconds of a run are simulated
+twice, like a dry run pilot, once with the time slice chosen from the motion and once with a fixed
+baseline slice (the old 1 us by default), and the GATE wall times are compared.
+
+    python3 -m GateOrchestrator.sliceBenchmark [--config FILE] [--seconds 0.01] [--baseline "0.000001 s"] [--no-run]
+
+Run it from the repository folder, the macros read their data files from data/.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import numpy as np
+
+from GateOrchestrator import timeSlicing, dryRun, simulationRun
+from GateOrchestrator.config import SimulationConfig, loadConfig
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def benchmark(config, seconds: float, baseline: str) -> list:
+    """
+    Function that simulates the first seconds of a run with the automatic and with a fixed time slice and
+    prints the GATE wall times.
+
+    Input:
+        config: The SimulationConfig
+        seconds: The simulated time of each benchmark run in s
+        baseline: The fixed time slice to compare with, a GATE quantity
+
+    Output:
+        wallTimes: The GATE wall times in s of the automatic and of the baseline slice
+    """
+
+    wallTimes = []
+    for label, timeStep in (("auto", timeSlicing.AUTO), ("baseline", baseline)):
+        run = config.replace(timeStep = timeStep)
+        inputs = simulationRun.costInputs(run)
+        pilot = dryRun.runPilot(run, seconds, inputs)
+        wallTimes.append(pilot["wallTime"])
+        startup = "{:.1f} s".format(pilot["startupTime"]) if pilot.get("startupTime") is not None else "unknown"
+        print("{:8s}: slice {:.6g} s, {:.0f} slices, GATE wall time {:.1f} s (start up {})".format(
+              label, inputs["timeSliceSeconds"], np.ceil(seconds/inputs["timeSliceSeconds"]), pilot["wallTime"], startup), flush = True)
+    print("Speed up of the automatic slice: {:.2f}x".format(wallTimes[1]/wallTimes[0]))
+    return wallTimes
+
+def main():
+    parser = argparse.ArgumentParser(description = "Show the automatic time slice of a run and benchmark it against a fixed slice")
+    parser.add_argument("--config", metavar = "FILE", default = None, help = "The config file of the run, the defaults of GateOrchestrator/config.py otherwise")
+    parser.add_argument("--seconds", type = float, default = 0.01, help = "Simulated time of each benchmark run in s")
+    parser.add_argument("--baseline", default = "0.000001 s", help = "The fixed time slice to compare with")
+    parser.add_argument("--no-run", action = "store_true", help = "Only print the chosen time slice")
+    args = parser.parse_args()
+
+    config = loadConfig(args.config) if args.config else SimulationConfig()
+    config = config.replace(timeStep = timeSlicing.AUTO)
+    print("Automatic time slice: {:.6g} s for a motion tolerance of {}".format(timeSlicing.resolveTimeSlice(config), config.motionTolerance))
+    if not args.no_run:
+        benchmark(config, args.seconds, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Parameter sweeps that run many simulation configurations through one pool of GATE workers.  A sweep file
+(YAML or TOML) names the controls to change:
+
+    config: generalMotion.yaml                               # Optional config file every job starts from
+    output: "Tracer_{tracerSize}um_{sourceActivity1}.root"   # Optional, formatted with every control of the job
+    base:                                                    # Set in every job
+        endTime: 0.5
+    grid:                                                    # Every combination is a job
+        tracerSize: [100, 150, 200]
+        sourceActivity1: ["16483500 Bq", "32967000 Bq"]
+    jobs:                                                    # Or/and a list of jobs, crossed with the grid
+        - {genericMotionFileName1: "RW4_TS_1.00ms_SS_1.00mm.placements"}
+        - {genericMotionFileName1: "RW4_TS_2.00ms_SS_1.00mm.placements"}
+
+Every job is a SimulationConfig (the defaults, the config file, base and the job's values) with its own
+MACRO_FOLDER and ROOT_FOLDER (moved together to a SCRATCH folder if every job fits, see scratch.py),
+controls derived from others (e.g. the radii from tracerSize) follow.  The
+chunks of all the jobs are planned with simulationRun.planRun, queued on one scheduler and one governor, so
+the pool stays busy across the whole sweep, and every job is merged in the background into its own output
+file.  Jobs that share their setup macro (e.g. they only differ in endTime or runSeed) render it once.
+
+    python3 -m GateOrchestrator.sweep sweep.yaml [--resume] [--plan [--pilot SECONDS]]
+
+With --plan nothing is run, the dry run estimates (see dryRun.py) of every job and of the whole sweep are
+printed instead.
+
+Run it from the repository folder, the macros read their data files from data/.
+
+Required Packages: numpy
+Optional Packages: PyYAML (YAML sweep files), tomllib (TOML sweep files, Python 3.11+)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import argparse
+import itertools
+import os
+import re
+import shutil
+
+from GateOrchestrator import simulationRun, dryRun, scratch
+from GateOrchestrator.config import SimulationConfig, loadConfig, loadSettings
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def loadSweep(path: str) -> dict:
+    """
+    Function that reads a sweep file.
+
+    Input:
+        path: The sweep file, *.yaml, *.yml or *.toml
+
+    Output:
+        sweep: The sweep dictionary
+    """
+
+    sweep = loadSettings(path)
+    if not any(key in sweep for key in ("grid", "jobs")):
+        raise ValueError("The sweep file {} has neither a grid nor jobs".format(path))
+    return sweep
+
+def expandJobs(sweep: dict) -> list:
+    """
+    Function that expands the sweep into one set of control values per job.
+
+    Input:
+        sweep: The sweep dictionary
+
+    Output:
+        jobs: List of (point, overrides) tuples, point holds the controls that vary between jobs and
+              overrides every control to set (base, job and grid values)
+    """
+
+    grid = sweep.get("grid", {})
+    names = list(grid)
+    for name in names:
+        if not isinstance(grid[name], list):
+            grid[name] = [grid[name]]
+
+    jobs = []
+    for listed in sweep.get("jobs", [{}]):
+        for values in itertools.product(*(grid[name] for name in names)):
+            point = dict(listed)
+            point.update(zip(names, values))
+            overrides = dict(sweep.get("base", {}))
+            overrides.update(point)
+            jobs.append((point, overrides))
+    return jobs
+
+def outputName(sweep: dict, point: dict, controls: dict) -> str:
+    """
+    Function that names the output file of a job.
+
+    Input:
+        sweep: The sweep dictionary, its "output" entry is a format string of the controls
+        point: The controls that vary between jobs
+        controls: Every control of the job (the config file, base and the job's values), output is
+                  formatted with them and OUTPUT_ROOT_FILE_NAME is the name the jobs start from
+
+    Output:
+        name: The output file name
+    """
+
+    if "output" in sweep:
+        try:
+            return sweep["output"].format(**controls)
+        except KeyError as error:
+            raise ValueError("The sweep output '{}' names {{{}}}, which is not a control".format(sweep["output"], error.args[0]))
+        except IndexError:
+            raise ValueError("The sweep output '{}' has a field without a control name, use e.g. {{tracerSize}}".format(sweep["output"]))
+    parts = ["{}-{}".format(name, re.sub(r"[^\w.+-]", "", str(value))) for name, value in point.items()]
+    return "_".join([os.path.splitext(controls["OUTPUT_ROOT_FILE_NAME"])[0]] + parts) + ".root"
+
+def jobConfigs(sweep: dict, sweepName: str) -> list:
+    """
+    Function that builds the config of every job of a sweep.
+
+    Input:
+        sweep: The sweep dictionary
+        sweepName: The name of the sweep, the job folders are named after it
+
+    Output:
+        configs: List of (point, config) tuples
+    """
+
+    base = loadConfig(sweep["config"]) if "config" in sweep else SimulationConfig()
+    base = base.replace(**sweep.get("base", {}))
+    outputNames = set()
+    configs = []
+    for j, (point, overrides) in enumerate(expandJobs(sweep)):
+        config = base.replace(**overrides)
+        if "OUTPUT_ROOT_FILE_NAME" not in overrides:
+            config = config.replace(OUTPUT_ROOT_FILE_NAME = outputName(sweep, point, config.controls()))
+        if config.OUTPUT_ROOT_FILE_NAME in outputNames:
+            raise ValueError("Two jobs of the sweep write {}, add the varying controls to output".format(config.OUTPUT_ROOT_FILE_NAME))
+        outputNames.add(config.OUTPUT_ROOT_FILE_NAME)
+        configs.append((point, config.replace(MACRO_FOLDER = "{}{}_{}/".format(base.MACRO_FOLDER, sweepName, j), ROOT_FOLDER = "{}{}_{}/".format(base.ROOT_FOLDER, sweepName, j))))
+    return configs
+
+def prepareJobs(sweepPath: str, resume: bool = False) -> tuple:
+    """
+    Function that plans the chunks and writes the macros of every job of a sweep.
+
+    Input:
+        sweepPath: The sweep file
+        resume: Only prepare the chunks that failed or never finished in an earlier run of the sweep
+
+    Output:
+        jobs: The job dictionaries from simulationRun.planRun, with the job's "point" added
+        sweepFolder: The folder the sweep progress is kept in
+        space: The scratch.ScratchSpace of the jobs, clean it up once they have run
+    """
+
+    sweep = loadSweep(sweepPath)
+    sweepName = os.path.splitext(os.path.basename(sweepPath))[0]
+    configs = jobConfigs(sweep, sweepName)
+    sweepFolder = "{}/{}/".format(os.path.dirname(os.path.normpath(configs[0][1].ROOT_FOLDER)), sweepName) # Next to the job folders
+    if not os.path.exists(sweepFolder):
+        os.makedirs(sweepFolder)
+
+    pending = []
+    for j, (point, config) in enumerate(configs):
+        if resume and os.path.exists(config.OUTPUT_ROOT + config.OUTPUT_ROOT_FILE_NAME) and not os.path.exists(config.ROOT_FOLDER):
+            print("Job {}/{} is already done: {}".format(j + 1, len(configs), point))
+        else:
+            pending.append((j, point, config))
+
+    jobs = []
+    space = scratch.ScratchSpace([config for j, point, config in pending], resume, len(configs)) # Every job on the same scratch disk, if they all fit
+    try:
+        for (j, point, config), placed in zip(pending, space.start()):
+            print("Preparing job {}/{}: {}".format(j + 1, len(configs), point), flush = True)
+            job = simulationRun.planRun(placed, resume, len(configs))
+            job["point"] = point
+            jobs.append(job)
+    except BaseException:
+        space.cleanUp()
+        raise
+    return jobs, sweepFolder, space
+
+def planSweep(sweepPath: str, pilotTime: float = None) -> list:
+    """
+    Function that prints the dry run plan of every job of a sweep and of the whole sweep.
+
+    Input:
+        sweepPath: The sweep file
+        pilotTime: Simulated time in s of a pilot run per job, None to use the history
+
+    Output:
+        problems: The problems found in any of the plans
+    """
+
+    sweep = loadSweep(sweepPath)
+    configs = jobConfigs(sweep, os.path.splitext(os.path.basename(sweepPath))[0])
+    plans = []
+    for j, (point, config) in enumerate(configs):
+        print("\n###### JOB {}: {} ######".format(j, point))
+        plans.append(dryRun.planReport(config, len(configs), pilotTime))
+
+    workers = plans[0]["workers"]
+    workerTime = sum(plan["workerTime"] for plan in plans)
+    print("\n###### SWEEP PLAN ######")
+    print("{} jobs, {} chunks, {} of output".format(len(plans), sum(plan["chunks"] for plan in plans), dryRun.formatBytes(sum(plan["mergedBytes"] for plan in plans))))
+    print("Scratch peak if every job runs at once: {}".format(dryRun.formatBytes(sum(plan["scratchPeak"] for plan in plans))))
+    print("Estimated wall time: {} ({} of worker time on up to {} workers)".format(dryRun.formatDuration(workerTime/workers), dryRun.formatDuration(workerTime), workers))
+    return [problem for plan in plans for problem in plan["problems"]]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Run a sweep of simulation configurations through one pool of GATE workers")
+    parser.add_argument("sweep", help = "The sweep file (.yaml or .toml)")
+    parser.add_argument("--resume", action = "store_true", help = "Only rerun the chunks of each job that failed or never finished")
+    parser.add_argument("--plan", action = "store_true", help = "Dry run, only print the expected counts, output size, scratch disk peak and wall time of every job")
+    parser.add_argument("--pilot", type = float, metavar = "SECONDS", default = None, help = "With --plan, simulate this much of every job first to calibrate the estimates")
+    args = parser.parse_args()
+
+    if args.plan:
+        raise SystemExit(1 if planSweep(args.sweep, args.pilot) else 0)
+
+    jobs, sweepFolder, space = prepareJobs(args.sweep, args.resume)
+    try:
+        failed = [jobs[j]["point"] for j in simulationRun.runJobs(jobs, sweepFolder + "progress.txt")] if jobs else []
+    finally:
+        space.cleanUp()
+    if failed:
+        print("{} of {} jobs failed: {}".format(len(failed), len(jobs), failed))
+        print("Rerun with --resume to simulate only their failed chunks")
+        raise SystemExit(1)
+    shutil.rmtree(sweepFolder)
+    print("All {} jobs of the sweep are done".format(len(jobs)))
+
+if __name__ == "__main__":
+    main()
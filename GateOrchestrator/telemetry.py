@@ -0,0 +1,195 @@
+"""
+Live logs and progress telemetry for the GATE workers.  The output of every GATE process is streamed line
+by line into its own rotating log file instead of being held in memory until the process exits.  GATE
+prints a "Slice N from A to B s" line at the start of every time slice, which gives the simulated time each
+worker has reached.  ProgressBoard collects these and periodically prints (and writes to a file) the overall
+progress, the throughput in simulated seconds per wall second, the ETA and the slowest running chunks.
+
+Required Packages: None (standard library)
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+import re
+import threading
+import time
+
+#######################
+###### CONSTANTS ######
+#######################
+
+LOG_MAX_BYTES = 5000000 # Size at which a chunk log is rotated
+LOG_BACKUPS = 1 # How many rotated logs are kept per chunk
+SLICE_PATTERN = re.compile(r"^Slice \d+ from (\S+) to (\S+) s")
+
+#####################
+###### CLASSES ######
+#####################
+
+class RotatingLog:
+    """
+    Log file that is rotated to path.1, path.2, ... once it grows beyond maxBytes.
+
+    Input:
+        path: The log file
+        maxBytes: Size at which the log is rotated
+        backups: How many rotated logs are kept
+    """
+
+    def __init__(self, path: str, maxBytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.backups = backups
+        self.file = open(path, "w")
+        self.size = 0
+
+    def write(self, line: str) -> None:
+        if self.size + len(line) > self.maxBytes:
+            self.rotate()
+        self.file.write(line)
+        self.size += len(line)
+
+    def rotate(self) -> None:
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists("{}.{}".format(self.path, i)):
+                os.replace("{}.{}".format(self.path, i), "{}.{}".format(self.path, i + 1))
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        self.file = open(self.path, "w")
+        self.size = 0
+
+    def close(self) -> None:
+        self.file.close()
+
+class ProgressBoard:
+    """
+    Thread-safe record of how far every chunk has got, with a monitor thread that publishes a summary.
+
+    Input:
+        totalTime: The simulated time of all the chunks that will run, in s
+        statusFile: File the latest summary is written to, None to only print it
+        interval: Seconds between summaries
+    """
+
+    def __init__(self, totalTime: float, statusFile: str = None, interval: float = 60.0):
+        self.totalTime = totalTime
+        self.statusFile = statusFile
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.running = {} # index: {"name", "start", "stop", "simTime", "launched"}
+        self.doneTime = 0.0
+        self.doneChunks = 0
+        self.runStart = time.time()
+        self.stopEvent = threading.Event()
+        self.thread = threading.Thread(target = self.monitor, daemon = True)
+
+    def started(self, chunk: dict) -> None:
+        with self.lock:
+            self.running[chunk["index"]] = {"name": chunkName(chunk), "start": chunk["start"], "stop": chunk["stop"], "simTime": chunk["start"], "launched": time.time()}
+
+    def update(self, index: int, simTime: float) -> None:
+        with self.lock:
+            if index in self.running:
+                self.running[index]["simTime"] = max(simTime, self.running[index]["start"]) # The first time slice can start before the window
+
+    def finished(self, index: int) -> None:
+        with self.lock:
+            chunk = self.running.pop(index, None)
+            if chunk is not None:
+                self.doneTime += chunk["stop"] - chunk["start"]
+                self.doneChunks += 1
+
+    def summary(self) -> str:
+        """
+        Returns the progress, throughput, ETA and slowest running chunks as text.
+        """
+
+        now = time.time()
+        with self.lock:
+            running = {index: dict(chunk) for index, chunk in self.running.items()}
+            simulated = self.doneTime + sum(chunk["simTime"] - chunk["start"] for chunk in running.values())
+            doneChunks = self.doneChunks
+
+        wall = now - self.runStart
+        rate = simulated/wall if wall > 0 else 0.0
+        eta = (self.totalTime - simulated)/rate if rate > 0 else float("inf")
+        lines = ["{}  {:.6f} / {:.6f} s simulated ({:.1f} %), {} chunks finished, {} running".format(
+                     time.strftime("%H:%M:%S"), simulated, self.totalTime, 100.0*simulated/self.totalTime if self.totalTime > 0 else 100.0, doneChunks, len(running)),
+                 "Throughput {:.3g} simulated s per wall s, ETA {}".format(rate, "unknown" if eta == float("inf") else "{:.0f} s".format(eta))]
+
+        def remaining(item):
+            chunk = item[1]
+            progress = chunk["simTime"] - chunk["start"]
+            elapsed = now - chunk["launched"]
+            return float("inf") if progress <= 0 else (chunk["stop"] - chunk["simTime"])*elapsed/progress
+
+        slowest = sorted(running.items(), key = remaining, reverse = True)[:3]
+        for index, chunk in slowest:
+            lines.append("  slow chunk {}: {:.1f} % after {:.0f} s".format(chunk["name"], 100.0*(chunk["simTime"] - chunk["start"])/(chunk["stop"] - chunk["start"]), now - chunk["launched"]))
+        return "\n".join(lines)
+
+    def publish(self) -> None:
+        text = self.summary()
+        print("###### PROGRESS ######\n" + text, flush = True)
+        if self.statusFile is not None:
+            with open(self.statusFile + ".tmp", "w") as f:
+                f.write(text + "\n")
+            os.replace(self.statusFile + ".tmp", self.statusFile)
+
+    def monitor(self) -> None:
+        while not self.stopEvent.wait(self.interval):
+            self.publish()
+
+    def start(self) -> None:
+        self.runStart = time.time()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopEvent.set()
+        self.thread.join()
+        self.publish()
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def chunkName(chunk: dict):
+    return chunk.get("name", chunk["index"]) # The manifest index of the chunk (with its job in a sweep), the scheduler index otherwise
+
+def parseSliceTime(line: str):
+    """
+    Function that reads the simulated time from a GATE "Slice N from A to B s" line.
+
+    Input:
+        line: A line of GATE output
+
+    Output:
+        simTime: The start of the slice in s, None if the line is not a slice line
+    """
+
+    match = SLICE_PATTERN.match(line)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+def processCpuTime(pid: int):
+    """
+    Function that reads the CPU time (user and system) a process has used so far from /proc.
+
+    Input:
+        pid: The process id
+
+    Output:
+        cpuTime: The CPU time in s, None if it can't be read (e.g. the process has exited)
+    """
+
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            fields = f.read().rsplit(")", 1)[1].split() # The command name can hold spaces, the fields after it can't
+        return (int(fields[11]) + int(fields[12]))/os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
@@ -0,0 +1,185 @@
+"""
+Motion aware time slicing.  GATE moves the phantoms once per time slice (/gate/application/setTimeSlice)
+and keeps them still in between, so the slice sets how closely the simulated tracer follows its path.  A
+fixed 1 us slice is far finer than most runs need: a stationary tracer needs no geometry updates at all
+and a random walk with 1 ms keyframes only changes position every 1 ms.  With timeStep = "auto" the slice
+is chosen from the motion of the phantoms:
+
+    nothing moves           STATIC_SLICE, which doesn't depend on the acquisition so a longer run of the same
+                            configuration renders the same chunk macros and reuses the cached chunks
+    linear, orbiting,       the slice in which the fastest point of the phantom moves motionTolerance,
+    oscillating moves       speed = |v| + angular speed*(axis distance + radius) + 2 pi f |A|
+    generic move            the keyframe spacing of the placements file (GATE uses the nearest keyframe,
+                            so a finer slice repeats positions), or longer while the path moves less
+                            than motionTolerance in a slice
+
+The shortest slice of any moving phantom is used, at most STATIC_SLICE.  A GATE quantity such as "0.000001 s" sets a fixed slice.
+
+The time slices of a run are laid out once over the whole acquisition and every chunk simulates its window
+of them with /gate/application/startDAQCluster, which cuts the slices at the window edges.  So the slices
+don't depend on the chunking and a persistent worker keeps the same slices for all its windows (with
+setTimeStart/Stop per window GATE would keep the slices of its first window).
+
+sliceBenchmark.py compares the GATE wall time of the chosen slice with a fixed one.
+
+Required Packages: numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import io
+import numpy as np
+
+from GateOrchestrator import costModel, placements
+
+#######################
+###### CONSTANTS ######
+#######################
+
+AUTO = "auto"
+ANGLE_UNITS = {"deg": np.pi/180.0, "rad": 1.0, "mrad": 1e-3}
+FREQUENCY_UNITS = {"Hz": 1.0, "kHz": 1e3, "mHz": 1e-3}
+STATIC_SLICE = 1.0 # s, the slice when nothing moves (or moves slower), a Geant4 run per second of acquisition costs next to nothing
+SLICE_DIGITS = 4 # Significant digits of a slice, so keyframes every 1 ms (stored as float32) give a 1 ms slice and not 0.999987 ms
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def parseVector(text: str) -> np.ndarray:
+    """
+    Function that converts a GATE style vector, e.g. "400.0 400.0 85.0 mm/s" or "0.0 0.0 1.0 mm", to a
+    numpy array in mm (per s).
+    """
+
+    parts = text.split()
+    unit = parts[-1].split("/")[0]
+    return np.array([float(part) for part in parts[:-1]])*costModel.UNITS[unit]
+
+def parseRate(text: str, units: dict) -> float:
+    """
+    Function that converts a GATE style rate, e.g. "382.3 deg/s" or "1.06 Hz", to base units (rad/s, Hz).
+    """
+
+    parts = text.split()
+    return float(parts[0])*units[parts[-1].split("/")[0]]
+
+def phantomExtent(config, phantom: int) -> tuple:
+    """
+    Function that finds where a phantom is placed and how far its volume reaches from that point.
+
+    Input:
+        config: The SimulationConfig
+        phantom: The phantom number, 1 or 2
+
+    Output:
+        translation: The placement of the phantom in mm
+        radius: The largest distance of a point of the phantom from its placement in mm
+    """
+
+    if phantom == 1 and config.nrwPhantomShell1:
+        return parseVector(config.nrwPhantomShell1Translation), costModel.parseQuantity(config.nrwPhantomShell1FullRmax)
+    if phantom == 1 and config.nrwPhantom1:
+        return parseVector(config.nrwPhantomTranslation1), costModel.parseQuantity(config.nrwPhantomRadiusMax1)
+    if phantom == 1 and config.cylinderPhantom1:
+        return parseVector(config.cylinderPhantomTranslation1), float(np.hypot(costModel.parseQuantity(config.cylinderPhantomRadiusMax1), costModel.parseQuantity(config.cylinderPhantomHeight1)/2))
+    if phantom == 2 and config.nrwPhantom2:
+        return parseVector(config.nrwPhantomTranslation2), costModel.parseQuantity(config.nrwPhantomRadiusMax2)
+    if phantom == 2 and config.cylinderPhantom2:
+        return parseVector(config.cylinderPhantomTranslation2), float(np.hypot(costModel.parseQuantity(config.cylinderPhantomRadiusMax2), costModel.parseQuantity(config.cylinderPhantomHeight2)/2))
+    return np.zeros(3), 0.0
+
+def analyticSpeed(config, phantom: int) -> float:
+    """
+    Function that bounds the speed of the fastest point of a phantom under its linear, orbiting and
+    oscillating moves.
+
+    Input:
+        config: The SimulationConfig
+        phantom: The phantom number, 1 or 2
+
+    Output:
+        speed: The largest speed in mm/s, 0 if the phantom has none of these moves
+    """
+
+    controls = config.controls()
+    speed = 0.0
+    if controls["linearMotion{}".format(phantom)]:
+        speed += float(np.linalg.norm(parseVector(controls["linearMotionSpeed{}".format(phantom)])))
+    if controls["orbitingMotion{}".format(phantom)]:
+        point1 = parseVector(controls["orbitingMotionSetPoint1{}".format(phantom)])
+        point2 = parseVector(controls["orbitingMotionSetPoint2{}".format(phantom)])
+        translation, radius = phantomExtent(config, phantom)
+        axis = (point2 - point1)/np.linalg.norm(point2 - point1)
+        axisDistance = float(np.linalg.norm(np.cross(translation - point1, axis)))
+        speed += abs(parseRate(controls["orbitingMotionSpeed{}".format(phantom)], ANGLE_UNITS))*(axisDistance + radius)
+    if controls["oscilatingMotion{}".format(phantom)]:
+        amplitude = float(np.linalg.norm(parseVector(controls["oscilatingMotionAmplitude{}".format(phantom)])))
+        speed += 2*np.pi*parseRate(controls["oscilatingMotionFrequency{}".format(phantom)], FREQUENCY_UNITS)*amplitude
+    return speed
+
+def keyframeSlice(path: str, startTime: float, endTime: float, tolerance: float):
+    """
+    Function that chooses the time slice for a generic move from its placements file.
+
+    Input:
+        path: The placements file
+        startTime, endTime: The acquisition in s, only the keyframes it uses are looked at
+        tolerance: The positional error allowed within a slice in mm
+
+    Output:
+        timeSlice: The slice in s, None if the phantom doesn't move during the acquisition
+    """
+
+    data, header, spans, times = placements.readPlacements(path)
+    first, last = placements.sliceRange(times, startTime, endTime)
+    units = dict(line.split()[:2] for line in header.decode().splitlines() if line.strip())
+    if last - first < 2 or "Translation" not in units:                                       # Rotations alone are not followed
+        return None
+    lengthUnit = units["Translation"]
+    positions = np.loadtxt(io.BytesIO(data[spans[first][0]:spans[last - 1][1]]), ndmin = 2)[:, -3:]*costModel.UNITS[lengthUnit]
+    steps = np.diff(times[first:last])
+    distances = np.linalg.norm(np.diff(positions, axis = 0), axis = 1)
+    moving = (steps > 0) & (distances > 0)
+    if not moving.any():
+        return None
+    spacing = steps[steps > 0].min()
+    speed = (distances[moving]/steps[moving]).max()
+    return max(spacing, tolerance/speed)
+
+def motionTimeSlice(config) -> float:
+    """
+    Function that chooses the time slice of a run from the motion of its phantoms.
+
+    Input:
+        config: The SimulationConfig, its timeStep is "auto"
+
+    Output:
+        timeSlice: The slice in s, STATIC_SLICE if nothing moves
+    """
+
+    tolerance = costModel.parseQuantity(config.motionTolerance)
+    slices = [STATIC_SLICE] # Not the acquisition, the slice is in the cache key of every chunk (chunkCache.chunkKey)
+    motionFiles = placements.motionFiles(config)
+    for phantom in (1, 2):
+        if not getattr(config, "movePhantom{}".format(phantom)):
+            continue
+        speed = analyticSpeed(config, phantom)
+        if speed > 0:
+            slices.append(tolerance/speed)
+        if phantom in motionFiles:
+            timeSlice = keyframeSlice(motionFiles[phantom], config.startTime, config.endTime, tolerance)
+            if timeSlice is not None:
+                slices.append(timeSlice)
+    return float("{:.{}g}".format(min(slices), SLICE_DIGITS))
+
+def resolveTimeSlice(config) -> float:
+    """
+    Function that returns the time slice of a run in s, chosen from the motion if timeStep is "auto".
+    """
+
+    if config.timeStep.strip() == AUTO:
+        return motionTimeSlice(config)
+    return costModel.parseQuantity(config.timeStep)
@@ -0,0 +1,50 @@
+'''
+The following code converts the *.root ouput of the GATE simuation and extracts the pair of locations of gamma
+ray interactions in the crystals as well of the time of both of these interactions and writes them to *.npy
+files that contain the above information.  It does what listmode_ROOT2NPY_1ms.py, listmode_ROOT2NPY_raw.py and
+their batch versions do in one go: every file or folder of INPUT_PATHS is converted into every product of
+PRODUCTS, each into its own folder OUT_PATH/<product>/, and every branch is read once for all the products.
+A product is "raw" (the true interaction times), a time quantum the times are floored to ("1ms" as the HR++,
+"0.5ms", "250us", ...), optionally followed by @ and the face offset in mm ("1ms@-7.5", -5 otherwise).
+The files are converted on WORKERS processes at the same time (GateOrchestrator/listmode.py).  With COMPACT
+the files are written as compact listmode files (*.lmc, float32 positions and integer time ticks, half the
+size, GateOrchestrator/compactListmode.py) instead of *.npy.
+
+Author:            Rayhaan Perin
+Last Update:       14-08-2021
+Based On:          listmode_ROOT2CSV.py from G4PEPT
+Required Packages: uproot, numpy, GateOrchestrator (this repository)
+
+To install packages packages use pip3 install package or pip install package,
+alternatively if one uses conda you can run conda install package
+'''
+
+####################
+######PACKAGES######
+####################
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # The repository folder, for GateOrchestrator
+from GateOrchestrator import listmode
+
+##################
+######INPUTS######
+##################
+
+INPUT_PATHS = ["/home/rayhaan/REPO_HR++/GATE_HR/Output/"] # ROOT files, or folders of ROOT files
+PRODUCTS = ["1ms", "raw"]
+OUT_PATH = "/home/rayhaan/REPO_HR++/GATE_HR/NPYOutput/"
+STEP_SIZE = "30 MB" # Coincidences read at a time, the memory needed is a few times this per product
+WORKERS = os.cpu_count() # Files converted at the same time, big files are also cut into parts converted at the same time
+COMPACT = False # Write compact listmode files, load them with GateOrchestrator.compactListmode.loadListmode
+
+#####################
+######ROOT2NPY#######
+#####################
+
+if __name__ == "__main__": # The worker processes import this script, only the main process converts
+    products = [dict(listmode.parseProduct(text), compact = COMPACT) for text in PRODUCTS]
+    print("Converting {} into {} on {} processes: \n".format(", ".join(INPUT_PATHS), ", ".join(PRODUCTS), WORKERS))
+    listmode.convertInputs(INPUT_PATHS, products, OUT_PATH, stepSize = STEP_SIZE, workers = WORKERS)
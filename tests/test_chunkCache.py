@@ -0,0 +1,72 @@
+"""
+Tests of the chunk cache key.  The key of a chunk must not change with the folders of a run, so another run
+of the same configuration finds it, and must change with everything that changes the output: the seed, the
+time window and the content of the data files the macros read.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+from GateOrchestrator import chunkCache, simulationRun
+from GateOrchestrator.config import SimulationConfig
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def runKeys(folder, name: str, **controls) -> dict:
+    """
+    Function that plans a stationary run of 1 s whose macros and outputs go into folder/name and returns
+    the cache key of every chunk by its window.
+    """
+
+    config = SimulationConfig(MACRO_FOLDER = str(folder/name/"macros") + "/", ROOT_FOLDER = str(folder/name/"root") + "/", SCRATCH = None,
+                              OUTPUT_ROOT = str(folder/"Output") + "/", COST_HISTORY = str(folder/"chunkHistory.jsonl"), CHUNK_CACHE = None,
+                              PHYSICS_TABLES = None, GOVERNOR_CONFIG = str(folder/"governor.cfg"), cores = 2, endTime = 1.0).replace(**controls)
+    return {(chunk["start"], chunk["stop"]): chunkCache.chunkKey(chunk) for chunk in simulationRun.planRun(config)["chunks"]}
+
+def writeMacros(folder, data: str, extra: str = "") -> dict:
+    """
+    Function that writes a chunk macro executing a setup that reads the data file folder/data.placements.
+    """
+
+    folder.mkdir(exist_ok = True)
+    with open(str(folder/"data.placements"), "w") as f:
+        f.write(data)
+    with open(str(folder/"setup.mac"), "w") as f:
+        f.write("/gate/phantom1/placement/setPlacementsFilename {}\n{}".format(folder/"data.placements", extra))
+    with open(str(folder/"chunk.mac"), "w") as f:
+        f.write("/gate/random/setEngineSeed 12345\n/control/execute {}\n".format(folder/"setup.mac"))
+    return {"macro": str(folder/"chunk.mac")}
+
+##################
+###### TESTS #####
+##################
+
+def test_keyIgnoresRunFolders(tmp_path):
+    first = runKeys(tmp_path, "first")
+    assert len(set(first.values())) == len(first)                                                                   # Every window has its own key
+    assert runKeys(tmp_path, "second") == first
+
+def test_keyChangesWithSeed(tmp_path):
+    first = runKeys(tmp_path, "first")
+    repeat = runKeys(tmp_path, "repeat", runSeed = 2)
+    assert repeat.keys() == first.keys()
+    assert not set(repeat.values()) & set(first.values())
+
+def test_keyChangesWithWindow(tmp_path):
+    first = runKeys(tmp_path, "first")
+    shifted = runKeys(tmp_path, "shifted", startTime = 0.25, endTime = 1.25)
+    assert len(shifted) == len(first) and not shifted.keys() & first.keys()
+    assert not set(shifted.values()) & set(first.values())
+
+def test_keyFollowsDataFiles(tmp_path):
+    key = chunkCache.chunkKey(writeMacros(tmp_path/"first", "Time s\n0 0 0 0 0 0 0 0\n"))
+    assert chunkCache.chunkKey(writeMacros(tmp_path/"moved", "Time s\n0 0 0 0 0 0 0 0\n")) == key                   # Same content in another folder
+    assert chunkCache.chunkKey(writeMacros(tmp_path/"marked", "Time s\n0 0 0 0 0 0 0 0\n", "# note\n/control/echo window\n")) == key    # Comments and markers
+    assert chunkCache.chunkKey(writeMacros(tmp_path/"changed", "Time s\n0 0 0 0 0 0 0 1.5\n")) != key
@@ -0,0 +1,70 @@
+"""
+Tests of the typed simulation config: every control is checked against its type and choices, controls
+that can't go together are refused and a config file with a bad control names the file.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import dataclasses
+import json
+
+import pytest
+
+from GateOrchestrator.config import SimulationConfig, loadConfig
+
+##################
+###### TESTS #####
+##################
+
+def test_mergeRootNeedsListmode():
+    with pytest.raises(TypeError, match = "mergeRoot"):
+        SimulationConfig(mergeRoot = False)
+    assert not SimulationConfig(mergeRoot = False, OUTPUT_NPY = "NPYOutput/").mergeRoot
+
+@pytest.mark.parametrize("controls", [
+    {"tracerSize": "150"},         # A number as a string
+    {"tracerSize": True},          # A bool is no int
+    {"cores": 2.0},
+    {"sourceActivity1": 32967000}, # GATE expects a quantity string
+    {"persistentWorkers": "yes"},
+    {"geometryTier": "medium"},    # Not one of the choices
+    {"physicsPreset": "fastest"},
+])
+def test_wrongValuesRefused(controls):
+    with pytest.raises(TypeError):
+        SimulationConfig(**controls)
+
+def test_valuesConverted():
+    config = SimulationConfig(endTime = 2, cores = None, OUTPUT_NPY = None)
+    assert isinstance(config.endTime, float) and config.endTime == 2.0
+    assert config.cores is None
+
+def test_replace():
+    config = SimulationConfig()
+    changed = config.replace(tracerSize = 200, endTime = 0.5)
+    assert (changed.tracerSize, changed.endTime) == (200, 0.5)
+    assert changed.nrwPhantomRadiusMax1 == "200 um" and config.nrwPhantomRadiusMax1 == "150 um" # Derived controls follow
+    with pytest.raises(KeyError, match = "tracerSise"):
+        config.replace(tracerSise = 200)
+    with pytest.raises(TypeError):
+        config.replace(endTime = "1 s")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        config.endTime = 2.0
+
+def test_loadConfig(tmp_path):
+    path = str(tmp_path/"tracer200.json")
+    with open(path, "w") as f:
+        json.dump({"tracerSize": 200, "sourceActivity1": "16483500 Bq"}, f)
+    config = loadConfig(path, SimulationConfig(endTime = 0.5))
+    assert (config.tracerSize, config.sourceActivity1, config.endTime) == (200, "16483500 Bq", 0.5)
+
+    with open(path, "w") as f:
+        json.dump({"tracerSise": 200}, f)
+    with pytest.raises(ValueError, match = "tracer200.json"):
+        loadConfig(path)
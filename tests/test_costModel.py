@@ -0,0 +1,68 @@
+"""
+Tests of the cost model: the equal cost chunk planning, the fit to the chunk history and the
+configuration signature the history is kept under.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import numpy as np
+import pytest
+
+from GateOrchestrator import costModel
+from GateOrchestrator.config import SimulationConfig
+
+##################
+###### TESTS #####
+##################
+
+def test_planTimeChunksCoversWindow():
+    chunks = costModel.planTimeChunks(0.5, 3.5, 7, [(3.7e7, 4062.6)], np.array([]), 1e-6, costModel.PRIOR_COEFFICIENTS)
+    assert len(chunks) == 7
+    assert chunks[0][0] == 0.5 and chunks[-1][1] == 3.5
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    assert all(start < stop for start, stop in chunks)
+
+def test_planTimeChunksSingleChunk():
+    assert costModel.planTimeChunks(0.0, 1.0, 1, [(3.7e7, 4062.6)], np.array([]), 1e-6, costModel.PRIOR_COEFFICIENTS) == [(0.0, 1.0)]
+
+def test_planTimeChunksBalancesCost():
+    decaying = costModel.planTimeChunks(0.0, 3600.0, 4, [(3.7e7, 600.0)], np.array([]), 1e-6, dict(costModel.PRIOR_COEFFICIENTS, perSlice = 0.0))
+    widths = [stop - start for start, stop in decaying]
+    assert widths == sorted(widths)                                                                                 # Fewer decays later, longer chunks
+    keyframes = np.linspace(0.0, 0.1, 100000)
+    crowded = costModel.planTimeChunks(0.0, 1.0, 2, [], keyframes, 1e-6, dict(costModel.PRIOR_COEFFICIENTS, perDecay = 0.0, perSlice = 0.0))
+    assert crowded[0][1] < 0.1                                                                                      # The keyframes are the whole cost
+
+@pytest.mark.parametrize("startTime, endTime, nChunks", [(0.0, 1.0, 0), (1.0, 1.0, 2), (2.0, 1.0, 2)])
+def test_planTimeChunksRejects(startTime, endTime, nChunks):
+    with pytest.raises(ValueError):
+        costModel.planTimeChunks(startTime, endTime, nChunks, [], np.array([]), 1e-6, costModel.PRIOR_COEFFICIENTS)
+
+def test_fitSeparatesFirstWindows(tmp_path):
+    rng = np.random.default_rng(3)
+    results = []
+    for i in range(40):
+        firstWindow = i % 4 == 0                                                                                    # A persistent worker starts its process for every fourth window
+        decays, slices = rng.uniform(1e5, 1e6), rng.uniform(1e4, 1e5)
+        results.append({"returnCode": 0, "start": 0.0, "stop": 0.1, "firstWindow": firstWindow, "decays": decays, "keyframes": 0, "slices": slices,
+                        "wallTime": 20.0*firstWindow + 1e-4*decays + 2e-5*slices})
+    history = str(tmp_path/"chunkHistory.jsonl")
+    costModel.recordHistory(history, "signature", results)
+    records = costModel.loadHistory(history, "signature")
+    assert [record["firstWindow"] for record in records] == [result["firstWindow"] for result in results]
+    coefficients = costModel.fitCostModel(records)
+    assert coefficients["overhead"] == pytest.approx(20.0, rel = 0.05)
+    assert coefficients["perDecay"] == pytest.approx(1e-4, rel = 0.05)
+
+def test_signatureIgnoresPaths():
+    config = SimulationConfig()
+    signature = costModel.configSignature(config.controls())
+    for name in ("MACRO_FOLDER", "ROOT_FOLDER", "OUTPUT_ROOT", "COST_HISTORY", "CHUNK_CACHE", "PHYSICS_TABLES", "GOVERNOR_CONFIG"):
+        assert costModel.configSignature(config.replace(**{name: "/elsewhere/"}).controls()) == signature, name
+    assert costModel.configSignature(config.replace(tracerSize = config.tracerSize + 10).controls()) != signature
@@ -0,0 +1,145 @@
+"""
+Tests of the listmode conversion and the compact listmode files.
+The listmode files are checked byte for byte against what listmode_ROOT2NPY_1ms.py and _raw.py write for
+the same coincidences, np.save of the transposed column array, on small synthetic GATE ROOT files.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import io
+import os
+
+import numpy as np
+import pytest
+
+uproot = pytest.importorskip("uproot")
+
+from GateOrchestrator import compactListmode, listmode
+
+#######################
+###### CONSTANTS ######
+#######################
+
+ENTRIES = (0, 1, 2, 5003) # Coincidences of the synthetic files, the empty and one row files have their own NPY layout
+STEP_SIZE = 1000 # Entries per step, so the big file is converted in several steps
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def writeRootFile(path: str, entries: int, seed: int = 0) -> str:
+    """
+    Function that writes a GATE like ROOT file with a Coincidences tree of random coincidences, float32
+    positions in mm and sorted float64 times in s.
+    """
+
+    rng = np.random.default_rng(seed)
+    branches = {leaf: rng.normal(0, 400, entries).astype(np.float32) for leaf in listmode.LEAVES[:6]}
+    branches["time1"] = np.sort(rng.uniform(0.0, 2.5, entries))
+    branches["time2"] = branches["time1"] + rng.uniform(0.0, 5e-9, entries)
+    with uproot.recreate(path) as f:
+        if entries == 0:
+            f.mktree("Coincidences", {leaf: branches[leaf].dtype for leaf in listmode.LEAVES})
+        else:
+            f["Coincidences"] = branches
+    return path
+
+def moveToFace(x, y, distance):
+    x = x + distance*np.cos(np.arctan2(y, x))
+    y = y + distance*np.sin(np.arctan2(y, x))
+    return x, y
+
+def scriptBytes(rootFile: str, timeQuantum: float = 0.001, faceOffset: float = -5.0) -> bytes:
+    """
+    Function that returns the NPY file listmode_ROOT2NPY_1ms.py (listmode_ROOT2NPY_raw.py for None) writes.
+    """
+
+    tree = uproot.open(rootFile)["Coincidences"]
+    x1, y1, z1, x2, y2, z2, t1, t2 = (tree[leaf].array(library = "np") for leaf in listmode.LEAVES)
+    if timeQuantum is not None:
+        t2 = np.floor(t2/timeQuantum)*timeQuantum
+        t1 = np.floor(t1/timeQuantum)*timeQuantum
+    x1, y1 = moveToFace(x1, y1, faceOffset)
+    x2, y2 = moveToFace(x2, y2, faceOffset)
+    buffer = io.BytesIO()
+    np.save(buffer, np.array([x1, y1, z1, x2, y2, z2, t1, t2]).T)
+    return buffer.getvalue()
+
+def readBytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+##################
+###### TESTS #####
+##################
+
+@pytest.fixture(scope = "module")
+def rootFiles(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("root")
+    return {entries: writeRootFile(str(folder/"coincidences_{}.root".format(entries)), entries, entries) for entries in ENTRIES}
+
+@pytest.mark.parametrize("entries", ENTRIES)
+def test_convertFileMatchesScript(rootFiles, tmp_path, entries):
+    for timeQuantum in (0.001, None):
+        output = str(tmp_path/"listmode.npy")
+        rows = listmode.convertFile(rootFiles[entries], output, timeQuantum, stepSize = STEP_SIZE)
+        assert rows == entries
+        assert readBytes(output) == scriptBytes(rootFiles[entries], timeQuantum)
+        assert not os.path.exists(output + ".partial")
+
+def test_listmodeWriterMatchesNpySave(tmp_path):
+    rows = np.random.default_rng(1).normal(size = (1001, listmode.COLUMNS))
+    output = str(tmp_path/"written.npy")
+    with listmode.ListmodeWriter(output, len(rows)) as writer:
+        for start in (500, 0, 1000):                                                                                # Out of order, as ranges converted at the same time
+            writer.write(start, rows[start:start + 500])
+    buffer = io.BytesIO()
+    np.save(buffer, np.array(list(rows.T)).T)
+    assert readBytes(output) == buffer.getvalue()
+
+def test_convertFilesSplitsRangesAndProducts(rootFiles, tmp_path, monkeypatch):
+    monkeypatch.setattr(listmode, "MIN_PART_ENTRIES", 1500)                                                         # Cuts the big file into ranges
+    products = [listmode.parseProduct(text) for text in ("1ms", "raw", "0.5ms@-7.5")]
+    conversions = [(rootFiles[entries], [str(tmp_path/each["name"]/"{}.npy".format(entries)) for each in products]) for entries in ENTRIES]
+    for each in products:
+        os.makedirs(str(tmp_path/each["name"]))
+    rows = listmode.convertFiles(conversions, products, stepSize = STEP_SIZE, workers = 3)
+    for rootFile, outputFiles in conversions:
+        assert rows[rootFile] == uproot.open(rootFile)["Coincidences"].num_entries
+        for outputFile, each in zip(outputFiles, products):
+            assert readBytes(outputFile) == scriptBytes(rootFile, each["timeQuantum"], each["faceOffset"])
+
+@pytest.mark.parametrize("entries", ENTRIES)
+def test_compactRoundTrip(rootFiles, tmp_path, entries):
+    npyFile, compactFile, repacked = (str(tmp_path/name) for name in ("1ms.npy", "1ms.lmc", "repacked.npy"))
+    listmode.convertFile(rootFiles[entries], npyFile, 0.001, stepSize = STEP_SIZE)
+    listmode.convertFile(rootFiles[entries], compactFile, 0.001, stepSize = STEP_SIZE, compact = True)
+    lors = compactListmode.CompactListmode(compactFile)
+    assert len(lors) == entries
+    assert lors.header["source"]["sha256"] == compactListmode.sourceInfo(rootFiles[entries])["sha256"]
+    assert os.path.getsize(compactFile) == compactListmode.HEADER_BYTES + entries*compactListmode.rowBytes(0.001)
+    np.testing.assert_array_equal(compactListmode.loadListmode(compactFile), np.load(npyFile))
+    np.testing.assert_array_equal(lors.listmode(1, 3), np.load(npyFile)[1:3])
+    listmode.repackFile(compactFile, repacked)
+    assert readBytes(repacked) == readBytes(npyFile)
+
+def test_compactRawTimesRoundedToTick(rootFiles, tmp_path):
+    compactFile = str(tmp_path/"raw.lmc")
+    listmode.convertFile(rootFiles[5003], compactFile, None, stepSize = STEP_SIZE, compact = True)
+    rows = compactListmode.loadListmode(compactFile)
+    expected = np.load(io.BytesIO(scriptBytes(rootFiles[5003], None)))
+    np.testing.assert_array_equal(rows[:, :compactListmode.POSITIONS], expected[:, :compactListmode.POSITIONS])
+    assert np.abs(rows[:, compactListmode.POSITIONS:] - expected[:, compactListmode.POSITIONS:]).max() <= 0.5*compactListmode.RAW_TICK*1.001
+
+def test_repackRefusesOtherProduct(rootFiles, tmp_path):
+    npyFile = str(tmp_path/"raw.npy")
+    listmode.convertFile(rootFiles[5003], npyFile, None, stepSize = STEP_SIZE)
+    with pytest.raises(ValueError):
+        listmode.repackFile(npyFile, str(tmp_path/"raw.lmc"), 0.001)
+    assert not os.path.exists(str(tmp_path/"raw.lmc.partial"))
@@ -0,0 +1,72 @@
+"""
+Golden test of the macro compiler.  tests/data/StationaryExample_baseline.mac is the macro the original
+Siemens_ECAT_HR++_StationaryExample.py wrote for one core (timeStep "0.000001 s", ROOT_FOLDER "ROOT_FOLDER/").
+The compiled setup, chunk and window macros of the same controls, followed through /control/execute, have
+to give GATE the same commands; only the per chunk output files, the seed and the window start are new.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+import re
+
+from GateOrchestrator import chunkCache, macroCompiler
+from GateOrchestrator.config import SimulationConfig
+
+#######################
+###### CONSTANTS ######
+#######################
+
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "StationaryExample_baseline.mac")
+PER_CHUNK = re.compile(r"^(/control/echo|/gate/output/root/setFileName|/gate/output/summary/setFileName|/gate/actor/stat/save|/gate/random/setEngineSeed|/gate/application/startDAQ)") # Moved into the window macro of every chunk
+TIME_COMMANDS = ("/gate/application/setTimeSlice", "/gate/application/setTimeStart", "/gate/application/setTimeStop")
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def commands(path: str) -> list:
+    """
+    Function that lists the commands a macro gives GATE, without comments and following /control/execute.
+    Times are compared as numbers ("0.000001 s" and "1e-06 s" are the same slice).
+    """
+
+    lines = []
+    with open(path) as f:
+        for line in f:
+            command = line.split("#")[0].split()
+            if command[:1] == ["/control/execute"]:
+                lines.extend(commands(command[1]))
+            elif command:
+                if command[0] in TIME_COMMANDS:
+                    command[1] = repr(float(command[1]))
+                lines.append(" ".join(command))
+    return lines
+
+##################
+###### TESTS #####
+##################
+
+def test_compiledMacroMatchesBaseline(tmp_path):
+    config = SimulationConfig(MACRO_FOLDER = str(tmp_path) + "/", ROOT_FOLDER = "ROOT_FOLDER/", PHYSICS_TABLES = None, cores = 1, tracerSize = 150,
+                              sourceActivity1 = "32967000 Bq", nrwPhantomShell1Translation = "20.0 20.0 20.0 mm", timeStep = "0.000001 s")
+    macro, window, motion = macroCompiler.compileMacros(config, [(0.0, 1.0)], 1e-6)[0]
+    baseline, compiled = commands(BASELINE), commands(macro)
+    assert [line for line in compiled if not PER_CHUNK.match(line)] == [line for line in baseline if not PER_CHUNK.match(line)]
+    assert motion is None
+
+    assert commands(window) == [
+        "/control/echo GateOrchestrator window 0 start",
+        "/gate/output/root/setFileName ROOT_FOLDER/mp_0",
+        "/gate/actor/stat/save ROOT_FOLDER/logs/chunk_0_stat.txt",
+        "/gate/output/summary/setFileName ROOT_FOLDER/logs/chunk_0_summary.txt",
+        "/gate/random/setEngineSeed {}".format(chunkCache.chunkSeed(1, 0.0, 1.0)),
+        "/gate/application/startDAQCluster 0.0 1.0 0 s",
+        "/control/echo GateOrchestrator window 0 end",
+    ]
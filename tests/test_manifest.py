@@ -0,0 +1,110 @@
+"""
+Tests of the run manifest: saving and loading it, resuming a run that died part way and the check of every
+chunk before the merge.  The chunk outputs are small ROOT files with a Coincidences tree.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+uproot = pytest.importorskip("uproot")
+
+from GateOrchestrator import manifest
+
+#######################
+###### CONSTANTS ######
+#######################
+
+RUN_HASH = "0123456789abcdef"
+CHUNKS = 4
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def writeChunkFile(path: str, entries: int) -> None:
+    """
+    Function that writes the output of a chunk, entries coincidences and a delay tree of half as many.
+    """
+
+    with uproot.recreate(path) as f:
+        f[manifest.COINCIDENCES_TREE] = {"time1": np.linspace(0.0, 1.0, entries)}
+        f[manifest.DELAYS_TREE] = {"time1": np.linspace(0.0, 1.0, entries//2)}
+
+def startRun(folder) -> tuple:
+    """
+    Function that starts a run of CHUNKS chunks of 0.1 s, nothing simulated yet.
+    """
+
+    path = str(folder/"runManifest.json")
+    chunks = [{"index": i, "start": 0.1*i, "stop": 0.1*(i + 1), "rootFile": str(folder/"chunk_{}.root".format(i))} for i in range(CHUNKS)]
+    return path, manifest.newManifest(path, RUN_HASH, chunks)
+
+def finishChunk(path: str, runManifest: dict, index: int, entries: int = 100, returnCode: int = 0) -> None:
+    if returnCode == 0:
+        writeChunkFile(runManifest["chunks"][index]["rootFile"], entries)
+    manifest.recordResult(path, runManifest, {"index": index, "returnCode": returnCode, "wallTime": 1.0})
+
+##################
+###### TESTS #####
+##################
+
+def test_manifestRoundTrip(tmp_path):
+    path, runManifest = startRun(tmp_path)
+    finishChunk(path, runManifest, 1)
+    loaded = manifest.loadManifest(path, RUN_HASH)
+    assert loaded == runManifest
+    assert [entry["status"] for entry in loaded["chunks"]] == ["pending", "done", "pending", "pending"]
+    assert (loaded["chunks"][1]["entries"], loaded["chunks"][1]["delays"]) == (100, 50)
+    assert not os.path.exists(path + ".tmp")
+
+def test_loadManifestRefusesOtherRuns(tmp_path):
+    path, _ = startRun(tmp_path)
+    with pytest.raises(RuntimeError, match = "different configuration"):
+        manifest.loadManifest(path, "fedcba9876543210")
+    with pytest.raises(RuntimeError, match = "nothing to resume"):
+        manifest.loadManifest(str(tmp_path/"missing.json"), RUN_HASH)
+
+def test_resumeOnlyRunsUnfinishedChunks(tmp_path):
+    path, runManifest = startRun(tmp_path)
+    finishChunk(path, runManifest, 0)
+    finishChunk(path, runManifest, 1, returnCode = 1)                                                               # GATE crashed
+    finishChunk(path, runManifest, 2)
+    resumed = manifest.loadManifest(path, RUN_HASH)                                                                 # The run died before chunk 3 finished
+    assert manifest.unfinishedChunks(resumed) == [1, 3]
+
+    os.remove(resumed["chunks"][2]["rootFile"])                                                                     # Output lost since the chunk finished
+    assert manifest.unfinishedChunks(resumed) == [1, 2, 3]
+    assert resumed["chunks"][2]["status"] == "failed"
+
+def test_verifyForMerge(tmp_path):
+    path, runManifest = startRun(tmp_path)
+    for i in range(CHUNKS):
+        finishChunk(path, runManifest, i)
+    assert manifest.verifyForMerge(path, runManifest) == []
+
+def test_verifyForMergeRejectsBadEntryCount(tmp_path):
+    path, runManifest = startRun(tmp_path)
+    for i in range(CHUNKS):
+        finishChunk(path, runManifest, i)
+    runManifest["chunks"][2]["entries"] += 1                                                                        # The file no longer holds what was recorded
+    assert manifest.verifyForMerge(path, runManifest) == [2]
+    with open(path) as f:
+        assert json.load(f)["chunks"][2]["status"] == "failed"
+
+def test_verifyForMergeRejectsReplacedOutput(tmp_path):
+    path, runManifest = startRun(tmp_path)
+    for i in range(CHUNKS):
+        finishChunk(path, runManifest, i)
+    writeChunkFile(runManifest["chunks"][0]["rootFile"], 60)
+    assert manifest.verifyForMerge(path, runManifest) == [0]
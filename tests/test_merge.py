@@ -0,0 +1,159 @@
+"""
+Tests of the running merge: chunks are folded in time order whatever order they finish in, a run with a
+failed chunk is not merged, a resumed run keeps what was already merged and a failed fold falls back to the
+tree merge.  hadd is replaced by a stand-in that concatenates the Coincidences trees with uproot.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+
+import numpy as np
+import pytest
+
+uproot = pytest.importorskip("uproot")
+
+from GateOrchestrator import manifest, merge
+
+#######################
+###### CONSTANTS ######
+#######################
+
+CHUNKS = 5
+ENTRIES = 10 # Coincidences per chunk
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def readTimes(path: str) -> np.ndarray:
+    with uproot.open(path) as rootFile:
+        return rootFile[manifest.COINCIDENCES_TREE]["time1"].array(library = "np")
+
+def fakeHadd(calls: list, failCalls: tuple = ()):
+    """
+    Function that returns a stand-in for merge.hadd which records its calls in calls and fails the calls
+    numbered in failCalls.
+    """
+
+    def hadd(outputFile, inputFiles, flag = "-fk"):
+        calls.append((flag, list(inputFiles)))
+        if len(calls) - 1 in failCalls:
+            return 1, "hadd: stand-in failure"
+        sources = ([outputFile] if flag == "-a" else []) + list(inputFiles)
+        times = np.concatenate([readTimes(path) for path in sources])
+        with uproot.recreate(outputFile) as f:
+            f[manifest.COINCIDENCES_TREE] = {"time1": times}
+        return 0, ""
+    return hadd
+
+def startRun(folder) -> tuple:
+    """
+    Function that starts a run of CHUNKS chunks of 1 s, each chunk file holds ENTRIES times in its window.
+    """
+
+    path = str(folder/"runManifest.json")
+    chunks = [{"index": i, "start": float(i), "stop": float(i + 1), "rootFile": str(folder/"mp_{}.root".format(i))} for i in range(CHUNKS)]
+    return path, manifest.newManifest(path, "0123456789abcdef", chunks)
+
+def finishChunk(path: str, runManifest: dict, index: int, returnCode: int = 0) -> None:
+    with uproot.recreate(runManifest["chunks"][index]["rootFile"]) as f:
+        f[manifest.COINCIDENCES_TREE] = {"time1": index + np.arange(ENTRIES)/ENTRIES}
+    manifest.recordResult(path, runManifest, {"index": index, "returnCode": returnCode, "wallTime": 1.0})
+
+##################
+###### TESTS #####
+##################
+
+def test_foldsInTimeOrder(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(merge, "hadd", fakeHadd(calls))
+    path, runManifest = startRun(tmp_path)
+    runningMerge = merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    runningMerge.start()
+    for index in (3, 0, 4, 2, 1):                                                                                   # As the chunks finish
+        finishChunk(path, runManifest, index)
+        runningMerge.notify()
+
+    output = str(tmp_path/"Output.root")
+    assert merge.finishRun(runningMerge, path, runManifest, output, workers = 2)
+    assert [flag for flag, _ in calls] == ["-fk"] + ["-a"]*(len(calls) - 1)
+    assert sum((inputs for _, inputs in calls), []) == [entry["rootFile"] for entry in runManifest["chunks"]]
+    times = readTimes(output)
+    assert len(times) == CHUNKS*ENTRIES and np.all(np.diff(times) > 0)
+    assert not os.path.exists(str(tmp_path/"running.root"))
+
+def test_failedChunkIsNotMerged(tmp_path, monkeypatch):
+    monkeypatch.setattr(merge, "hadd", fakeHadd([]))
+    path, runManifest = startRun(tmp_path)
+    runningMerge = merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    runningMerge.start()
+    for index in range(CHUNKS):
+        finishChunk(path, runManifest, index, returnCode = 1 if index == 2 else 0)
+        runningMerge.notify()
+
+    output = str(tmp_path/"Output.root")
+    assert not merge.finishRun(runningMerge, path, runManifest, output, workers = 2)
+    assert runManifest["mergedChunks"] == 2                                                                         # Only the chunks before the failed one
+    assert not os.path.exists(output)
+
+def test_resumeKeepsMergedChunks(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(merge, "hadd", fakeHadd(calls))
+    path, runManifest = startRun(tmp_path)
+    for index in (0, 1):
+        finishChunk(path, runManifest, index)
+    first = merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    first.start()
+    assert not first.finish()                                                                                       # The run died with two chunks merged
+    assert runManifest["mergedChunks"] == 2
+
+    resumed = manifest.loadManifest(path, runManifest["configHash"])
+    runningMerge = merge.RunningMerge(str(tmp_path/"running.root"), path, resumed)
+    assert resumed["mergedChunks"] == 2
+    runningMerge.start()
+    for index in range(2, CHUNKS):
+        finishChunk(path, resumed, index)
+        runningMerge.notify()
+    assert merge.finishRun(runningMerge, path, resumed, str(tmp_path/"Output.root"), workers = 2)
+    assert calls[0] == ("-fk", [entry["rootFile"] for entry in resumed["chunks"][:2]])
+    assert all(flag == "-a" for flag, _ in calls[1:])
+    assert np.all(np.diff(readTimes(str(tmp_path/"Output.root"))) > 0)
+
+def test_resumeRestartsWhenMergedChunkFailed(tmp_path, monkeypatch):
+    monkeypatch.setattr(merge, "hadd", fakeHadd([]))
+    path, runManifest = startRun(tmp_path)
+    for index in (0, 1):
+        finishChunk(path, runManifest, index)
+    first = merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    first.start()
+    first.finish()
+
+    os.remove(runManifest["chunks"][1]["rootFile"])                                                                 # Has to be simulated again
+    manifest.unfinishedChunks(runManifest)
+    merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    assert runManifest["mergedChunks"] == 0
+    assert not os.path.exists(str(tmp_path/"running.root"))
+
+def test_failedFoldFallsBackToTreeMerge(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(merge, "hadd", fakeHadd(calls, failCalls = (0,)))
+    path, runManifest = startRun(tmp_path)
+    runningMerge = merge.RunningMerge(str(tmp_path/"running.root"), path, runManifest)
+    runningMerge.start()
+    for index in range(CHUNKS):
+        finishChunk(path, runManifest, index)
+        runningMerge.notify()
+
+    output = str(tmp_path/"Output.root")
+    assert merge.finishRun(runningMerge, path, runManifest, output, workers = 2)
+    assert len(calls) == 2                                                                                          # The first fold failed, the merge stopped there
+    assert calls[1] == ("-fk", [entry["rootFile"] for entry in runManifest["chunks"]])                              # One tree merge of every chunk file
+    times = readTimes(output)
+    assert len(times) == CHUNKS*ENTRIES and np.all(np.diff(times) > 0)
@@ -0,0 +1,41 @@
+"""
+Tests of the placements slices.  The slice of a chunk keeps one keyframe on each side of its window, so GATE
+finds the nearest keyframe up to the window edges.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import numpy as np
+import pytest
+
+from GateOrchestrator import placements
+
+##################
+###### TESTS #####
+##################
+
+@pytest.mark.parametrize("chunkStart, chunkEnd, expected", [
+    (1.5, 2.5, (1, 4)),   # One keyframe on each side of the window
+    (1.0, 2.0, (1, 3)),   # Keyframes on the window edges are enough
+    (-1.0, -0.5, (0, 1)), # Before the first keyframe
+    (9.0, 11.0, (4, 5)),  # After the last keyframe
+    (0.0, 4.0, (0, 5)),   # The whole path
+    (2.2, 2.3, (2, 4)),   # Between two keyframes
+])
+def test_sliceRange(chunkStart, chunkEnd, expected):
+    assert placements.sliceRange(np.arange(5.0), chunkStart, chunkEnd) == expected
+
+def test_sliceRangeCoversEveryChunk():
+    times = np.sort(np.random.default_rng(2).uniform(0.0, 10.0, 50))
+    edges = np.linspace(0.0, 10.0, 8)
+    for chunkStart, chunkEnd in zip(edges, edges[1:]):
+        first, last = placements.sliceRange(times, chunkStart, chunkEnd)
+        kept = times[first:last]
+        assert kept[0] <= chunkStart or first == 0
+        assert kept[-1] >= chunkEnd or last == len(times)
@@ -0,0 +1,142 @@
+"""
+Tests of the persistent GATE workers and the governor that throttles them.  A stand-in Gate executable
+runs the macros: it follows /control/execute and echoes the window markers, each taking a moment.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from GateOrchestrator import governor, scheduler
+
+#######################
+###### CONSTANTS ######
+#######################
+
+FAKE_GATE = '''#!{}
+import os, sys, time
+def run(path):
+    for line in open(path):
+        command = line.split("#")[0].split()
+        if command[:1] == ["/control/execute"]:
+            if not os.path.exists(command[1]):
+                sys.exit(1)
+            run(command[1])
+        elif command[:1] == ["/control/echo"]:
+            print(" ".join(command[1:]), flush = True)
+            time.sleep(0.1)
+run(sys.argv[1])
+'''
+
+#####################
+###### CLASSES ######
+#####################
+
+class ShrinkingGovernor:
+    """
+    Governor that lets three workers launch and then only allows one, as a server that got busy.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.running = 0
+        self.allowed = 3
+        self.busy = False # Set once three workers run, then only one is allowed
+        self.shed = 0
+
+    def acquire(self):
+        with self.condition:
+            while self.running >= self.allowed:
+                self.condition.wait()
+            self.running += 1
+            self.busy = self.busy or self.running == 3
+
+    def keep(self):
+        with self.condition:
+            self.allowed = 1 if self.busy else 3
+            if self.running <= self.allowed:
+                return True
+            self.running -= 1
+            self.shed += 1
+            self.condition.notify()
+            return False
+
+    def release(self):
+        with self.condition:
+            self.running -= 1
+            self.condition.notify()
+
+    def register(self, pid):
+        pass
+
+    def unregister(self, pid):
+        pass
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def writeChunks(folder, count: int) -> list:
+    """
+    Function that writes the macros of count chunks of 0.1 s, each only echoes its window markers.
+    """
+
+    chunks = []
+    for i in range(count):
+        macro, window = str(folder/"chunk_{}.mac".format(i)), str(folder/"chunk_{}_window.mac".format(i))
+        with open(window, "w") as f:
+            f.write("/control/echo GateOrchestrator window {0} start\n/control/echo GateOrchestrator window {0} end\n".format(i))
+        with open(macro, "w") as f:
+            f.write("/control/execute {}\n".format(window))
+        chunks.append({"index": i, "start": 0.1*i, "stop": 0.1*(i + 1), "macro": macro, "window": window})
+    return chunks
+
+##################
+###### TESTS #####
+##################
+
+@pytest.fixture
+def fakeGate(tmp_path, monkeypatch):
+    folder = tmp_path/"bin"
+    folder.mkdir()
+    with open(str(folder/"Gate"), "w") as f:
+        f.write(FAKE_GATE.format(sys.executable))
+    os.chmod(str(folder/"Gate"), 0o755)
+    monkeypatch.setenv("PATH", str(folder) + os.pathsep + os.environ["PATH"])
+
+def test_keepGivesBackSurplusSlots():
+    coreGovernor = governor.Governor(None, 3)
+    coreGovernor.checked = time.time() + 3600                                                                       # No refresh, the test sets the limits
+    coreGovernor.allowed = 3
+    for _ in range(3):
+        coreGovernor.acquire()
+    coreGovernor.allowed = 1
+    kept = [coreGovernor.keep() for _ in range(3)]
+    assert kept == [False, False, True]
+    assert coreGovernor.running == 1
+    coreGovernor.release()
+    assert coreGovernor.running == 0
+
+def test_persistentWorkersEndWhenThrottled(tmp_path, fakeGate):
+    chunks = writeChunks(tmp_path, 8)
+    shrinking = ShrinkingGovernor()
+    results = scheduler.runPersistentChunks(chunks, 3, governor = shrinking)
+    assert [result["index"] for result in results] == list(range(8))
+    assert all(result["returnCode"] == 0 for result in results)
+    assert shrinking.running == 0
+    workers = {}
+    for result in results:
+        workers.setdefault(result["worker"], []).append(result["index"])
+    assert len(workers) == 3                                                                                        # No process is started once the limit dropped
+    assert shrinking.shed == 2                                                                                      # Two processes ended early, one took the rest
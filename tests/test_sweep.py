@@ -0,0 +1,51 @@
+"""
+Tests of the sweep jobs: every job is the config file, base and its own values, and its output file is
+named from all of them.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import json
+
+import pytest
+
+from GateOrchestrator import sweep
+
+##################
+###### TESTS #####
+##################
+
+def test_jobsCrossGridAndJobs():
+    jobs = sweep.expandJobs({"base": {"endTime": 0.5}, "grid": {"tracerSize": [100, 200]}, "jobs": [{"runSeed": 1}, {"runSeed": 2}]})
+    assert [point for point, _ in jobs] == [{"runSeed": 1, "tracerSize": 100}, {"runSeed": 1, "tracerSize": 200},
+                                            {"runSeed": 2, "tracerSize": 100}, {"runSeed": 2, "tracerSize": 200}]
+    assert all(overrides["endTime"] == 0.5 for _, overrides in jobs)
+
+def test_outputNamedFromEveryControl(tmp_path):
+    path = str(tmp_path/"motion.json")
+    with open(path, "w") as f:
+        json.dump({"genericMotionFileName1": "RW4.placements"}, f)
+    configs = sweep.jobConfigs({"config": path, "output": "{genericMotionFileName1}_{tracerSize}um_{endTime}s.root", "base": {"endTime": 0.5},
+                                "grid": {"tracerSize": [100, 200]}}, "tracerSweep")
+    assert [config.OUTPUT_ROOT_FILE_NAME for _, config in configs] == ["RW4.placements_100um_0.5s.root", "RW4.placements_200um_0.5s.root"]
+    assert configs[1][1].MACRO_FOLDER.endswith("tracerSweep_1/")
+
+def test_outputWithUnknownControl():
+    with pytest.raises(ValueError, match = r"\{tracerRadius\}"):
+        sweep.jobConfigs({"output": "Tracer_{tracerRadius}um.root", "grid": {"tracerSize": [100, 200]}}, "tracerSweep")
+    with pytest.raises(ValueError, match = "without a control name"):
+        sweep.jobConfigs({"output": "Tracer_{}um.root", "grid": {"tracerSize": [100, 200]}}, "tracerSweep")
+
+def test_defaultOutputName():
+    configs = sweep.jobConfigs({"grid": {"sourceActivity1": ["16483500 Bq"]}, "jobs": [{"OUTPUT_ROOT_FILE_NAME": "fixed.root"}, {"runSeed": 2}]}, "tracerSweep")
+    assert [config.OUTPUT_ROOT_FILE_NAME for _, config in configs] == ["fixed.root", "testStationary_XYZ_20_20_20_mm_1mCi_1s_NRW-100_68Ga_runSeed-2_sourceActivity1-16483500Bq.root"]
+
+def test_jobsWritingOneFileRefused():
+    with pytest.raises(ValueError, match = "Two jobs"):
+        sweep.jobConfigs({"output": "Tracer_{endTime}s.root", "grid": {"tracerSize": [100, 200]}}, "tracerSweep")
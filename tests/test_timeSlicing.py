@@ -0,0 +1,65 @@
+"""
+Tests of the automatic time slice.  The slice of a stationary run must not depend on the acquisition, it is
+rendered into every chunk macro and so is part of the chunk cache key: a longer run of the same
+configuration has to take the chunks of the shorter one from the cache.
+
+    python3 -m pytest -q tests/
+
+Required Packages: pytest, numpy, uproot
+"""
+
+######################
+###### PACKAGES ######
+######################
+
+import os
+
+import numpy as np
+import pytest
+
+uproot = pytest.importorskip("uproot")
+
+from GateOrchestrator import chunkCache, simulationRun, timeSlicing
+from GateOrchestrator.config import SimulationConfig
+
+#######################
+###### FUNCTIONS ######
+#######################
+
+def stationaryConfig(folder, name: str, endTime: float) -> SimulationConfig:
+    """
+    Function that sets up a stationary run whose folders and caches are all in folder.
+    """
+
+    return SimulationConfig(MACRO_FOLDER = str(folder/name/"macros") + "/", ROOT_FOLDER = str(folder/name/"root") + "/", SCRATCH = None,
+                            OUTPUT_ROOT = str(folder/"Output") + "/", COST_HISTORY = str(folder/"chunkHistory.jsonl"), CHUNK_CACHE = str(folder/"chunkCache") + "/",
+                            PHYSICS_TABLES = None, GOVERNOR_CONFIG = str(folder/"governor.cfg"), cores = 2, endTime = endTime)
+
+##################
+###### TESTS #####
+##################
+
+def test_stationarySliceIgnoresAcquisition(tmp_path):
+    slices = [timeSlicing.resolveTimeSlice(stationaryConfig(tmp_path, "run", endTime)) for endTime in (0.1, 1.0, 2.0, 3600.0)]
+    assert slices == [timeSlicing.STATIC_SLICE]*4
+
+def test_fixedTimeStep(tmp_path):
+    assert timeSlicing.resolveTimeSlice(stationaryConfig(tmp_path, "run", 1.0).replace(timeStep = "0.000001 s")) == 1e-6
+
+def test_linearMotionSlice(tmp_path):
+    config = stationaryConfig(tmp_path, "run", 1.0).replace(movePhantom1 = True, linearMotion1 = True, linearMotionSpeed1 = "0.0 0.0 10.0 mm/s")
+    assert timeSlicing.resolveTimeSlice(config) == pytest.approx(0.01/10.0)
+
+def test_longerStationaryRunReusesChunks(tmp_path):
+    first = simulationRun.planRun(stationaryConfig(tmp_path, "first", 1.0))
+    for chunk in first["chunks"]:                                                                                   # Stands in for GATE, any readable output will do
+        with uproot.recreate(chunk["rootFile"]) as f:
+            f["Coincidences"] = {"time1": np.array([chunk["start"]])}
+        chunkCache.storeChunk(first["config"].CHUNK_CACHE, first["cacheSignature"], chunk)
+
+    longer = simulationRun.planRun(stationaryConfig(tmp_path, "longer", 2.0))
+    assert longer["cacheSignature"] == first["cacheSignature"]
+    restored = [entry for entry in longer["runManifest"]["chunks"] if entry["status"] == "done"]
+    assert [(entry["start"], entry["stop"]) for entry in restored] == [(chunk["start"], chunk["stop"]) for chunk in first["chunks"]]
+    assert all(os.path.exists(entry["rootFile"]) for entry in restored)
+    assert all(chunk["start"] >= 1.0 for chunk in longer["chunks"])                                                 # Only the second second is simulated